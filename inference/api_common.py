@@ -0,0 +1,25 @@
+# Helpers shared by attendance_api and registration_api
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable, List
+
+from facerec.downloader import default_downloader
+from facerec.result_cache import result_version
+
+
+def download_images_from_urls(urls: List[str], decode: bool = True) -> List[Future]:
+    """Start concurrent downloads of all URLs; futures resolve to RGB arrays (or bytes), in input order."""
+    return default_downloader.submit_all(urls, decode)
+
+
+def service_cache_version(kind: str, detector: Callable[[], Any]) -> Callable[[], str]:
+    """
+    cache_version() of one service: the result-cache version of its detector + embedder
+    settings. detector() (instance or class, see result_version) is resolved on the
+    first call, not at import time; the version is then reused.
+    """
+    @lru_cache(maxsize=None)
+    def cache_version() -> str:
+        return result_version(kind, detector())
+
+    return cache_version
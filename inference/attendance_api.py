@@ -1,27 +1,66 @@
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, HttpUrl
-from typing import List, Dict, Any, Optional, Tuple
+from fastapi import APIRouter, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, HttpUrl, ValidationError
+from typing import List, Dict, Any, Optional
 import numpy as np
-import requests
-from io import BytesIO
-from PIL import Image
+import asyncio
+import json
 import logging
+from concurrent.futures import Future
 
-from facerec.multi_face_extractor import MultiFaceExtractor
 from facerec.multi_face_orchestrator import AttendanceOrchestrator
-from facerec.embedding_model import ArcFaceONNXEmbedder
+from facerec.multi_face_extractor import MultiFaceExtractor
+from facerec.registry import default_registry, embedding_batcher_stats, EMBEDDER
+from facerec.scheduler import default_scheduler
+from facerec.matching import normalize_rows, similarity_matrix, match_and_assign
+from facerec.gallery import EmbeddingGallery
+from facerec.downloader import default_downloader
+from facerec.workers import WorkerPool, WorkerPoolBusy
+from facerec.executor import default_cpu_executor
+from facerec.result_cache import default_result_cache, content_key
+from facerec.stream import StreamSession
+from facerec.attendance_sessions import AttendanceSession, SessionLimitReached, default_session_store
+from facerec.config import (
+    ATTENDANCE_EXECUTION_MODE,
+    ATTENDANCE_DECODE_LONG_SIDE,
+    ATTENDANCE_SESSION_MAX_IMAGES,
+    SERVER_WORKERS,
+    STREAM_MAX_FRAME_MB,
+)
+from api_common import download_images_from_urls, service_cache_version
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Attendance Recognition API", version="2.0.0")
+# Routes live on a router so server.py can mount both services in one app
+router = APIRouter()
 
-# Initialize models globally
-detector = MultiFaceExtractor()
-embedder = ArcFaceONNXEmbedder()
+# Models come from the process-wide registry (one copy each, shared with registration_api)
 orchestrator = AttendanceOrchestrator()
+gallery = EmbeddingGallery()
+# "workers" mode: detection/embedding run in separate processes with their own models
+worker_pool = WorkerPool() if ATTENDANCE_EXECUTION_MODE == "workers" else None
+# Streaming sessions run in this process whatever the execution mode (they keep per-session state)
+stream_stats = {"active": 0, "completed": 0, "frames": 0}
+
+
+@router.on_event("startup")
+def load_models():
+    # Load at startup rather than on the first request
+    if worker_pool is not None:
+        worker_pool.start()
+    else:
+        default_registry.preload(["detector", EMBEDDER])
+        if ATTENDANCE_EXECUTION_MODE == "pipeline":
+            orchestrator.pipeline  # start the stage threads before the first request
+
+
+@router.on_event("shutdown")
+def stop_workers():
+    if worker_pool is not None:
+        worker_pool.shutdown()
+    gallery.flush()
 
 
 # ===== REQUEST/RESPONSE MODELS =====
@@ -30,7 +69,7 @@ class StudentMetadata(BaseModel):
     student_id: str
     name: str
     roll_number: Optional[str] = None
-    embedding: List[float]
+    embedding: Optional[List[float]] = None  # None = look up student_id in the server-side gallery
     
     class Config:
         json_schema_extra = {
@@ -43,12 +82,18 @@ class StudentMetadata(BaseModel):
         }
 
 
-class AttendanceRequest(BaseModel):
-    image_urls: List[HttpUrl]
+class AttendanceParams(BaseModel):
+    """Roster and matching settings shared by photo and streaming attendance."""
     students: List[StudentMetadata]
     similarity_threshold: float = 0.70
     margin_threshold: float = 0.15
     min_absolute_similarity: float = 0.65
+    assignment_method: str = "auto"  # "auto", "hungarian" or "greedy"
+    gallery_version: Optional[int] = None  # Expected gallery version when embeddings are omitted
+
+
+class AttendanceRequest(AttendanceParams):
+    image_urls: List[HttpUrl]
     
     class Config:
         json_schema_extra = {
@@ -67,7 +112,9 @@ class AttendanceRequest(BaseModel):
                 ],
                 "similarity_threshold": 0.70,
                 "margin_threshold": 0.15,
-                "min_absolute_similarity": 0.65
+                "min_absolute_similarity": 0.65,
+                "assignment_method": "auto",
+                "gallery_version": None
             }
         }
 
@@ -102,7 +149,7 @@ class AttendanceResponse(BaseModel):
     total_students_expected: int
     attendance_rate: float
     present_students: List[StudentMatch]
-    absent_students: List[Dict[str, str]]
+    absent_students: List[Dict[str, Optional[str]]]
     unidentified_faces: int
     rejected_matches: List[RejectedMatch]
     
@@ -135,179 +182,294 @@ class AttendanceResponse(BaseModel):
         }
 
 
+class SessionImagesRequest(BaseModel):
+    image_urls: List[HttpUrl]
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "image_urls": ["https://res.cloudinary.com/.../late_arrivals.jpg"]
+            }
+        }
+
+
+class SessionStatus(BaseModel):
+    session_id: str
+    images_posted: int
+    images_with_faces: int
+    faces: int
+    students: int
+    ttl_s: float
+
+
+class GalleryEntry(BaseModel):
+    student_id: str
+    embedding: List[float]
+
+
+class GalleryUpsertRequest(BaseModel):
+    entries: List[GalleryEntry]
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "entries": [
+                    {"student_id": "STU001", "embedding": [0.123] * 512}
+                ]
+            }
+        }
+
+
+class GalleryStatus(BaseModel):
+    version: int
+    size: int
+    capacity: int
+
+
 # ===== HELPER FUNCTIONS =====
 
-def download_image_from_url(url: str) -> np.ndarray:
-    """Download image from Cloudinary URL and convert to numpy array."""
+# Worker processes build a default MultiFaceExtractor; don't load one here just to read its settings
+cache_version = service_cache_version(
+    "attendance", lambda: MultiFaceExtractor if worker_pool is not None else orchestrator.detector
+)
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """RGB array no larger than the detector needs (reduced-scale JPEG decode)."""
+    return default_downloader.decode(data, ATTENDANCE_DECODE_LONG_SIDE)
+
+
+def resolve_download(data: bytes, version: str) -> tuple:
+    """
+    Hash + result-cache lookup of one downloaded image and, on a miss, its next step:
+    submitted to the pipeline, or decoded for batched inference. Runs in the CPU executor
+    (hashing a large photo, decoding and a full pipeline queue would all stall the loop).
+    
+    Returns:
+        (cache_key, cached embeddings or None, pipeline future or decoded RGB array or None)
+    """
+    key = content_key(data, version)
+    cached = default_result_cache.get(key)
+    if cached is not None:
+        return key, cached, None
+    
+    if ATTENDANCE_EXECUTION_MODE == "pipeline":
+        # Into the pipeline as soon as this image is here, decoded by its decode stage
+        return key, None, orchestrator.pipeline.submit(data)
+    return key, None, decode_image(data)
+
+
+async def fetch_image(img_idx: int, download: Future, version: str) -> Optional[tuple]:
+    """
+    Await one download and resolve it against the result cache.
+    
+    Returns:
+        (img_idx, cache_key, result): result is the cached or pipeline result dict, or
+        the decoded RGB array when it still needs batched inference; None on failure
+    """
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        data = await asyncio.wrap_future(download)
+        key, cached, pending = await default_cpu_executor.run(resolve_download, data, version)
         
-        img = Image.open(BytesIO(response.content))
+        if cached is not None:
+            return img_idx, key, {"embeddings": cached, "num_faces": len(cached), "face_tensors": None}
         
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
+        if isinstance(pending, Future):
+            result = await asyncio.wrap_future(pending)
+            default_result_cache.put(key, result["embeddings"])
+            return img_idx, key, result
         
-        return np.array(img)
+        return img_idx, key, pending
     
-    except requests.RequestException as e:
-        raise HTTPException(status_code=400, detail=f"Failed to download image: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to process image: {str(e)}")
+        logger.error(f"    Image {img_idx + 1}: {str(e)}")
+        return None
 
 
-def validate_and_normalize(emb: np.ndarray) -> np.ndarray:
+async def extract_images(urls: List[str]) -> List[tuple]:
     """
-    Defensive normalization - ensures embedding is L2-normalized.
-    Safe to call on already-normalized embeddings (no-op if norm=1.0).
+    Download URLs and run face extraction on the images that are not in the result cache.
+    
+    Returns:
+        (img_idx, result) per downloaded image, img_idx being its position in urls;
+        result is the orchestrator result dict (or the cached embeddings in that shape)
     """
-    emb = emb.astype(np.float32)
-    norm = np.linalg.norm(emb)
+    # All URLs download concurrently as raw bytes: images whose content hash is in the
+    # result cache (resubmitted photos, retried requests) skip decoding and inference.
+    # In pipeline mode each uncached image goes through the pipeline as soon as it arrives.
+    downloads = download_images_from_urls(urls, decode=False)
+    version = cache_version()
+    fetched = await asyncio.gather(*(
+        fetch_image(img_idx, download, version) for img_idx, download in enumerate(downloads)
+    ))
+    images = [item for item in fetched if item is not None]  # (img_idx, key, result or RGB array)
     
-    if abs(norm - 1.0) > 1e-6:
-        logger.warning(f"Embedding norm={norm:.8f}, re-normalizing")
-        emb = emb / norm
+    # batch / workers: one batched detection + ArcFace call for the uncached images
+    pending = [i for i, (_, _, output) in enumerate(images) if isinstance(output, np.ndarray)]
+    if pending:
+        arrays = [images[i][2] for i in pending]
+        if ATTENDANCE_EXECUTION_MODE == "workers":
+            try:
+                future = await default_cpu_executor.run(worker_pool.submit, arrays)
+            except WorkerPoolBusy as e:
+                raise HTTPException(status_code=503, detail=f"Server busy: {str(e)}")
+            results = await asyncio.wrap_future(future)
+        else:
+            results = await default_cpu_executor.run(orchestrator.run_batch, arrays)
+        
+        for i, result in zip(pending, results):
+            img_idx, key, _ = images[i]
+            default_result_cache.put(key, result["embeddings"])
+            images[i] = (img_idx, key, result)
     
-    return emb
+    return [(img_idx, result) for img_idx, _, result in images]
 
 
-def compute_similarity(embedding1: np.ndarray, embedding2: np.ndarray) -> float:
-    """Compute cosine similarity between two L2-normalized embeddings."""
-    return float(np.dot(embedding1, embedding2))
+def validate_params(request: AttendanceParams) -> None:
+    if len(request.students) == 0:
+        raise HTTPException(status_code=400, detail="Must provide at least one student")
+    
+    if request.assignment_method not in ("auto", "hungarian", "greedy"):
+        raise HTTPException(status_code=400, detail="assignment_method must be one of: auto, hungarian, greedy")
 
 
-def match_student_with_cross_validation(
-    student_embedding: np.ndarray,
-    face_pool: List[Dict],
-    similarity_threshold: float,
-    margin_threshold: float,
-    min_absolute_similarity: float,
-    cross_validation_threshold: float = 0.75  # NEW!
-) -> Tuple[Optional[Dict], Optional[Dict]]:
+def require_single_worker(feature: str, alternative: str) -> None:
     """
-    Match student with cross-validation for ambiguous cases.
-    
-    If top 2 matches are too close (margin < threshold):
-    - Check if the two faces are actually the same person
-    - If yes (faces similar), accept the match
-    - If no (faces different), reject as truly ambiguous
+    503 for features whose state lives in this process (gallery, sessions): the workers
+    of server.py accept on shared sockets, so with SERVER_WORKERS > 1 consecutive
+    requests reach different copies of that state.
     """
+    if SERVER_WORKERS > 1:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{feature} need SERVER_WORKERS=1 (the state is per worker); {alternative}"
+        )
+
+
+def resolve_student_embeddings(request: AttendanceParams) -> np.ndarray:
+    """
+    Build the (S, 512) student matrix from inline embeddings and/or the gallery.
+    Students without an inline embedding are looked up by student_id.
+    """
+    students = request.students
+    gallery_idx = [i for i, s in enumerate(students) if s.embedding is None]
     
-    # Compute similarities with all faces
-    matches = []
-    for face in face_pool:
-        similarity = compute_similarity(student_embedding, face['embedding'])
-        
-        if similarity >= min_absolute_similarity:
-            matches.append({
-                'face': face,
-                'confidence': similarity
-            })
-    
-    # Sort by confidence
-    matches.sort(key=lambda x: x['confidence'], reverse=True)
+    if not gallery_idx:
+        return normalize_rows(np.array([s.embedding for s in students], dtype=np.float32))
     
-    if len(matches) == 0:
-        return None, None
+    require_single_worker("Gallery references", "send inline embeddings")
+    if request.gallery_version is not None and request.gallery_version != gallery.version:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Gallery version mismatch (server={gallery.version}, request={request.gallery_version}). Resync the gallery."
+        )
     
-    best = matches[0]
-    second_best = matches[1] if len(matches) > 1 else None
-    margin = best['confidence'] - (second_best['confidence'] if second_best else 0)
+    try:
+        gallery_rows = gallery.get_matrix([students[i].student_id for i in gallery_idx])
+    except KeyError as e:
+        raise HTTPException(status_code=409, detail=f"Students missing from gallery: {e.args[0]}")
     
-    # Standard checks
-    if best['confidence'] < similarity_threshold:
-        rejection = {
-            "rejection_reason": f"Confidence {best['confidence']:.3f} below threshold"
-        }
-        return None, rejection
+    student_matrix = np.empty((len(students), gallery.dim), dtype=np.float32)
+    student_matrix[gallery_idx] = gallery_rows
     
-    # AMBIGUOUS CASE: Margin too small
-    if second_best and margin < margin_threshold:
-        logger.info(f"      Ambiguous: margin={margin:.3f} < {margin_threshold}")
-        
-        # NEW: Cross-validate by comparing the two ambiguous faces
-        face1_emb = best['face']['embedding']
-        face2_emb = second_best['face']['embedding']
-        
-        face_to_face_similarity = compute_similarity(face1_emb, face2_emb)
-        
-        logger.info(f"      Cross-check: Face {best['face']['id']} vs {second_best['face']['id']} = {face_to_face_similarity:.3f}")
-        
-        # If the two faces are actually the same person (duplicates)
-        if face_to_face_similarity >= cross_validation_threshold:
-            logger.info(f"      ✓ Cross-validation PASSED: Both faces are same person, accepting match")
-            
-            # Accept the best match
-            return {
-                'face_id': best['face']['id'],
-                'image_index': best['face']['image_index'],
-                'face_index': best['face']['face_index'],
-                'confidence': best['confidence'],
-                'margin': margin,
-                'cross_validated': True,
-                'face_similarity': face_to_face_similarity
-            }, None
-        
-        else:
-            # Two different people matched similarly - truly ambiguous
-            logger.warning(f"      ✗ Cross-validation FAILED: Faces are different people (sim={face_to_face_similarity:.3f})")
-            
-            rejection = {
-                "rejection_reason": f"Ambiguous: margin={margin:.3f}, faces are different (cross-sim={face_to_face_similarity:.3f})",
-                "cross_validated": True,
-                "face_similarity": face_to_face_similarity
-            }
-            return None, rejection
+    inline_idx = [i for i, s in enumerate(students) if s.embedding is not None]
+    if inline_idx:
+        student_matrix[inline_idx] = normalize_rows(
+            np.array([students[i].embedding for i in inline_idx], dtype=np.float32)
+        )
     
-    # Clear winner - no cross-validation needed
-    return {
-        'face_id': best['face']['id'],
-        'image_index': best['face']['image_index'],
-        'face_index': best['face']['face_index'],
-        'confidence': best['confidence'],
-        'margin': margin,
-        'cross_validated': False
-    }, None
+    return student_matrix
 
 
 # ===== API ENDPOINTS =====
 
-@app.get("/")
+@router.get("/")
 def root():
     return {
         "message": "Attendance Recognition API",
         "version": "2.0.0 (Early-Exit Matching)",
         "endpoints": {
             "health": "/health",
-            "attendance": "/api/v1/attendance"
+            "attendance": "/api/v1/attendance",
+            "attendance_stream": "/api/v1/attendance/stream (WebSocket)",
+            "attendance_sessions": "/api/v1/attendance/sessions",
+            "gallery": "/api/v1/gallery"
         }
     }
 
 
-@app.get("/health")
+@router.get("/health")
 def health_check():
     return {
         "status": "healthy",
-        "models_loaded": True
+        "models_loaded": True,
+        "models": default_registry.stats(),
+        "scheduler": default_scheduler.stats(),
+        "cpu_executor": default_cpu_executor.stats(),
+        "result_cache": default_result_cache.stats(),
+        "download_cache": default_downloader.cache.stats(),
+        "embedding_batcher": embedding_batcher_stats(),
+        "gallery": gallery.stats(),
+        "pipeline": orchestrator.pipeline.stats() if ATTENDANCE_EXECUTION_MODE == "pipeline" else None,
+        "workers": worker_pool.stats() if worker_pool is not None else None,
+        "streams": dict(stream_stats),
+        "attendance_sessions": default_session_store.stats()
     }
 
 
-@app.post("/api/v1/attendance", response_model=AttendanceResponse)
-def process_attendance(request: AttendanceRequest):
+# The gallery is per process: with SERVER_WORKERS > 1 an upsert would reach one worker only
+# (and every worker would write its own version to the same snapshot), so it is refused there
+
+@router.get("/api/v1/gallery", response_model=GalleryStatus)
+def gallery_status():
+    require_single_worker("Gallery endpoints", "send inline embeddings")
+    return GalleryStatus(**gallery.stats())
+
+
+@router.post("/api/v1/gallery/upsert", response_model=GalleryStatus)
+def gallery_upsert(request: GalleryUpsertRequest):
+    """Insert or replace student embeddings in the server-side gallery."""
+    require_single_worker("Gallery endpoints", "send inline embeddings")
+    try:
+        gallery.upsert({e.student_id: np.array(e.embedding, dtype=np.float32) for e in request.entries})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"Gallery upsert: {len(request.entries)} students (version={gallery.version})")
+    return GalleryStatus(**gallery.stats())
+
+
+@router.delete("/api/v1/gallery/{student_id}", response_model=GalleryStatus)
+def gallery_delete(student_id: str):
+    """Remove a student from the server-side gallery."""
+    require_single_worker("Gallery endpoints", "send inline embeddings")
+    if student_id not in gallery:
+        raise HTTPException(status_code=404, detail=f"Student {student_id} not in gallery")
+    
+    gallery.delete([student_id])
+    logger.info(f"Gallery delete: {student_id} (version={gallery.version})")
+    return GalleryStatus(**gallery.stats())
+
+
+@router.post("/api/v1/attendance", response_model=AttendanceResponse)
+async def process_attendance(request: AttendanceRequest):
     """
     Student-centric matching algorithm:
     1. Extract ALL faces from ALL images into one pool
     2. For EACH student, find their best match in the face pool
     3. Accept only if ONE face clearly matches (margin check)
     4. If multiple faces match → reject as ambiguous
+    5. Assign faces to accepted students globally (no roster-order dependence)
     """
     
     # Validate input
     if not (2 <= len(request.image_urls) <= 4):
         raise HTTPException(status_code=400, detail="Must provide between 2 and 4 image URLs")
     
-    if len(request.students) == 0:
-        raise HTTPException(status_code=400, detail="Must provide at least one student")
+    validate_params(request)
+    
+    # Resolve gallery references up front so a stale gallery fails before any inference
+    student_matrix = resolve_student_embeddings(request)
     
     logger.info(
         f"\n{'='*70}\n"
@@ -319,44 +481,328 @@ def process_attendance(request: AttendanceRequest):
     # STEP 1: Extract ALL faces from ALL images into one pool
     logger.info("\n[STEP 1] Extracting all faces from all images...")
     
-    face_pool = []  # List of {embedding, image_idx, face_idx}
-    total_images_processed = 0
+    urls = [str(url) for url in request.image_urls]
+    images = await extract_images(urls)
     
-    for img_idx, url in enumerate(request.image_urls):
-        logger.info(f"  Processing image {img_idx + 1}/{len(request.image_urls)}")
-        
-        try:
-            # Download and process
-            image_np = download_image_from_url(str(url))
-            face_tensors, num_faces = detector.return_tensors(image_np)
+    # STEP 2-3 are CPU-bound too
+    return await default_cpu_executor.run(
+        match_attendance, request, student_matrix,
+        [img_idx for img_idx, _ in images], [result for _, result in images]
+    )
+
+
+@router.post("/api/v1/attendance/sessions", response_model=SessionStatus)
+def open_session(params: AttendanceParams):
+    """
+    Open an incremental attendance session for one class.
+    
+    The roster (inline embeddings and/or gallery references) and thresholds are
+    sent once; gallery references are resolved now, so later gallery changes do
+    not affect an open session. Images are then posted to
+    /api/v1/attendance/sessions/{session_id}/images as they are taken. Sessions
+    expire ATTENDANCE_SESSION_TTL_S after their last request.
+    
+    Sessions live in the memory of the worker that opened them, and the workers of
+    server.py accept on shared sockets, so with SERVER_WORKERS > 1 a later request
+    would reach another worker: sessions are refused (503) there. To scale out, run
+    single-worker instances behind a balancer that routes by session_id.
+    """
+    require_single_worker("Attendance sessions", "use /api/v1/attendance")
+    validate_params(params)
+    student_matrix = resolve_student_embeddings(params)
+    
+    try:
+        session = default_session_store.create(params, student_matrix)
+    except SessionLimitReached as e:
+        raise HTTPException(status_code=503, detail=f"Server busy: {str(e)}")
+    
+    logger.info(f"Attendance session {session.session_id} opened: {len(params.students)} students")
+    return session_status(session)
+
+
+@router.post("/api/v1/attendance/sessions/{session_id}/images", response_model=AttendanceResponse)
+async def add_session_images(session_id: str, request: SessionImagesRequest):
+    """
+    Add images to a session and return the updated attendance over all of its images.
+    
+    Only the new images are downloaded and run through detection + ArcFace (result
+    cache first); their faces are appended to the session's face pool, which costs
+    one (S, N) and one (F, N) similarity product - nothing already in the pool is
+    recomputed. image_index continues across posts.
+    """
+    session = get_session(session_id)
+    
+    if not (1 <= len(request.image_urls) <= ATTENDANCE_SESSION_MAX_IMAGES):
+        raise HTTPException(status_code=400, detail=f"Must provide between 1 and {ATTENDANCE_SESSION_MAX_IMAGES} image URLs")
+    
+    urls = [str(url) for url in request.image_urls]
+    images = await extract_images(urls)
+    
+    # Indices are claimed only once extraction succeeded, so a failed post leaves no gap
+    first_index = session.reserve_images(len(urls))
+    logger.info(f"Attendance session {session_id}: images {first_index + 1}-{first_index + len(urls)}")
+    images = [(first_index + img_idx, result) for img_idx, result in images]
+    
+    return await default_cpu_executor.run(add_to_session, session, images)
+
+
+@router.get("/api/v1/attendance/sessions/{session_id}", response_model=AttendanceResponse)
+def session_attendance(session_id: str):
+    """Current attendance of a session (recomputed only if faces were added since the last call)."""
+    return session_response(get_session(session_id))
+
+
+@router.delete("/api/v1/attendance/sessions/{session_id}", response_model=AttendanceResponse)
+def close_session(session_id: str):
+    """Close a session and return its final attendance."""
+    session = default_session_store.close(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Attendance session {session_id} not found or expired")
+    
+    logger.info(f"Attendance session {session_id} closed: {session.stats()}")
+    return session_response(session)
+
+
+def get_session(session_id: str) -> AttendanceSession:
+    session = default_session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Attendance session {session_id} not found or expired")
+    return session
+
+
+def session_status(session: AttendanceSession) -> SessionStatus:
+    stats = session.stats()
+    return SessionStatus(
+        session_id=session.session_id,
+        images_posted=stats["images_posted"],
+        images_with_faces=stats["images_with_faces"],
+        faces=stats["faces"],
+        students=stats["students"],
+        ttl_s=default_session_store.ttl_s
+    )
+
+
+def add_to_session(session: AttendanceSession, images: List[tuple]) -> AttendanceResponse:
+    """Append the faces of newly processed images to the session pool, then re-match."""
+    for img_idx, result in images:
+        num_faces = session.add_image(img_idx, result["embeddings"])
+        if num_faces == 0:
+            logger.warning(f"    Image {img_idx + 1}: No faces detected")
+        else:
+            logger.info(f"    Image {img_idx + 1}: Detected {num_faces} faces")
+    
+    return session_response(session)
+
+
+def session_response(session: AttendanceSession) -> AttendanceResponse:
+    """
+    Attendance over the session's face pool, from the cached similarity matrices.
+    Memoized per pool version, so reads between posts do no matching at all.
+    """
+    memo = session.result
+    if memo is not None and memo[0] == session.pool.version:
+        return memo[1]
+    
+    version, face_pool, sim, face_sim = session.pool.snapshot()
+    if not face_pool:
+        sim = face_sim = None
+    response = match_face_pool(session.params, face_pool, sim, face_sim, session.images_with_faces)
+    session.result = (version, response)
+    return response
+
+
+@router.websocket("/api/v1/attendance/stream")
+async def stream_attendance(websocket: WebSocket):
+    """
+    Streaming attendance for one class session over a WebSocket.
+    
+    1. Client sends the roster and thresholds as JSON (same fields as
+       /api/v1/attendance, without image_urls)
+    2. Client sends frames as binary messages (encoded JPEG/PNG); each gets a JSON
+       progress reply: faces, tracks, embeddings computed, newly identified students
+    3. Client sends {"action": "finish"}; the server replies with the attendance
+       response (tracks take the place of faces, "image_index" is the frame a
+       track was embedded at, "face_index" its track id) and closes
+    
+    Faces are tracked across frames and embedded at their best view only, so a
+    whole lecture of continuous capture costs about one ArcFace run per person.
+    Frames of a session are processed one at a time: a client sending faster than
+    the server keeps up is held back by the socket rather than queueing frames.
+    """
+    await websocket.accept()
+    
+    try:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        if message.get("text") is None:
+            raise ValueError("expected a JSON text message before any frame")
+        params = AttendanceParams(**json.loads(message["text"]))
+        validate_params(params)
+        student_matrix = resolve_student_embeddings(params)
+    except WebSocketDisconnect:
+        return
+    except (ValidationError, ValueError, TypeError) as e:
+        await websocket.send_json({"error": f"Invalid session parameters: {str(e)}"})
+        await websocket.close(code=1008)
+        return
+    except HTTPException as e:
+        await websocket.send_json({"error": e.detail, "status_code": e.status_code})
+        await websocket.close(code=1008)
+        return
+    
+    session = StreamSession(student_matrix)
+    reported = set()  # student indices already sent as newly identified
+    stream_stats["active"] += 1
+    logger.info(f"Stream session started: {len(params.students)} students")
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                logger.info(f"Stream session dropped after {session.frames} frames")
+                return
             
-            if num_faces == 0:
-                logger.warning(f"    No faces detected")
+            if message.get("bytes") is not None:
+                data = message["bytes"]
+                if len(data) > STREAM_MAX_FRAME_MB * 1e6:
+                    await websocket.send_json({"error": f"Frame larger than {STREAM_MAX_FRAME_MB} MB"})
+                    continue
+                try:
+                    progress = await default_cpu_executor.run(process_stream_frame, session, params, reported, data)
+                except Exception as e:
+                    logger.error(f"    Frame {session.frames + 1}: {str(e)}")
+                    await websocket.send_json({"error": f"Failed to process frame: {str(e)}"})
+                    continue
+                stream_stats["frames"] += 1
+                await websocket.send_json(progress)
                 continue
             
-            total_images_processed += 1
-            logger.info(f"    Detected {num_faces} faces")
-            
-            # Convert to NHWC and embed
-            faces_nhwc = np.transpose(face_tensors, (0, 2, 3, 1))
-            embeddings = embedder.embed(faces_nhwc)
-            
-            # Add to face pool
-            for face_idx, embedding in enumerate(embeddings):
-                embedding = validate_and_normalize(embedding)
-                face_pool.append({
-                    'embedding': embedding,
-                    'image_index': img_idx,
-                    'face_index': face_idx,
-                    'id': f"img{img_idx}_face{face_idx}"
-                })
+            if is_finish_message(message.get("text")):
+                break
+            await websocket.send_json({"error": 'Expected a binary frame or {"action": "finish"}'})
         
-        except Exception as e:
-            logger.error(f"    Error: {str(e)}")
+        response = await default_cpu_executor.run(finish_stream, session, params)
+        await websocket.send_json(response)
+        await websocket.close()
+        stream_stats["completed"] += 1
+    
+    except WebSocketDisconnect:
+        logger.info(f"Stream session dropped after {session.frames} frames")
+    finally:
+        stream_stats["active"] -= 1
+
+
+def is_finish_message(text: Optional[str]) -> bool:
+    try:
+        return json.loads(text).get("action") == "finish"
+    except (TypeError, ValueError, AttributeError):
+        return False
+
+
+def process_stream_frame(session: StreamSession, params: AttendanceParams, reported: set, data: bytes) -> Dict[str, Any]:
+    """One frame through the session; students are re-identified only when new embeddings came in."""
+    progress = session.process_frame(data)
+    
+    newly_identified = []
+    if progress["embeddings_computed"]:
+        assigned = session.identify(
+            params.similarity_threshold,
+            params.margin_threshold,
+            params.min_absolute_similarity,
+            params.assignment_method
+        )
+        new = sorted(set(assigned) - reported)
+        reported.update(new)
+        newly_identified = [params.students[s_idx].student_id for s_idx in new]
+    
+    progress["newly_identified"] = newly_identified
+    progress["students_identified"] = len(reported)
+    return progress
+
+
+def finish_stream(session: StreamSession, params: AttendanceParams) -> Dict[str, Any]:
+    """Final attendance over every embedded track of the session."""
+    logger.info(f"Stream session finished: {session.stats()}")
+    
+    face_pool = [
+        {'image_index': column['frame_index'], 'face_index': column['track_id'], 'id': f"track{column['track_id']}"}
+        for column in session.columns
+    ]
+    sim, face_sim = session.similarities() if face_pool else (None, None)
+    response = match_face_pool(params, face_pool, sim, face_sim, session.frames)
+    return {**response.model_dump(), "stream": session.stats()}
+
+
+def match_attendance(
+    request: AttendanceRequest,
+    student_matrix: np.ndarray,
+    image_indices: List[int],
+    results: List[Dict[str, Any]]
+) -> AttendanceResponse:
+    """
+    Pool the faces of all processed images and match the students against them.
+    
+    Args:
+        request: the attendance request
+        student_matrix: (S, 512) normalized student embeddings
+        image_indices: request index of each image that was downloaded
+        results: orchestrator result per downloaded image
+    """
+    
+    face_pool = []  # List of {image_index, face_index, id}, row-aligned with face_embeddings
+    face_embeddings = []  # List of (N_i, 512) arrays, one per image
+    total_images_processed = 0
+    
+    for img_idx, result in zip(image_indices, results):
+        num_faces = result["num_faces"]
+        
+        if num_faces == 0:
+            logger.warning(f"    Image {img_idx + 1}: No faces detected")
             continue
+        
+        total_images_processed += 1
+        logger.info(f"    Image {img_idx + 1}: Detected {num_faces} faces")
+        
+        # Add to face pool
+        for face_idx in range(num_faces):
+            face_pool.append({
+                'image_index': img_idx,
+                'face_index': face_idx,
+                'id': f"img{img_idx}_face{face_idx}"
+            })
+        face_embeddings.append(result["embeddings"])
     
     logger.info(f"\n✓ Total faces extracted: {len(face_pool)}")
     
+    if face_pool:
+        face_matrix = normalize_rows(np.concatenate(face_embeddings, axis=0))  # (F, 512)
+        sim = similarity_matrix(student_matrix, face_matrix)  # (S, F)
+        face_sim = similarity_matrix(face_matrix, face_matrix)  # (F, F)
+    else:
+        sim = face_sim = None
+    
+    return match_face_pool(request, face_pool, sim, face_sim, total_images_processed)
+
+
+def match_face_pool(
+    request: AttendanceParams,
+    face_pool: List[Dict[str, Any]],
+    sim: Optional[np.ndarray],
+    face_sim: Optional[np.ndarray],
+    total_images_processed: int
+) -> AttendanceResponse:
+    """
+    STEP 2-3: gate and assign students over a face pool and build the response.
+    
+    Args:
+        request: students, thresholds and assignment method
+        face_pool: {image_index, face_index, id} per face
+        sim: (S, F) student x face similarities (None if the pool is empty)
+        face_sim: (F, F) face x face similarities
+        total_images_processed: images (or frames) the pool came from
+    """
+    
     if len(face_pool) == 0:
         logger.warning("No faces detected in any image!")
         return AttendanceResponse(
@@ -371,53 +817,67 @@ def process_attendance(request: AttendanceRequest):
             rejected_matches=[]
         )
     
-    # STEP 2: For each student, find their match in the face pool
+    # STEP 2: Score all students against the whole face pool at once
+    # STEP 3: Resolve face conflicts globally instead of first-come-first-served
     logger.info(f"\n[STEP 2] Matching {len(request.students)} students against {len(face_pool)} faces...")
+
+    matches, face_for_student = match_and_assign(
+        sim,
+        face_sim,
+        request.similarity_threshold,
+        request.margin_threshold,
+        request.min_absolute_similarity,
+        request.assignment_method
+    )
+    
+    logger.info(f"\n[STEP 3] Assignment ({request.assignment_method}): {len(face_for_student)} students assigned")
     
     present_students = []
     rejected_matches = []
     matched_face_ids = set()  # Track which faces have been assigned
     
-    for student in request.students:
-        student_embedding = validate_and_normalize(np.array(student.embedding, dtype=np.float32))
+    for s_idx, student in enumerate(request.students):
+        if not matches['has_candidate'][s_idx]:
+            continue
         
-        logger.info(f"\n  Checking student: {student.name} ({student.student_id})")
+        margin = float(matches['margin'][s_idx])
         
-        # Use cross-validation matching
-        match, rejection = match_student_with_cross_validation(
-            student_embedding,
-            face_pool,
-            request.similarity_threshold,
-            request.margin_threshold,
-            request.min_absolute_similarity,
-            cross_validation_threshold=0.75  # Faces must be 75%+ similar to be "same person"
-        )
+        if matches['below_threshold'][s_idx]:
+            logger.warning(
+                f"    ✗ REJECTED {student.name} ({student.student_id}): "
+                f"Confidence {matches['confidence'][s_idx]:.3f} below threshold"
+            )
+            continue
         
-        if match:
-            # Check if already assigned
-            if match['face_id'] in matched_face_ids:
-                logger.warning(f"    ✗ Face already assigned")
-                continue
-            
-            matched_face_ids.add(match['face_id'])
-            
-            cross_val_note = " [CROSS-VALIDATED]" if match.get('cross_validated') else ""
-            logger.info(f"    ✓ MATCH: {student.name} → {match['face_id']}{cross_val_note}")
-            
-            present_students.append(StudentMatch(
-                student_id=student.student_id,
-                name=student.name,
-                roll_number=student.roll_number,
-                confidence=match['confidence'],
-                margin=match['margin'],
-                image_index=match['image_index'],
-                face_index=match['face_index'],
-                second_best_confidence=None
-            ))
+        if matches['ambiguous'][s_idx]:
+            logger.warning(
+                f"    ✗ REJECTED {student.name} ({student.student_id}): Ambiguous: margin={margin:.3f}, "
+                f"faces are different (cross-sim={matches['face_similarity'][s_idx]:.3f})"
+            )
+            continue
         
-        elif rejection:
-            logger.warning(f"    ✗ REJECTED: {rejection['rejection_reason']}")
-
+        if s_idx not in face_for_student:
+            logger.warning(f"    ✗ {student.name}: All candidate faces assigned to better matches")
+            continue
+        
+        f_idx = face_for_student[s_idx]
+        face = face_pool[f_idx]
+        matched_face_ids.add(face['id'])
+        
+        cross_val_note = " [CROSS-VALIDATED]" if matches['cross_validated'][s_idx] else ""
+        logger.info(f"    ✓ MATCH: {student.name} → {face['id']}{cross_val_note}")
+        
+        present_students.append(StudentMatch(
+            student_id=student.student_id,
+            name=student.name,
+            roll_number=student.roll_number,
+            # Both of the assigned face, which need not be the student's best (see match_and_assign)
+            confidence=float(matches['assigned_confidence'][s_idx]),
+            margin=float(matches['assigned_margin'][s_idx]),
+            image_index=face['image_index'],
+            face_index=face['face_index'],
+            second_best_confidence=None
+        ))
 
     # Calculate statistics
     total_identified = len(present_students)
@@ -461,6 +921,12 @@ def process_attendance(request: AttendanceRequest):
         rejected_matches=rejected_matches
     )
     
+# ===== STANDALONE APP =====
+# (python attendance_api.py / uvicorn attendance_api:app)
+app = FastAPI(title="Attendance Recognition API", version="2.0.0")
+app.include_router(router)
+
+
 # ===== RUN SERVER =====
 if __name__ == "__main__":
     import uvicorn
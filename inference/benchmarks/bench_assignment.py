@@ -0,0 +1,52 @@
+# Time per request of matching + assignment for roster sizes 30-1000
+# Run from inference/: python -m benchmarks.bench_assignment
+import time
+import numpy as np
+from facerec.matching import normalize_rows, similarity_matrix, match_students
+from facerec.assignment import ASSIGNERS
+
+ROSTER_SIZES = [30, 60, 120, 250, 500, 1000]
+ATTENDANCE = 0.8     # fraction of the roster present in the photos
+PHOTOS = 3           # each present student appears once per photo
+REPEATS = 20
+
+
+def synthetic_request(num_students: int, rng: np.random.Generator):
+    gallery = normalize_rows(rng.normal(size=(num_students, 512)), warn=False)
+    present = rng.choice(num_students, int(num_students * ATTENDANCE), replace=False)
+    faces = np.repeat(gallery[present], PHOTOS, axis=0)
+    faces = normalize_rows(faces + rng.normal(scale=0.03, size=faces.shape), warn=False)
+    return gallery, faces
+
+
+def time_ms(fn, repeats: int = REPEATS) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'students':>8} {'faces':>6} {'match ms':>9} " + " ".join(f"{m + ' ms':>13}" for m in ASSIGNERS))
+
+    for n in ROSTER_SIZES:
+        gallery, faces = synthetic_request(n, rng)
+
+        def run_match():
+            sim = similarity_matrix(gallery, faces)
+            face_sim = similarity_matrix(faces, faces)
+            return sim, match_students(sim, face_sim, 0.70, 0.15, 0.65)
+
+        sim, matches = run_match()
+        eligible = matches["accepted"][:, None] & (sim >= 0.70)
+
+        match_ms = time_ms(run_match)
+        assign_ms = [time_ms(lambda fn=fn: fn(sim, eligible)) for fn in ASSIGNERS.values()]
+
+        print(f"{n:>8} {faces.shape[0]:>6} {match_ms:>9.2f} " + " ".join(f"{t:>13.2f}" for t in assign_ms))
+
+
+if __name__ == "__main__":
+    main()
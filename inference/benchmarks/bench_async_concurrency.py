@@ -0,0 +1,98 @@
+# Concurrency check for the async endpoints: a burst of registrations whose photos come from a slow
+# image host must not hold up /health or registrations whose photos come from a fast host.
+# Run from inference/: python -m benchmarks.bench_async_concurrency
+import math
+import socket
+import threading
+import time
+import numpy as np
+import requests
+import uvicorn
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.local_image_server import LocalImageServer, UPLOADS_DIR
+from facerec.config import DOWNLOAD_PER_HOST_LIMIT
+
+SLOW_LATENCY = 2.0     # s per image on the slow host
+SLOW_REQUESTS = 48     # more than FastAPI's 40 threadpool tokens a sync handler would hold
+FAST_REQUESTS = 8
+HEALTH_INTERVAL = 0.05
+
+
+def start_server():
+    """The unified app on a free local port, served from a background thread."""
+    import server as unified
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    srv = uvicorn.Server(uvicorn.Config(unified.app, log_level="warning"))
+    thread = threading.Thread(target=srv.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not srv.started:
+        time.sleep(0.05)
+    return srv, thread, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def register(base, urls, student_id):
+    start = time.perf_counter()
+    response = requests.post(
+        f"{base}/api/v1/register",
+        json={"student_id": student_id, "name": student_id, "image_urls": urls},
+        timeout=600
+    )
+    return time.perf_counter() - start, response.status_code
+
+
+def main():
+    names = sorted(p.name for p in UPLOADS_DIR.glob("*.jpg"))
+    srv, thread, base = start_server()
+
+    with LocalImageServer(latency=SLOW_LATENCY) as slow, LocalImageServer() as fast:
+        register(base, [fast.url(names[0]), fast.url(names[1])], "warmup")
+
+        health_ms, stop = [], threading.Event()
+
+        def poll_health():
+            while not stop.is_set():
+                start = time.perf_counter()
+                requests.get(f"{base}/health", timeout=60)
+                health_ms.append((time.perf_counter() - start) * 1000)
+                time.sleep(HEALTH_INTERVAL)
+
+        poller = threading.Thread(target=poll_health, daemon=True)
+        poller.start()
+
+        burst_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=SLOW_REQUESTS) as clients:
+            slow_jobs = [
+                clients.submit(register, base, [slow.url(names[(2 * i) % len(names)]), slow.url(names[(2 * i + 1) % len(names)])], f"slow{i}")
+                for i in range(SLOW_REQUESTS)
+            ]
+            time.sleep(0.5)  # let the burst occupy the server
+
+            fast_results = [
+                register(base, [fast.url(names[i % len(names)]), fast.url(names[(i + 1) % len(names)])], f"fast{i}")
+                for i in range(FAST_REQUESTS)
+            ]
+            slow_results = [job.result() for job in slow_jobs]
+        burst_s = time.perf_counter() - burst_start
+
+        stop.set()
+        poller.join()
+
+    fast_ms = np.array([elapsed for elapsed, _ in fast_results]) * 1000
+    bound_s = math.ceil(2 * SLOW_REQUESTS / DOWNLOAD_PER_HOST_LIMIT) * SLOW_LATENCY
+    statuses = sorted({code for _, code in fast_results + slow_results})
+
+    print(f"{SLOW_REQUESTS} registrations from a {SLOW_LATENCY:.1f}s/image host, {FAST_REQUESTS} from a fast host meanwhile")
+    print(f"  fast registrations  p50 {np.percentile(fast_ms, 50):8.0f} ms   p99 {np.percentile(fast_ms, 99):8.0f} ms")
+    print(f"  /health             p50 {np.percentile(health_ms, 50):8.0f} ms   p99 {np.percentile(health_ms, 99):8.0f} ms")
+    print(f"  slow burst          {burst_s:8.1f} s  (per-host limit bound {bound_s:.1f} s)")
+    print(f"  status codes        {statuses}")
+
+    srv.should_exit = True
+    thread.join()
+
+
+if __name__ == "__main__":
+    main()
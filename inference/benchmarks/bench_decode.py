@@ -0,0 +1,62 @@
+# Decode latency over server/uploads: PIL bytes -> RGB vs decode_rgb at full and reduced JPEG scale
+# Run from inference/: python -m benchmarks.bench_decode
+import time
+import cv2
+import numpy as np
+from io import BytesIO
+from PIL import Image
+from benchmarks.local_image_server import UPLOADS_DIR
+from face.vision_support.decode import REDUCED_FLAGS, decode_rgb, image_info, reduction_factor
+from facerec.config import ATTENDANCE_DECODE_LONG_SIDE, REGISTRATION_DECODE_LONG_SIDE
+
+REPEATS = 5
+
+
+def pil_decode(data: bytes) -> np.ndarray:
+    # Previous download path: PIL decode, RGB convert, copy into a numpy array
+    img = Image.open(BytesIO(data))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return np.array(img)
+
+
+def bench(decode, images):
+    """Mean ms per image and mean output megapixels."""
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        outputs = [decode(data) for data in images]
+    ms = (time.perf_counter() - start) / (REPEATS * len(images)) * 1000
+    return ms, np.mean([o.shape[0] * o.shape[1] for o in outputs]) / 1e6
+
+
+def main():
+    images = [path.read_bytes() for path in sorted(UPLOADS_DIR.glob("*.jpg"))]
+    sizes = [image_info(data)[1:] for data in images]
+    print(f"{len(images)} images, {np.mean([w * h for w, h in sizes]) / 1e6:.1f} MP on average")
+
+    setups = [
+        ("PIL + np.array", pil_decode),
+        ("decode_rgb full", lambda data: decode_rgb(data)),
+        (f"decode_rgb >= {ATTENDANCE_DECODE_LONG_SIDE}px", lambda data: decode_rgb(data, ATTENDANCE_DECODE_LONG_SIDE)),
+        (f"decode_rgb >= {REGISTRATION_DECODE_LONG_SIDE}px", lambda data: decode_rgb(data, REGISTRATION_DECODE_LONG_SIDE)),
+    ] + [
+        # Fixed reduction for every image, to show what the DCT-domain scaling itself costs
+        (f"IMREAD_REDUCED 1/{factor}", lambda data, factor=factor: cv2.imdecode(np.frombuffer(data, np.uint8), REDUCED_FLAGS[factor]))
+        for factor in (2, 4, 8)
+    ]
+
+    print(f"{'decode':>24} {'ms/image':>9} {'out MP':>7} {'speedup':>8}")
+    baseline = None
+    for name, decode in setups:
+        ms, mp = bench(decode, images)
+        baseline = baseline or ms
+        print(f"{name:>24} {ms:>9.2f} {mp:>7.2f} {baseline / ms:>7.2f}x")
+
+    for target in (ATTENDANCE_DECODE_LONG_SIDE, REGISTRATION_DECODE_LONG_SIDE):
+        factors = [reduction_factor(w, h, target) for w, h in sizes]
+        counts = {f: factors.count(f) for f in sorted(set(factors))}
+        print(f"  reduction factors at >= {target}px: {counts}")
+
+
+if __name__ == "__main__":
+    main()
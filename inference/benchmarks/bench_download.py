@@ -0,0 +1,54 @@
+# End-to-end download + decode latency for 4 URLs: bare requests.get vs pooled concurrent downloader
+# Run from inference/: python -m benchmarks.bench_download
+import time
+import numpy as np
+import requests
+from io import BytesIO
+from PIL import Image
+from benchmarks.local_image_server import LocalImageServer, UPLOADS_DIR
+from facerec.downloader import ImageDownloader
+
+NUM_URLS = 4
+LATENCIES = [0.0, 0.05, 0.2]   # simulated server latency per request (s)
+REPEATS = 5
+
+
+def sequential_baseline(urls):
+    # What both APIs did before: fresh connection per image, one after another
+    images = []
+    for url in urls:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        images.append(np.array(Image.open(BytesIO(response.content)).convert('RGB')))
+    return images
+
+
+def main():
+    names = sorted(p.name for p in UPLOADS_DIR.glob("*.jpg"))[:NUM_URLS]
+    print(f"{'latency ms':>10} {'sequential ms':>14} {'pooled ms':>10} {'connections':>12}")
+
+    for latency in LATENCIES:
+        with LocalImageServer(latency=latency) as server:
+            urls = [server.url(name) for name in names]
+            downloader = ImageDownloader()
+
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                sequential_baseline(urls)
+            sequential_ms = (time.perf_counter() - start) / REPEATS * 1000
+
+            downloader.fetch_all(urls)  # warm the pool
+            connections_before = server.connections
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                downloader.fetch_all(urls)
+            pooled_ms = (time.perf_counter() - start) / REPEATS * 1000
+            new_connections = server.connections - connections_before
+
+            downloader.close()
+
+        print(f"{latency * 1000:>10.0f} {sequential_ms:>14.1f} {pooled_ms:>10.1f} {new_connections:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Repeat downloads of the same URLs: no cache vs the shared on-disk HTTPCache (revalidated / fresh).
+# Two downloaders share one cache directory, like the registration and attendance services on a node.
+# Run from inference/: python -m benchmarks.bench_download_cache
+import tempfile
+import time
+from benchmarks.local_image_server import LocalImageServer, UPLOADS_DIR
+from facerec.downloader import ImageDownloader
+from facerec.http_cache import HTTPCache
+
+LATENCY = 0.05   # simulated server latency per request (s)
+REPEATS = 3
+CACHE_CONTROLS = [None, "max-age=3600"]   # stand-in without / with a freshness lifetime
+
+
+def timed_fetch(downloader, urls):
+    start = time.perf_counter()
+    for future in downloader.submit_all(urls, decode=False):
+        future.result()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    names = sorted(p.name for p in UPLOADS_DIR.glob("*.jpg"))
+    print(f"{len(names)} images, {LATENCY * 1000:.0f} ms server latency")
+    print(f"{'setup':>28} {'first ms':>9} {'repeat ms':>10} {'200s':>6} {'304s':>6}")
+
+    with LocalImageServer(latency=LATENCY) as server:
+        urls = [server.url(name) for name in names]
+        plain = ImageDownloader()
+        first_ms = timed_fetch(plain, urls)
+        server.responses.clear()
+        repeat_ms = sum(timed_fetch(plain, urls) for _ in range(REPEATS)) / REPEATS
+        print(f"{'no cache':>28} {first_ms:>9.1f} {repeat_ms:>10.1f} {server.responses[200]:>6} {server.responses[304]:>6}")
+        plain.close()
+
+    for cache_control in CACHE_CONTROLS:
+        with tempfile.TemporaryDirectory() as cache_dir, LocalImageServer(latency=LATENCY, cache_control=cache_control) as server:
+            urls = [server.url(name) for name in names]
+            registration = ImageDownloader(cache=HTTPCache(cache_dir))
+            attendance = ImageDownloader(cache=HTTPCache(cache_dir))
+
+            first_ms = timed_fetch(registration, urls)
+            server.responses.clear()
+            repeat_ms = sum(timed_fetch(attendance, urls) for _ in range(REPEATS)) / REPEATS
+
+            label = f"shared cache ({cache_control or 'revalidate'})"
+            print(f"{label:>28} {first_ms:>9.1f} {repeat_ms:>10.1f} {server.responses[200]:>6} {server.responses[304]:>6}")
+            print(f"{'':>28} second service: {attendance.cache.stats()}")
+            registration.close()
+            attendance.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Detector input size vs latency / recall on server/uploads
+# Run from inference/: python -m benchmarks.bench_letterbox
+import time
+import numpy as np
+from benchmarks.local_image_server import UPLOADS_DIR
+from face.vision_support.frame_renderer import PhotoFrameReader
+from facerec import scrfd
+from facerec.config import MODEL_PATH_FACEREC
+
+INPUT_SIZES = [None, 1920, 1280, 960, 640]   # None = native resolution
+MATCH_DIST = 0.25                            # landmark match radius, as a fraction of eye distance
+
+
+def preprocess(img: np.ndarray) -> np.ndarray:
+    blob = img.astype(np.float32)
+    blob -= 127.5
+    blob /= 128.0
+    return np.transpose(blob, (2, 0, 1))[None, ...]
+
+
+def prepare(image_np: np.ndarray, size):
+    if size is None:
+        return image_np, 1.0
+    return scrfd.letterbox(image_np, size)
+
+
+def label(size) -> str:
+    return "native" if size is None else str(size)
+
+
+def tensor_report(images):
+    print(f"{'input':>7} {'avg tensor MB':>14} {'avg prep ms':>12}")
+    for size in INPUT_SIZES:
+        mb, ms = [], []
+        for image_np in images:
+            start = time.perf_counter()
+            canvas, _ = prepare(image_np, size)
+            blob = preprocess(canvas)
+            ms.append((time.perf_counter() - start) * 1000)
+            mb.append(blob.nbytes / 1e6)
+        print(f"{label(size):>7} {np.mean(mb):>14.1f} {np.mean(ms):>12.1f}")
+
+
+def recall_report(images):
+    from facerec.multi_face_extractor import MultiFaceExtractor
+
+    detector = MultiFaceExtractor(debug=False, enable_quality_filter=False, input_size=None)
+
+    reference = [detector.detect(image_np) for image_np in images]  # native-resolution detections
+    total_ref = sum(len(r) for r in reference)
+
+    print(f"\n{'input':>7} {'avg detect ms':>14} {'faces':>6} {'recall vs native':>17}")
+    for size in INPUT_SIZES:
+        detector.input_size = size
+        found, hits, ms = 0, 0, []
+        for image_np, ref in zip(images, reference):
+            start = time.perf_counter()
+            dets = detector.detect(image_np)
+            ms.append((time.perf_counter() - start) * 1000)
+            found += len(dets)
+
+            for _, ref_lm in ref:
+                eye_dist = np.linalg.norm(ref_lm[1] - ref_lm[0])
+                if any(np.abs(lm - ref_lm).max() <= MATCH_DIST * eye_dist for _, lm in dets):
+                    hits += 1
+
+        recall = hits / total_ref if total_ref else 1.0
+        print(f"{label(size):>7} {np.mean(ms):>14.1f} {found:>6} {recall:>17.3f}")
+
+
+def main():
+    reader = PhotoFrameReader()
+    images = [reader.read(str(path)) for path in sorted(UPLOADS_DIR.glob("*.jpg"))]
+    print(f"{len(images)} images, sizes: {sorted({img.shape[:2] for img in images})}\n")
+
+    tensor_report(images)
+
+    if MODEL_PATH_FACEREC.exists():
+        recall_report(images)
+    else:
+        print(f"\n{MODEL_PATH_FACEREC} not found, skipping latency/recall of the detector pass")
+
+
+if __name__ == "__main__":
+    main()
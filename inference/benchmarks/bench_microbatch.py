@@ -0,0 +1,67 @@
+# Load test: ArcFace latency vs throughput for concurrent requests, direct embed() vs the cross-request MicroBatcher
+# Run from inference/: python -m benchmarks.bench_microbatch
+import threading
+import time
+import numpy as np
+from facerec.batcher import MicroBatcher
+from facerec.registry import default_registry
+
+CONCURRENCY = [1, 2, 4, 8, 16, 32]   # closed-loop clients
+DURATION_S = 5.0
+CROPS_PER_REQUEST = (1, 8)           # uniform range, like small classroom photos
+MAX_WAIT_MS = [2.0, 5.0, 10.0]
+
+
+def load_test(embed, clients, rng_seed=0):
+    """Each client sends requests back to back for DURATION_S; returns (req/s, crops/s, p50 ms, p99 ms)."""
+    latencies, crops = [], [0]
+    lock = threading.Lock()
+    stop = time.perf_counter() + DURATION_S
+
+    def client(seed):
+        rng = np.random.default_rng(seed)
+        pool = rng.uniform(-1, 1, (CROPS_PER_REQUEST[1], 112, 112, 3)).astype(np.float32)
+        while time.perf_counter() < stop:
+            n = int(rng.integers(CROPS_PER_REQUEST[0], CROPS_PER_REQUEST[1] + 1))
+            start = time.perf_counter()
+            embed(pool[:n])
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                crops[0] += n
+
+    threads = [threading.Thread(target=client, args=(rng_seed + i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return len(latencies) / elapsed, crops[0] / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    embedder = default_registry.get("embedder")
+    embedder.embed(np.zeros((8, 112, 112, 3), dtype=np.float32))  # warm up
+
+    print(f"{'mode':>16} {'clients':>8} {'req/s':>8} {'crops/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'fill':>6} {'req/batch':>9} {'queue p99':>9}")
+    for clients in CONCURRENCY:
+        rps, cps, p50, p99 = load_test(embedder.embed, clients)
+        print(f"{'direct':>16} {clients:>8} {rps:>8.1f} {cps:>8.1f} {p50:>8.1f} {p99:>8.1f}")
+
+        for max_wait_ms in MAX_WAIT_MS:
+            batcher = MicroBatcher(embedder, max_wait_ms=max_wait_ms)
+            rps, cps, p50, p99 = load_test(batcher.embed, clients)
+            stats = batcher.stats()
+            batcher.close()
+            label = f"batched {max_wait_ms:g}ms"
+            print(
+                f"{label:>16} {clients:>8} {rps:>8.1f} {cps:>8.1f} {p50:>8.1f} {p99:>8.1f} "
+                f"{stats['avg_fill']:>6.2f} {stats['avg_requests_per_batch']:>9.1f} {stats['queue_delay_p99_ms']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
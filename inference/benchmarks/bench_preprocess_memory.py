@@ -0,0 +1,73 @@
+# Per-request memory of detector preprocessing: legacy copies vs pooled zero-copy path
+# Run from inference/: python -m benchmarks.bench_preprocess_memory
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from benchmarks.local_image_server import UPLOADS_DIR
+from facerec import scrfd, preprocess
+from facerec.config import DETECTOR_INPUT_SIZE, MODEL_PATH_FACEREC
+from facerec.downloader import decode_image
+from face.vision_support.frame_renderer import PhotoFrameReader
+
+REQUESTS = 20
+
+
+def legacy_request(image_np: np.ndarray) -> np.ndarray:
+    # Previous path: PhotoFrameReader cvtColor copy, astype copy, transposed view copied again by ORT
+    img = cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB)
+    canvas, _ = scrfd.letterbox(img, DETECTOR_INPUT_SIZE)
+    blob = canvas.astype(np.float32)
+    blob -= 127.5
+    blob /= 128.0
+    return np.ascontiguousarray(np.transpose(blob, (2, 0, 1))[None, ...])
+
+
+def pooled_request(image_np: np.ndarray, reader: PhotoFrameReader) -> float:
+    img = reader.read(image_np)
+    canvas, _ = scrfd.letterbox(img, DETECTOR_INPUT_SIZE)
+    with preprocess.default_pool.borrow((1, 3, DETECTOR_INPUT_SIZE, DETECTOR_INPUT_SIZE)) as blob:
+        preprocess.blob_from_images([canvas], blob)
+        return float(blob[0, 0, 0, 0])
+
+
+def measure(fn, images):
+    """(peak MB above baseline per request, ms per request)"""
+    peaks, times = [], []
+    for i in range(REQUESTS):
+        image_np = images[i % len(images)]
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn(image_np)
+        times.append((time.perf_counter() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+        tracemalloc.stop()
+    return np.mean(peaks), np.mean(times)
+
+
+def main():
+    images = [decode_image(path.read_bytes()) for path in sorted(UPLOADS_DIR.glob("*.jpg"))]
+    reader = PhotoFrameReader()
+    print(f"{len(images)} images, {REQUESTS} requests each, detector input {DETECTOR_INPUT_SIZE}\n")
+
+    pooled_request(images[0], reader)  # warm the pool
+
+    print(f"{'path':>8} {'peak MB/request':>16} {'ms/request':>11}")
+    for name, fn in [("legacy", legacy_request), ("pooled", lambda img: pooled_request(img, reader))]:
+        peak, ms = measure(fn, images)
+        print(f"{name:>8} {peak:>16.1f} {ms:>11.1f}")
+
+    print(f"\npool: {preprocess.default_pool.stats()}")
+
+    if MODEL_PATH_FACEREC.exists():
+        from facerec.multi_face_extractor import MultiFaceExtractor
+
+        detector = MultiFaceExtractor(debug=False, enable_quality_filter=False)
+        peak, ms = measure(detector.detect, images)
+        print(f"\nfull detect (IOBinding): {peak:.1f} peak MB/request, {ms:.1f} ms/request")
+    else:
+        print(f"\n{MODEL_PATH_FACEREC} not found, skipping the full detect pass")
+
+
+if __name__ == "__main__":
+    main()
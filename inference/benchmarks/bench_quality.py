@@ -0,0 +1,75 @@
+# Per-face legacy quality checks vs batched quality.score_faces at 50+ candidates per image
+# Run from inference/: python -m benchmarks.bench_quality
+import time
+import cv2
+import numpy as np
+from benchmarks.local_image_server import UPLOADS_DIR
+from face.vision_support.frame_renderer import PhotoFrameReader
+from facerec import quality
+
+FACE_COUNTS = [10, 50, 100, 200]
+REPEATS = 10
+
+
+def legacy_check(img, lm):
+    # Previous MultiFaceExtractor.check_face_quality: per-face crops, per-crop gray, CV_64F Laplacian
+    h, w = img.shape[:2]
+    eye_dist = np.linalg.norm(lm[1] - lm[0])
+    bad = eye_dist < 10
+    bad |= abs(lm[2][0] - (lm[0][0] + lm[1][0]) / 2) / eye_dist > 0.40
+    a, b = np.linalg.norm(lm[2] - lm[0]), np.linalg.norm(lm[2] - lm[1])
+    bad |= min(a, b) / max(a, b) < 0.60
+    bad |= lm[:, 0].min() < 20 or lm[:, 1].min() < 20 or lm[:, 0].max() > w - 20 or lm[:, 1].max() > h - 20
+
+    pts = lm.astype(np.int32)
+    xm, ym = int(eye_dist * 0.5), int(eye_dist * 0.7)
+    region = img[max(0, pts[:, 1].min() - ym):min(h, pts[:, 1].max() + ym), max(0, pts[:, 0].min() - xm):min(w, pts[:, 0].max() + xm)]
+    if region.size > 0:
+        gray = cv2.cvtColor(region, cv2.COLOR_RGB2GRAY)
+        bad |= not (40 <= gray.mean() <= 220)
+        bad |= cv2.Laplacian(gray, cv2.CV_64F).var() < 80
+
+        def patch_var(p):
+            x, y = int(p[0]), int(p[1])
+            r = img[max(0, y - 8):min(h, y + 8), max(0, x - 8):min(w, x + 8)]
+            return cv2.cvtColor(r, cv2.COLOR_RGB2GRAY).var() if r.size else 0
+
+        bad |= (patch_var(lm[0]) + patch_var(lm[1])) / 2 < 100
+        bad |= patch_var(lm[2]) < 100
+    return not bad
+
+
+def random_faces(n, h, w, rng):
+    eye = rng.uniform(12, 60, n)
+    cx, cy = rng.uniform(60, w - 60, n), rng.uniform(60, h - 80, n)
+    template = np.array([[-0.5, -0.25], [0.5, -0.25], [0.0, 0.2], [-0.35, 0.55], [0.35, 0.55]], dtype=np.float32)
+    jitter = rng.normal(scale=0.08, size=(n, 5, 2))
+    return ((template + jitter) * eye[:, None, None] + np.stack([cx, cy], axis=1)[:, None, :]).astype(np.float32)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    img = PhotoFrameReader().read(str(sorted(UPLOADS_DIR.glob("*.jpg"))[0]))
+    h, w = img.shape[:2]
+    print(f"image {w}x{h}")
+    print(f"{'faces':>6} {'legacy ms':>10} {'batched ms':>11} {'agreement':>10}")
+
+    for n in FACE_COUNTS:
+        lms = random_faces(n, h, w, rng)
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            legacy = [legacy_check(img, lm) for lm in lms]
+        legacy_ms = (time.perf_counter() - start) / REPEATS * 1000
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            batched = quality.score_faces(img, lms)
+        batched_ms = (time.perf_counter() - start) / REPEATS * 1000
+
+        agreement = np.mean(np.array(legacy) == batched["is_good_quality"])
+        print(f"{n:>6} {legacy_ms:>10.2f} {batched_ms:>11.2f} {agreement:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# Accuracy / latency report for the INT8 and FP16 model variants against FP32.
+# Build the variants first: python -m facerec.quantization [--fp16]
+# Run from inference/: python -m benchmarks.bench_quantization
+import time
+import numpy as np
+from benchmarks.local_image_server import UPLOADS_DIR
+from facerec.config import MODEL_PATH_ARCFACE_FP32, MODEL_PATH_FACEREC_FP32, CALIBRATION_DIR
+from facerec.quantization import variant_path, build_calibration_faces, list_images
+
+PRECISIONS = ["fp32", "int8", "fp16"]
+ARCFACE_BATCH = 32
+REPEATS = 10
+MATCH_DIST = 0.25   # landmark match radius, as a fraction of eye distance
+
+
+def p50_ms(fn, repeats=REPEATS):
+    fn()  # warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def available(fp32_path):
+    return [(p, variant_path(fp32_path, p)) for p in PRECISIONS if variant_path(fp32_path, p).exists()]
+
+
+def arcface_report(faces):
+    from facerec.embedding_model import ArcFaceONNXEmbedder
+
+    print(f"ArcFace on {len(faces)} aligned faces")
+    print(f"{'precision':>9} {'MB':>6} {'p50 ms/batch':>13} {'speedup':>8} {'cos mean':>9} {'cos p1':>8} {'cos min':>8} {'rank-1 agree':>13}")
+
+    batch = faces[:ARCFACE_BATCH]
+    reference, base_ms = None, None
+    for precision, path in available(MODEL_PATH_ARCFACE_FP32):
+        embedder = ArcFaceONNXEmbedder(model_path=path)
+        embeddings = embedder.embed(faces)
+        ms = p50_ms(lambda: embedder.embed(batch))
+
+        if reference is None:
+            reference, base_ms = embeddings, ms
+
+        # Per-face cosine drift vs FP32 (embeddings are L2-normalized)
+        cos = np.sum(reference * embeddings, axis=1)
+
+        # Does every face still retrieve the same nearest other face?
+        def nearest(e):
+            sim = e @ e.T
+            np.fill_diagonal(sim, -np.inf)
+            return sim.argmax(axis=1)
+
+        agree = np.mean(nearest(reference) == nearest(embeddings)) if len(faces) > 1 else 1.0
+        size_mb = path.stat().st_size / 1e6
+        print(f"{precision:>9} {size_mb:>6.1f} {ms:>13.1f} {base_ms / ms:>7.2f}x {cos.mean():>9.5f} "
+              f"{np.percentile(cos, 1):>8.5f} {cos.min():>8.5f} {agree:>13.3f}")
+
+
+def scrfd_report(image_paths):
+    from facerec.multi_face_extractor import MultiFaceExtractor
+
+    print(f"\nSCRFD on {len(image_paths)} images")
+    print(f"{'precision':>9} {'MB':>6} {'p50 ms/image':>13} {'speedup':>8} {'faces':>6} {'recall vs fp32':>15} {'lm drift':>9}")
+
+    reference, base_ms = None, None
+    for precision, path in available(MODEL_PATH_FACEREC_FP32):
+        detector = MultiFaceExtractor(model_path=path, debug=False, enable_quality_filter=False)
+        images = [detector.read_image(str(p)) for p in image_paths]
+        detections = [detector.detect(img) for img in images]
+        ms = p50_ms(lambda: detector.detect(images[0]))
+
+        if reference is None:
+            reference, base_ms = detections, ms
+
+        # Match each FP32 face to the closest variant face; drift in units of eye distance
+        hits, drift = 0, []
+        for ref, dets in zip(reference, detections):
+            for _, ref_lm in ref:
+                eye_dist = np.linalg.norm(ref_lm[1] - ref_lm[0])
+                dists = [np.abs(lm - ref_lm).max() / eye_dist for _, lm in dets]
+                if dists and min(dists) <= MATCH_DIST:
+                    hits += 1
+                    drift.append(min(dists))
+
+        total = sum(len(r) for r in reference)
+        recall = hits / total if total else 1.0
+        size_mb = path.stat().st_size / 1e6
+        found = sum(len(d) for d in detections)
+        print(f"{precision:>9} {size_mb:>6.1f} {ms:>13.1f} {base_ms / ms:>7.2f}x {found:>6} {recall:>15.3f} "
+              f"{np.mean(drift) if drift else 0.0:>9.4f}")
+
+
+def main():
+    image_paths = list_images(UPLOADS_DIR)
+
+    if MODEL_PATH_ARCFACE_FP32.exists():
+        faces_path = CALIBRATION_DIR / "faces.npy"
+        if faces_path.exists():
+            faces = np.load(faces_path)
+        elif MODEL_PATH_FACEREC_FP32.exists():
+            faces = build_calibration_faces(image_paths)
+        else:
+            faces = None
+            print(f"No {faces_path} and no detector to build it, skipping ArcFace")
+        if faces is not None:
+            arcface_report(faces)
+    else:
+        print(f"{MODEL_PATH_ARCFACE_FP32} not found, skipping ArcFace")
+
+    if MODEL_PATH_FACEREC_FP32.exists():
+        scrfd_report(image_paths)
+    else:
+        print(f"\n{MODEL_PATH_FACEREC_FP32} not found, skipping SCRFD")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# SCRFD decode micro-benchmark (legacy decode-everything vs threshold-first + NMS).
+# The one-detection-per-face check on server/uploads is tests/test_scrfd_decode.py.
+# Run from inference/: python -m benchmarks.bench_scrfd_decode
+import time
+import numpy as np
+from facerec import scrfd
+
+SIZES = [(640, 640), (1280, 960), (4000, 3000)]
+FACES = 40
+DET_THRESH = 0.4
+REPEATS = 20
+
+
+def synthetic_outputs(w: int, h: int, rng: np.random.Generator):
+    """Random SCRFD-shaped outputs with FACES clusters of 3 overlapping positives each."""
+    cls, bbox, kps = [], [], []
+    for stride in scrfd.STRIDES:
+        n = int(np.ceil(h / stride)) * int(np.ceil(w / stride)) * scrfd.ANCHORS_PER_LOC
+        c = rng.uniform(0, 0.2, size=(n, 1)).astype(np.float32)
+        b = rng.uniform(1, 3, size=(n, 4)).astype(np.float32)
+        k = rng.normal(size=(n, 10)).astype(np.float32)
+        if stride == 16:
+            fw = int(np.ceil(w / stride))
+            for anchor in rng.choice(n // 2 - fw - 2, FACES, replace=False) * 2:
+                cluster = [anchor, anchor + 2, anchor + 2 * fw]
+                c[cluster] = 0.9
+                b[cluster] = 4.0
+        cls.append(c), bbox.append(b), kps.append(k)
+    return cls + bbox + kps
+
+
+def legacy_decode(outputs, w, h):
+    # Previous MultiFaceExtractor._decode_outputs: landmarks for every anchor, no boxes, no NMS
+    landmarks_all, scores_all = [], []
+    for level, stride in enumerate(scrfd.STRIDES):
+        cls_out, lmk_out = outputs[level], outputs[level + 6].copy()
+        centers = scrfd.anchor_centers(h, w, stride, cls_out.shape[0])
+        lmk = lmk_out.reshape(-1, 5, 2)
+        lmk[:, :, 0] = lmk[:, :, 0] * stride + centers[:, 0:1]
+        lmk[:, :, 1] = lmk[:, :, 1] * stride + centers[:, 1:2]
+        landmarks_all.append(lmk)
+        scores_all.append(cls_out[:, -1])
+    scores = np.concatenate(scores_all)
+    landmarks = np.concatenate(landmarks_all)
+    return [(float(scores[i]), landmarks[i]) for i in np.where(scores >= DET_THRESH)[0]]
+
+
+def time_ms(fn):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = fn()
+    return (time.perf_counter() - start) / REPEATS * 1000, result
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'input':>11} {'legacy ms':>10} {'legacy dets':>12} {'new ms':>8} {'new dets':>9}")
+
+    for w, h in SIZES:
+        outputs = synthetic_outputs(w, h, rng)
+        legacy_ms, legacy = time_ms(lambda: legacy_decode(outputs, w, h))
+        new_ms, (scores, _, _) = time_ms(lambda: scrfd.decode(outputs, w, h, DET_THRESH))
+        print(f"{w:>5}x{h:<5} {legacy_ms:>10.2f} {len(legacy):>12} {new_ms:>8.2f} {len(scores):>9}")
+
+
+if __name__ == "__main__":
+    main()
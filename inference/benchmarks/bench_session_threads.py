@@ -0,0 +1,83 @@
+# ONNX Runtime thread / execution-mode sweep and cold start with/without the optimized-model cache.
+# Run on the deploy box from inference/: python -m benchmarks.bench_session_threads
+# Pick the best row and set ORT_INTRA_OP_THREADS / ORT_EXECUTION_MODE / ORT_INTER_OP_THREADS accordingly.
+import os
+import tempfile
+import time
+import numpy as np
+from facerec import sessions
+from facerec.config import MODEL_PATH_ARCFACE, MODEL_PATH_FACEREC, DETECTOR_INPUT_SIZE
+
+ARCFACE_BATCH = 16
+WARMUP = 3
+REPEATS = 20
+
+
+def thread_counts():
+    cores = os.cpu_count() or 1
+    counts = [n for n in (1, 2, 4, 8, 16, 32) if n < cores]
+    return counts + [cores]
+
+
+def model_inputs():
+    rng = np.random.default_rng(0)
+    return [
+        ("arcface", MODEL_PATH_ARCFACE,
+         rng.uniform(-1, 1, size=(ARCFACE_BATCH, 112, 112, 3)).astype(np.float32)),
+        ("scrfd", MODEL_PATH_FACEREC,
+         rng.uniform(-1, 1, size=(1, 3, DETECTOR_INPUT_SIZE, DETECTOR_INPUT_SIZE)).astype(np.float32)),
+    ]
+
+
+def latency_ms(sess, x):
+    name = sess.get_inputs()[0].name
+    for _ in range(WARMUP):
+        sess.run(None, {name: x})
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        sess.run(None, {name: x})
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 90)
+
+
+def cold_start_report(label, path):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        timings = []
+        for _ in range(2):  # first run fills the cache, second run loads from it
+            start = time.perf_counter()
+            sessions.create_session(path, cache_dir=cache_dir)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    sessions.create_session(path, cache_dir=None)
+    uncached = (time.perf_counter() - start) * 1000
+
+    print(f"{label}: cold start {uncached:.0f} ms uncached, {timings[0]:.0f} ms filling cache, {timings[1]:.0f} ms from cache")
+
+
+def main():
+    print(f"{os.cpu_count()} logical CPUs\n")
+
+    for label, path, x in model_inputs():
+        if not path.exists():
+            print(f"{path} not found, skipping {label}\n")
+            continue
+
+        cold_start_report(label, path)
+
+        print(f"{'mode':>11} {'intra':>6} {'inter':>6} {'p50 ms':>8} {'p90 ms':>8}")
+        for mode in ("sequential", "parallel"):
+            for intra in thread_counts():
+                inter = 2 if mode == "parallel" else 0
+                sess = sessions.create_session(
+                    path, cache_dir=None, execution_mode=mode,
+                    intra_op_threads=intra, inter_op_threads=inter
+                )
+                p50, p90 = latency_ms(sess, x)
+                print(f"{mode:>11} {intra:>6} {inter:>6} {p50:>8.2f} {p90:>8.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
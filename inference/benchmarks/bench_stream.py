@@ -0,0 +1,73 @@
+# Continuous capture cost: every frame through detection + ArcFace vs the tracked StreamSession
+# Frames are a slow pan across each photo in server/uploads (faces drift a few px per frame).
+# Run from inference/: python -m benchmarks.bench_stream
+import time
+import cv2
+import numpy as np
+from benchmarks.local_image_server import UPLOADS_DIR
+from face.vision_support.decode import read_rgb
+from facerec.multi_face_orchestrator import AttendanceOrchestrator
+from facerec.registry import default_registry
+from facerec.stream import StreamSession
+
+FRAMES_PER_PHOTO = 30
+FRAME_SIZE = (1280, 720)   # (w, h) of the simulated camera frames
+PAN_PX = 4                 # camera drift per frame
+
+
+def pan_frames(image: np.ndarray):
+    """Encoded JPEG frames of a FRAME_SIZE window panning across the (rescaled) photo."""
+    w, h = FRAME_SIZE
+    scale = max(w / image.shape[1], h / image.shape[0]) * 1.2
+    image = cv2.resize(image, None, fx=scale, fy=scale)
+    frames = []
+    for i in range(FRAMES_PER_PHOTO):
+        x = min(i * PAN_PX, image.shape[1] - w)
+        y = min(i * PAN_PX // 2, image.shape[0] - h)
+        window = np.ascontiguousarray(image[y:y + h, x:x + w])
+        frames.append(cv2.imencode(".jpg", cv2.cvtColor(window, cv2.COLOR_RGB2BGR))[1].tobytes())
+    return frames
+
+
+def main():
+    photos = [read_rgb(path) for path in sorted(UPLOADS_DIR.glob("*.jpg"))]
+    clips = [pan_frames(photo) for photo in photos]
+    num_frames = sum(len(clip) for clip in clips)
+
+    detector = default_registry.get("stream_detector")
+    embedder = default_registry.get("embedder")
+    orchestrator = AttendanceOrchestrator(detector=detector, embedder=embedder)
+    students = np.eye(1, 512, dtype=np.float32)
+
+    # Every frame: detect, quality filter, align and embed every face
+    start = time.perf_counter()
+    per_frame_crops = 0
+    for clip in clips:
+        for frame in clip:
+            try:
+                per_frame_crops += orchestrator.run(frame)["num_faces"]
+            except ValueError:
+                pass  # no usable faces in this frame
+    per_frame_s = time.perf_counter() - start
+
+    # Tracked: one session per clip, each face embedded at its best view(s)
+    start = time.perf_counter()
+    sessions = []
+    for clip in clips:
+        session = StreamSession(students, detector=detector, embedder=embedder)
+        for frame in clip:
+            session.process_frame(frame)
+        sessions.append(session)
+    tracked_s = time.perf_counter() - start
+    tracked_crops = sum(s.embeddings_computed for s in sessions)
+    tracks = sum(s.num_tracks for s in sessions)
+
+    print(f"{len(clips)} clips x {FRAMES_PER_PHOTO} frames ({FRAME_SIZE[0]}x{FRAME_SIZE[1]}), detector input {detector.input_size}")
+    print(f"{'mode':>12} {'frames/s':>9} {'ms/frame':>9} {'ArcFace crops':>14}")
+    print(f"{'per frame':>12} {num_frames / per_frame_s:>9.1f} {per_frame_s / num_frames * 1000:>9.1f} {per_frame_crops:>14}")
+    print(f"{'tracked':>12} {num_frames / tracked_s:>9.1f} {tracked_s / num_frames * 1000:>9.1f} {tracked_crops:>14}")
+    print(f"  {tracks} embedded tracks, {tracked_crops / max(tracks, 1):.2f} embeddings per track")
+
+
+if __name__ == "__main__":
+    main()
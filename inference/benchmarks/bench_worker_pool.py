@@ -0,0 +1,66 @@
+# Throughput of concurrent attendance requests (2-4 photos each): in-process threads vs WorkerPool with 1/2/4/8 workers
+# Run from inference/: python -m benchmarks.bench_worker_pool
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.local_image_server import UPLOADS_DIR
+from face.vision_support.frame_renderer import PhotoFrameReader
+from facerec.multi_face_orchestrator import AttendanceOrchestrator
+from facerec.workers import WorkerPool
+
+WORKER_COUNTS = [1, 2, 4, 8]
+CONCURRENCY = 16       # simultaneous clients
+NUM_REQUESTS = 64
+IMAGES_PER_REQUEST = (2, 3, 4)
+
+
+def make_requests(images, rng):
+    return [
+        [images[i] for i in rng.choice(len(images), rng.choice(IMAGES_PER_REQUEST), replace=False)]
+        for _ in range(NUM_REQUESTS)
+    ]
+
+
+def drive(run, requests):
+    """Fire all requests from CONCURRENCY client threads; returns (req/s, p50 ms, p99 ms)."""
+    def timed(images):
+        start = time.perf_counter()
+        run(images)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as clients:
+        latencies = np.array(list(clients.map(timed, requests))) * 1000
+    elapsed = time.perf_counter() - start
+    return len(requests) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    reader = PhotoFrameReader()
+    images = [reader.read(str(p)) for p in sorted(UPLOADS_DIR.glob("*.jpg"))]
+    requests = make_requests(images, rng)
+    print(f"{len(requests)} requests, {CONCURRENCY} concurrent clients, {os.cpu_count()} cpus")
+    print(f"{'mode':>14} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8}")
+
+    # Baseline: what the API does today - FastAPI's thread pool, one process
+    orchestrator = AttendanceOrchestrator()
+    orchestrator.run_batch(images[:2])  # load models
+    rps, p50, p99 = drive(orchestrator.run_batch, requests)
+    print(f"{'in-process':>14} {rps:>7.2f} {p50:>8.0f} {p99:>8.0f}")
+
+    for num_workers in WORKER_COUNTS:
+        # Enough slots that the clients never hit backpressure
+        pool = WorkerPool(num_workers=num_workers, max_pending=CONCURRENCY, submit_timeout=600)
+        pool.start()
+        pool.run(images[:2])  # warm up
+        rps, p50, p99 = drive(pool.run, requests)
+        stats = pool.stats()
+        pool.shutdown()
+        label = f"{num_workers} worker" + ("s" if num_workers > 1 else "")
+        print(f"{label:>14} {rps:>7.2f} {p50:>8.0f} {p99:>8.0f}   per worker: {[w['completed'] for w in stats['workers']]}")
+
+
+if __name__ == "__main__":
+    main()
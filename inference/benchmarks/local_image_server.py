@@ -0,0 +1,95 @@
+# Local HTTP stand-in for Cloudinary, used by the benchmarks
+import os
+import threading
+import time
+from collections import Counter
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+UPLOADS_DIR = Path(__file__).resolve().parents[2] / "server" / "uploads"
+
+
+class SlowImageHandler(SimpleHTTPRequestHandler):
+    """
+    Serves files from a directory over keep-alive HTTP/1.1 with optional added latency.
+
+    Like Cloudinary it sends an ETag (and Last-Modified) and answers conditional
+    GETs with 304; cache_control, if set, is sent as the Cache-Control header.
+    """
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    cache_control = None
+    status_counts = None    # Counter of status codes sent, one per server
+    status_lock = None
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        self._etag = None
+        super().do_GET()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            st = os.stat(path)
+            self._etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+            if self._etag in self.headers.get("If-None-Match", ""):
+                self.send_response(304)
+                self.end_headers()
+                return None
+        return super().send_head()
+
+    def send_response(self, code, message=None):
+        with self.status_lock:
+            self.status_counts[code] += 1
+        super().send_response(code, message)
+
+    def end_headers(self):
+        if getattr(self, "_etag", None):
+            self.send_header("ETag", self._etag)
+        if self.cache_control:
+            self.send_header("Cache-Control", self.cache_control)
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalImageServer:
+    """
+    Context manager running a threaded file server on 127.0.0.1 (random port).
+
+    Tracks the number of TCP connections accepted, so connection reuse is observable,
+    and the responses sent per status code (full 200 bodies vs 304 revalidations).
+    """
+
+    def __init__(self, directory: Path = UPLOADS_DIR, latency: float = 0.0, cache_control: str = None):
+        self.responses = Counter()
+        handler = type("Handler", (SlowImageHandler,), {
+            "latency": latency, "cache_control": cache_control,
+            "status_counts": self.responses, "status_lock": threading.Lock()
+        })
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(directory)))
+        self.httpd.daemon_threads = True
+        self.connections = 0
+
+        accept = self.httpd.get_request
+
+        def counting_accept():
+            self.connections += 1
+            return accept()
+
+        self.httpd.get_request = counting_accept
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/{name}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
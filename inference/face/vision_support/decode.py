@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+from io import BytesIO
+from pathlib import Path
+from typing import Tuple, Union
+from PIL import Image, ImageOps
+
+# cv2.imread/imdecode flag per JPEG DCT-domain reduction factor
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def image_info(data: Union[bytes, bytearray, memoryview]) -> Tuple[str, int, int]:
+    """(format, width, height) from the image header, without decoding pixels."""
+    with Image.open(BytesIO(data)) as img:
+        return img.format, img.width, img.height
+
+
+def reduction_factor(width: int, height: int, min_long_side: int = 0) -> int:
+    """
+    Largest JPEG reduction (1, 2, 4 or 8) that keeps the long side >= min_long_side.
+
+    min_long_side = 0 means full resolution.
+    """
+    if not min_long_side:
+        return 1
+    long_side = max(width, height)
+    for factor in (8, 4, 2):
+        if long_side // factor >= min_long_side:
+            return factor
+    return 1
+
+
+def decode_rgb(data: Union[bytes, bytearray, memoryview], min_long_side: int = 0) -> np.ndarray:
+    """
+    Decode encoded image bytes to an RGB np.ndarray (H, W, 3), upright.
+
+    - The bytes are wrapped, not copied; the decoded frame is the only full-size
+      allocation (BGR -> RGB is done in place)
+    - JPEGs larger than needed are decoded at 1/2, 1/4 or 1/8 scale by libjpeg
+      (IMREAD_REDUCED_COLOR_*), never below min_long_side on the long side
+    - EXIF orientation is applied by the decoder itself
+    - Formats OpenCV cannot decode fall back to PIL
+    """
+    factor = 1
+    if min_long_side:
+        try:
+            fmt, width, height = image_info(data)
+        except Exception:
+            fmt, width, height = None, 0, 0
+        if fmt == "JPEG":
+            factor = reduction_factor(width, height, min_long_side)
+
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), REDUCED_FLAGS[factor])
+    if img is None:
+        return _decode_pil(data)
+
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
+
+
+def read_rgb(path: Union[str, Path], min_long_side: int = 0) -> np.ndarray:
+    """decode_rgb of an image file."""
+    try:
+        data = np.fromfile(str(path), np.uint8)
+    except OSError as e:
+        raise FileNotFoundError(f"Image file not found at path: {path}") from e
+    return decode_rgb(data, min_long_side)
+
+
+def _decode_pil(data) -> np.ndarray:
+    try:
+        img = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    except Exception as e:
+        raise ValueError("Could not decode image from bytes.") from e
+
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    return np.array(img)
@@ -2,6 +2,7 @@ import cv2
 import numpy as np
 from typing import Union, Tuple, Optional
 from pathlib import Path
+from face.vision_support.decode import decode_rgb, read_rgb
 
 class PhotoFrameReader:
     """
@@ -10,27 +11,39 @@ class PhotoFrameReader:
     - raw bytes 
     - numpy array
 
-    Output : RGB np.ndarray
+    Output : RGB np.ndarray for paths and bytes. Arrays are channel-swapped
+    (as they always have been) unless swap_array_channels is False - the extractors
+    read with False and swap in the detector blob and aligned crops instead.
+
+    min_long_side > 0 lets JPEGs be decoded at reduced resolution (see decode_rgb).
     """
 
-    def __init__(self, resize: Optional[Tuple[int,int]] = None):
+    def __init__(
+        self,
+        resize: Optional[Tuple[int,int]] = None,
+        min_long_side: int = 0,
+        swap_array_channels: bool = True
+    ):
         self.resize = resize
+        self.min_long_side = min_long_side
+        self.swap_array_channels = swap_array_channels
 
     def read(self, source: Union[str, Path, bytes, np.ndarray]) -> np.ndarray:
         
         if isinstance(source, np.ndarray):
-            img = source
+            if self.resize:
+                source = cv2.resize(source, self.resize)
+            if self.swap_array_channels:
+                # New array: the caller's image is left as it is
+                source = cv2.cvtColor(source, cv2.COLOR_RGB2BGR)
+            return source
 
-        elif isinstance(source, (bytes, bytearray)):
-            img_array = np.frombuffer(source, np.unit8)
-            img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-            if img is None:
-                raise ValueError("Could not decode image from bytes.")
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            # Decoded straight to RGB, upright, in one allocation
+            img = decode_rgb(source, self.min_long_side)
             
         elif isinstance(source, (str, Path)):
-            img = cv2.imread(str(source))
-            if img is None:
-                raise FileNotFoundError(f"Image file not found at path: {source}")
+            img = read_rgb(source, self.min_long_side)
             
         else:
             raise TypeError("Unsupported source type. Must be str, Path, bytes, or np.ndarray.")
@@ -38,6 +51,4 @@ class PhotoFrameReader:
         if self.resize:
             img = cv2.resize(img, self.resize)
         
-        # BGR to RGB conversion
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         return img
\ No newline at end of file
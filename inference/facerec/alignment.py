@@ -0,0 +1,116 @@
+# Batched landmark alignment → ArcFace input (N, 112, 112, 3), NHWC, float32, [-1, 1]
+import cv2
+import numpy as np
+
+ALIGN_SIZE = 112
+
+# ArcFace canonical landmark template (112x112) - this step comes after face detection as always!
+ARC_TEMPLATE = np.array(
+    [
+        [38.2946, 51.6963],   # left eye
+        [73.5318, 51.5014],   # right eye
+        [56.0252, 71.7366],   # nose
+        [41.5493, 92.3655],   # left mouth
+        [70.7299, 92.2041],   # right mouth
+    ],
+    dtype=np.float32
+)
+
+
+def similarity_transforms(src: np.ndarray, dst: np.ndarray = ARC_TEMPLATE) -> np.ndarray:
+    """
+    Closed-form least-squares similarity transforms (Umeyama) for many point sets at once.
+
+    Args:
+        src: (N, K, 2) source points, e.g. (N, 5, 2) landmarks
+        dst: (K, 2) target points shared by all sets
+
+    Returns:
+        (N, 2, 3) float64 affine matrices mapping src → dst
+    """
+    src = np.asarray(src, dtype=np.float64).reshape(-1, len(dst), 2)
+    dst = np.asarray(dst, dtype=np.float64)
+
+    src_mean = src.mean(axis=1, keepdims=True)          # (N, 1, 2)
+    dst_mean = dst.mean(axis=0)                         # (2,)
+    src_c = src - src_mean
+    dst_c = dst - dst_mean
+
+    # Covariance dst^T src per set and its SVD, all (N, 2, 2)
+    cov = np.einsum("ki,nkj->nij", dst_c, src_c) / len(dst)
+    u, s, vt = np.linalg.svd(cov)
+
+    # Reflection guard
+    d = np.ones((len(src), 2))
+    d[np.linalg.det(u) * np.linalg.det(vt) < 0, 1] = -1
+
+    rot = u @ (d[:, :, None] * vt)
+    src_var = (src_c ** 2).sum(axis=(1, 2)) / len(dst)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = (s * d).sum(axis=1) / src_var
+
+    m = np.empty((len(src), 2, 3))
+    m[:, :, :2] = scale[:, None, None] * rot
+    m[:, :, 2] = dst_mean - np.einsum("nij,nj->ni", m[:, :, :2], src_mean[:, 0])
+
+    return m
+
+
+def align_faces(
+    img: np.ndarray,
+    landmarks: np.ndarray,
+    border_mode: int = cv2.BORDER_CONSTANT,
+    out: np.ndarray = None,
+    swap_rb: bool = False
+) -> np.ndarray:
+    """
+    Align all faces of one image in one go.
+
+    Transforms are solved together, each face is warped straight into its slot of one
+    (N, 112, 112, 3) uint8 buffer, and that buffer is normalized to [-1, 1] in a single
+    pass - the result is already the NHWC layout ArcFaceONNXEmbedder.embed expects.
+    With swap_rb, R and B of the crops are swapped in that pass (warping is per
+    channel, so this equals aligning a swapped image).
+
+    Args:
+        img: RGB image (H, W, 3), uint8
+        landmarks: (N, 5, 2) landmarks in img coordinates
+        border_mode: cv2 border mode for pixels outside img
+        out: optional preallocated (N, 112, 112, 3) float32 buffer to fill
+        swap_rb: swap R and B of the crops
+
+    Returns:
+        (N, 112, 112, 3) float32, range [-1, 1]
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32).reshape(-1, 5, 2)
+    n = len(landmarks)
+    if out is None:
+        out = np.empty((n, ALIGN_SIZE, ALIGN_SIZE, 3), dtype=np.float32)
+    if n == 0:
+        return out
+
+    transforms = similarity_transforms(landmarks)
+    if not np.isfinite(transforms).all():
+        bad = np.flatnonzero(~np.isfinite(transforms).reshape(n, -1).all(axis=1))
+        raise ValueError(f"Affine transform failed for face(s) {bad.tolist()}")
+
+    crops = np.empty((n, ALIGN_SIZE, ALIGN_SIZE, 3), dtype=np.uint8)
+    for i in range(n):
+        cv2.warpAffine(
+            img, transforms[i], (ALIGN_SIZE, ALIGN_SIZE),
+            dst=crops[i],
+            flags=cv2.INTER_LINEAR,
+            borderMode=border_mode,
+            borderValue=(0, 0, 0)
+        )
+
+    # Normalize in place: x / 127.5 - 1
+    np.multiply(crops[..., ::-1] if swap_rb else crops, np.float32(1 / 127.5), out=out, casting="unsafe")
+    out -= 1.0
+
+    return out
+
+
+def to_uint8(faces: np.ndarray) -> np.ndarray:
+    """Inverse of the [-1, 1] normalization, for saving aligned crops."""
+    return np.clip((faces + 1.0) * 127.5, 0, 255).round().astype(np.uint8)
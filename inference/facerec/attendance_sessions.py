@@ -0,0 +1,143 @@
+# Open incremental attendance sessions: roster + face pool kept server-side, evicted when idle
+import secrets
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from facerec.face_pool import FacePool
+from facerec.config import ATTENDANCE_SESSION_TTL_S, ATTENDANCE_SESSION_MAX
+
+
+class SessionLimitReached(RuntimeError):
+    """Raised by SessionStore.create when max_sessions are open and none has expired."""
+
+
+class AttendanceSession:
+    """
+    One class session whose photos arrive over time (e.g. a late-arrivals photo).
+
+    Holds the request parameters, the resolved (S, 512) roster and a FacePool of
+    every face extracted so far, so a new photo costs inference on that photo plus
+    an (S, N) and (F, N) similarity update - the earlier photos and roster are
+    neither resent nor recomputed. Image indices run on across posts.
+    """
+
+    def __init__(self, session_id: str, params: Any, student_matrix: np.ndarray):
+        self.session_id = session_id
+        self.params = params                    # roster + thresholds, as validated by the API
+        self.pool = FacePool(student_matrix)    # info per face: image_index, face_index, id
+        self.images_posted = 0                  # image indices handed out (failed downloads included)
+        self.images_with_faces = 0
+        self.created = self.last_access = time.monotonic()
+        self.result = None                      # (pool version, response) memo kept by the API
+        self.lock = threading.Lock()
+
+    def reserve_images(self, count: int) -> int:
+        """Claim the next `count` image indices; returns the first."""
+        with self.lock:
+            start = self.images_posted
+            self.images_posted += count
+            return start
+
+    def add_image(self, image_index: int, embeddings: np.ndarray) -> int:
+        """Add one image's (N, 512) face embeddings to the pool; returns N."""
+        num_faces = len(embeddings)
+        if num_faces == 0:
+            return 0
+        with self.lock:
+            self.images_with_faces += 1
+        self.pool.add(embeddings, [
+            {'image_index': image_index, 'face_index': face_idx, 'id': f"img{image_index}_face{face_idx}"}
+            for face_idx in range(num_faces)
+        ])
+        return num_faces
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "images_posted": self.images_posted,
+            "images_with_faces": self.images_with_faces,
+            "faces": len(self.pool),
+            "students": len(self.pool.student_matrix),
+            "age_s": round(time.monotonic() - self.created, 1),
+        }
+
+
+class SessionStore:
+    """
+    Open sessions by id, least recently used first.
+
+    A session expires ttl_s after its last access. Expired sessions are evicted
+    lazily on every store call (a sweep only touches the expired head of the LRU
+    order), so no background thread is needed. Creating a session beyond
+    max_sessions raises SessionLimitReached rather than dropping a live one.
+    """
+
+    def __init__(self, ttl_s: float = ATTENDANCE_SESSION_TTL_S, max_sessions: int = ATTENDANCE_SESSION_MAX):
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, AttendanceSession]" = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.created = 0
+        self.expired = 0
+        self.closed = 0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def _evict_expired(self) -> None:
+        # Caller holds the lock
+        deadline = time.monotonic() - self.ttl_s
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_access > deadline:
+                break
+            del self.sessions[session.session_id]
+            self.expired += 1
+
+    def create(self, params: Any, student_matrix: np.ndarray) -> AttendanceSession:
+        with self.lock:
+            self._evict_expired()
+            if len(self.sessions) >= self.max_sessions:
+                raise SessionLimitReached(f"{self.max_sessions} attendance sessions already open")
+            session = AttendanceSession(secrets.token_urlsafe(16), params, student_matrix)
+            self.sessions[session.session_id] = session
+            self.created += 1
+            return session
+
+    def get(self, session_id: str) -> Optional[AttendanceSession]:
+        """The open session (its TTL restarts), or None if unknown or expired."""
+        with self.lock:
+            self._evict_expired()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_access = time.monotonic()
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def close(self, session_id: str) -> Optional[AttendanceSession]:
+        """Remove and return the session, or None if unknown or expired."""
+        with self.lock:
+            self._evict_expired()
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                self.closed += 1
+            return session
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            self._evict_expired()
+            return {
+                "open": len(self.sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_s": self.ttl_s,
+                "created": self.created,
+                "expired": self.expired,
+                "closed": self.closed,
+                "faces": sum(len(s.pool) for s in self.sessions.values()),
+            }
+
+
+default_session_store = SessionStore()
@@ -0,0 +1,159 @@
+# Cross-request micro-batching in front of ArcFaceONNXEmbedder
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+from typing import List, Tuple
+from facerec.config import ARCFACE_MICROBATCH_MAX_SIZE, ARCFACE_MICROBATCH_MAX_WAIT_MS
+from facerec.alignment import ALIGN_SIZE
+
+METRICS_WINDOW = 1000   # recent batches/requests kept for percentiles
+
+
+class MicroBatcher:
+    """
+    Coalesces embed() calls from concurrent requests into shared ArcFace runs.
+
+    A single batching thread takes the oldest waiting request, then keeps adding
+    requests until max_batch_size crops are collected or max_wait_ms has passed
+    since that request arrived. The crops are copied into one reused input buffer,
+    run in one ONNX call, and each request's rows are handed back through its
+    Future. A request larger than max_batch_size runs on its own (the embedder
+    chunks it).
+
+    Drop-in for the embedder: embed(x) has the same contract, it just blocks on
+    the batch its crops ended up in.
+    """
+
+    def __init__(self, embedder, max_batch_size: int = ARCFACE_MICROBATCH_MAX_SIZE, max_wait_ms: float = ARCFACE_MICROBATCH_MAX_WAIT_MS):
+        self.embedder = embedder
+        self.max_batch_size = min(max_batch_size, embedder.max_batch_size)
+        self.max_wait_s = max_wait_ms / 1000
+
+        self._pending: deque = deque()   # (crops, future, submitted_at)
+        self._cond = threading.Condition()
+        self._buffer = np.empty((self.max_batch_size, ALIGN_SIZE, ALIGN_SIZE, 3), dtype=np.float32)
+        self._closed = False
+
+        self._metrics_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.crops = 0
+        self._fill = deque(maxlen=METRICS_WINDOW)          # crops / max_batch_size per batch
+        self._requests_per_batch = deque(maxlen=METRICS_WINDOW)
+        self._queue_delay = deque(maxlen=METRICS_WINDOW)   # s from submit to batch start, per request
+        self._run_time = deque(maxlen=METRICS_WINDOW)      # s per ONNX call
+
+        self._thread = threading.Thread(target=self._loop, name="arcface-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, x: np.ndarray) -> Future:
+        """Queue (N, 112, 112, 3) crops; the Future resolves to (N, 512) L2-normalized embeddings."""
+        future = Future()
+        if len(x) == 0:
+            future.set_result(np.empty((0, 512), dtype=np.float32))
+            return future
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append((x, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def embed(self, x: np.ndarray) -> np.ndarray:
+        return self.submit(x).result()
+
+    # ------------------------------------------------------------
+
+    def _next_batch(self) -> List[Tuple[np.ndarray, Future, float]]:
+        """Block for the oldest request, then gather more until full or its wait budget is spent."""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+
+            batch = [self._pending.popleft()]
+            size = len(batch[0][0])
+            deadline = batch[0][2] + self.max_wait_s
+
+            while size < self.max_batch_size:
+                if self._pending:
+                    if size + len(self._pending[0][0]) > self.max_batch_size:
+                        break  # the next request starts the next batch
+                    batch.append(self._pending.popleft())
+                    size += len(batch[-1][0])
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            started = time.perf_counter()
+            counts = [len(x) for x, _, _ in batch]
+            total = sum(counts)
+            try:
+                if len(batch) == 1:
+                    embeddings = self.embedder.embed(batch[0][0])
+                else:
+                    inputs = self._buffer[:total]
+                    np.concatenate([x for x, _, _ in batch], axis=0, out=inputs)
+                    embeddings = self.embedder.embed(inputs)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            for future, rows in zip((f for _, f, _ in batch), np.split(embeddings, np.cumsum(counts)[:-1])):
+                future.set_result(rows)
+
+            with self._metrics_lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.crops += total
+                self._fill.append(min(total / self.max_batch_size, 1.0))
+                self._requests_per_batch.append(len(batch))
+                self._queue_delay.extend(started - submitted for _, _, submitted in batch)
+                self._run_time.append(finished - started)
+
+    # ------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """Batch fill and queueing delay over the last METRICS_WINDOW batches."""
+        def ms(values, q):
+            return round(float(np.percentile(values, q)) * 1000, 2) if values else 0.0
+
+        with self._metrics_lock:
+            delays, runs = list(self._queue_delay), list(self._run_time)
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_s * 1000,
+                "queued": len(self._pending),
+                "batches": self.batches,
+                "requests": self.requests,
+                "crops": self.crops,
+                "avg_fill": round(float(np.mean(self._fill)), 3) if self._fill else 0.0,
+                "avg_requests_per_batch": round(float(np.mean(self._requests_per_batch)), 2) if self._requests_per_batch else 0.0,
+                "queue_delay_p50_ms": ms(delays, 50),
+                "queue_delay_p99_ms": ms(delays, 99),
+                "run_p50_ms": ms(runs, 50),
+                "run_p99_ms": ms(runs, 99),
+            }
+
+    def close(self) -> None:
+        """Finish queued requests, then stop the batching thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -1,7 +1,151 @@
 
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
 
-MODEL_PATH_ARCFACE = BASE_DIR / "models" / "arc.onnx"
-MODEL_PATH_FACEREC = BASE_DIR / "models" / "scrfd_10g_bnkps.onnx"
+MODEL_DIR = BASE_DIR / "models"
+MODEL_PATH_ARCFACE_FP32 = MODEL_DIR / "arc.onnx"
+MODEL_PATH_FACEREC_FP32 = MODEL_DIR / "scrfd_10g_bnkps.onnx"
+
+# Model precision per deployment: "fp32" | "int8" | "fp16" (variants built by python -m facerec.quantization)
+PRECISION_SUFFIXES = {"fp32": "", "int8": ".int8", "fp16": ".fp16"}
+ARCFACE_PRECISION = os.environ.get("ARCFACE_PRECISION", "fp32")
+DETECTOR_PRECISION = os.environ.get("DETECTOR_PRECISION", "fp32")
+for _name, _precision in (("ARCFACE_PRECISION", ARCFACE_PRECISION), ("DETECTOR_PRECISION", DETECTOR_PRECISION)):
+    if _precision not in PRECISION_SUFFIXES:
+        raise ValueError(f"{_name}={_precision!r}, must be one of: {', '.join(PRECISION_SUFFIXES)}")
+del _name, _precision
+
+# Models actually loaded - an explicit MODEL_PATH_* env var wins over the precision setting
+MODEL_PATH_ARCFACE = Path(os.environ.get(
+    "MODEL_PATH_ARCFACE", MODEL_DIR / f"arc{PRECISION_SUFFIXES[ARCFACE_PRECISION]}.onnx"
+))
+MODEL_PATH_FACEREC = Path(os.environ.get(
+    "MODEL_PATH_FACEREC", MODEL_DIR / f"scrfd_10g_bnkps{PRECISION_SUFFIXES[DETECTOR_PRECISION]}.onnx"
+))
+
+# Calibration data for static INT8 quantization
+CALIBRATION_DIR = MODEL_DIR / "calibration"
+CALIBRATION_MAX_FACES = 500
+
+GALLERY_SNAPSHOT_PATH = BASE_DIR / "gallery" / "gallery.npz"
+GALLERY_CAPACITY = 50_000
+GALLERY_SNAPSHOT_DELAY_S = 2.0   # mutations within this window share one snapshot write
+
+# SCRFD letterbox input size (None = native resolution)
+DETECTOR_INPUT_SIZE = 1280               # classroom photos (MultiFaceExtractor)
+REGISTRATION_DETECTOR_INPUT_SIZE = 640   # single-face registration photos (FaceExtractor)
+# Batched multi-image detection when DETECTOR_INPUT_SIZE is None
+DETECTOR_BATCH_INPUT_SIZE = 1280
+# "letterbox": one downscaled pass; "tiled": coarse pass + overlapping native-res tiles
+DETECTOR_MODE = "letterbox"
+DETECTOR_TILE_OVERLAP = 0.25   # fraction of tile size shared with the neighbouring tile
+DETECTOR_MAX_TILES = 16        # image is downscaled until the tile grid fits
+# JPEGs are decoded at 1/2, 1/4 or 1/8 scale (libjpeg DCT-domain downscaling) while the long side
+# stays >= DECODE_MIN_SCALE x the detector input; 0 = always decode at full resolution.
+# Tiled detection needs the native resolution and never gets a reduced decode.
+DECODE_MIN_SCALE = float(os.environ.get("DECODE_MIN_SCALE", 1.5))
+ATTENDANCE_DECODE_LONG_SIDE = int(DETECTOR_INPUT_SIZE * DECODE_MIN_SCALE) if DETECTOR_INPUT_SIZE and DETECTOR_MODE == "letterbox" else 0
+REGISTRATION_DECODE_LONG_SIDE = int(REGISTRATION_DETECTOR_INPUT_SIZE * DECODE_MIN_SCALE) if REGISTRATION_DETECTOR_INPUT_SIZE else 0
+
+# Channel order in which decoded (array) images - every downloaded photo and streamed frame - reach
+# SCRFD and ArcFace. The service has always channel-swapped array inputs (now in the detector blob and
+# the aligned crops, see preprocess.swaps_rb), so all embeddings enrolled from URLs so far were
+# computed on BGR crops: "bgr" keeps matching them.
+# "rgb" feeds arrays like file inputs. Switching changes every embedding, so re-enroll first:
+# re-run /api/v1/register for every student with ARRAY_CHANNEL_ORDER=rgb (a separate instance),
+# replace the stored embeddings and gallery entries, then flip the setting on the attendance service.
+ARRAY_CHANNEL_ORDERS = ("bgr", "rgb")
+ARRAY_CHANNEL_ORDER = os.environ.get("ARRAY_CHANNEL_ORDER", "bgr")
+if ARRAY_CHANNEL_ORDER not in ARRAY_CHANNEL_ORDERS:
+    raise ValueError(f"ARRAY_CHANNEL_ORDER={ARRAY_CHANNEL_ORDER!r}, must be one of: {', '.join(ARRAY_CHANNEL_ORDERS)}")
+
+# Max crops per ArcFace call; larger inputs are chunked
+ARCFACE_MAX_BATCH_SIZE = 64
+
+# Cross-request micro-batching of ArcFace calls (facerec/batcher.py)
+ARCFACE_MICROBATCH = os.environ.get("ARCFACE_MICROBATCH", "1") == "1"
+ARCFACE_MICROBATCH_MAX_SIZE = int(os.environ.get("ARCFACE_MICROBATCH_MAX_SIZE", ARCFACE_MAX_BATCH_SIZE))
+ARCFACE_MICROBATCH_MAX_WAIT_MS = float(os.environ.get("ARCFACE_MICROBATCH_MAX_WAIT_MS", 5.0))
+
+# Image download pool (shared by both APIs)
+DOWNLOAD_MAX_WORKERS = 16
+DOWNLOAD_PER_HOST_LIMIT = 8
+DOWNLOAD_RETRIES = 2
+DOWNLOAD_CONNECT_TIMEOUT = 3.05
+DOWNLOAD_READ_TIMEOUT = 10
+# Response cache of downloaded images (facerec/http_cache.py), revalidated with conditional GETs.
+# One directory per node so both services share it; DOWNLOAD_CACHE_DIR="" disables it
+DOWNLOAD_CACHE_DIR = os.environ.get("DOWNLOAD_CACHE_DIR", str(BASE_DIR / "tmp" / "download_cache"))
+DOWNLOAD_CACHE_MAX_MB = float(os.environ.get("DOWNLOAD_CACHE_MAX_MB", 1024))
+
+# CPU work of the async endpoints (facerec/executor.py): threads and calls in flight
+CPU_EXECUTOR_WORKERS = int(os.environ.get("CPU_EXECUTOR_WORKERS", 4))
+CPU_EXECUTOR_MAX_PENDING = int(os.environ.get("CPU_EXECUTOR_MAX_PENDING", 16))
+
+# Content-addressed result cache (facerec/result_cache.py); RESULT_CACHE_MAX_MB=0 disables it
+RESULT_CACHE_MAX_MB = float(os.environ.get("RESULT_CACHE_MAX_MB", 256))
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", "")            # on-disk spill store, "" = memory only
+RESULT_CACHE_DISK_MAX_MB = float(os.environ.get("RESULT_CACHE_DISK_MAX_MB", 2048))
+
+# Streaming attendance (/api/v1/attendance/stream): frames of one session go through a smaller
+# letterbox and a face tracker (facerec/tracker.py), so each tracked face is embedded only at its
+# best view(s) instead of in every frame
+STREAM_DETECTOR_INPUT_SIZE = int(os.environ.get("STREAM_DETECTOR_INPUT_SIZE", 640))
+STREAM_DECODE_LONG_SIDE = int(STREAM_DETECTOR_INPUT_SIZE * DECODE_MIN_SCALE)
+STREAM_TRACK_IOU = 0.3              # min face-box IoU to continue a track in the next frame
+STREAM_TRACK_MAX_MISSED = 15        # frames a track survives without a detection
+STREAM_TRACK_MIN_HITS = 3           # frames before a track is embedded (drops one-frame false positives)
+STREAM_TRACK_MAX_EMBEDDINGS = 3     # embeddings per track at most (averaged)
+STREAM_REEMBED_GAIN = 0.25          # re-embed only when the best view's quality improves by 25%
+STREAM_MAX_FRAME_MB = 8
+
+# Incremental attendance sessions (/api/v1/attendance/sessions): images posted over time
+ATTENDANCE_SESSION_TTL_S = float(os.environ.get("ATTENDANCE_SESSION_TTL_S", 3 * 3600))   # evicted after this long idle
+ATTENDANCE_SESSION_MAX = int(os.environ.get("ATTENDANCE_SESSION_MAX", 256))              # open sessions per process
+ATTENDANCE_SESSION_MAX_IMAGES = 4   # image URLs per post
+
+# Staged pipeline: bounded queue per stage and worker threads per stage
+PIPELINE_QUEUE_SIZE = 8
+# (embed workers mostly wait on the ArcFace micro-batcher, so several let images coalesce)
+PIPELINE_WORKERS = {"decode": 4, "detect": 1, "align": 2, "embed": 4}
+
+# How /api/v1/attendance runs inference:
+#   "pipeline" - per-image stages overlap downloads with detection/embedding
+#   "batch"    - wait for all downloads, then one batched SCRFD + ArcFace call
+#   "workers"  - downloads in the API process, detection/embedding in a pool of
+#                worker processes (facerec/workers.py), images via shared memory
+ATTENDANCE_EXECUTION_MODE = os.environ.get("ATTENDANCE_EXECUTION_MODE", "pipeline")
+
+# SCRFD post-processing
+DET_NMS_THRESH = 0.4
+DET_TOP_K = 1000
+ANCHOR_CACHE_SIZE = 64  # cached SCRFD anchor grids (one per input shape and stride)
+
+# Preprocessing buffer pool: idle NCHW input buffers kept per shape
+PREPROCESS_POOL_MAX_PER_SHAPE = 4
+
+# ONNX Runtime sessions (facerec/sessions.py) - each can be overridden by the env var of the same name
+ORT_GRAPH_OPTIMIZATION = os.environ.get("ORT_GRAPH_OPTIMIZATION", "all")      # disable | basic | extended | all
+ORT_EXECUTION_MODE = os.environ.get("ORT_EXECUTION_MODE", "sequential")       # sequential | parallel
+ORT_INTRA_OP_THREADS = int(os.environ.get("ORT_INTRA_OP_THREADS", 0))         # 0 = ORT default (one per physical core)
+ORT_INTER_OP_THREADS = int(os.environ.get("ORT_INTER_OP_THREADS", 0))         # only used in parallel mode
+ORT_INTRA_OP_AFFINITIES = os.environ.get("ORT_INTRA_OP_AFFINITIES", "")       # e.g. "1;2;3" pins intra-op threads 2..N to cores
+ORT_ALLOW_SPINNING = os.environ.get("ORT_ALLOW_SPINNING", "1") == "1"         # busy-wait between ops (lower latency, more CPU)
+ORT_ENABLE_MEM_ARENA = os.environ.get("ORT_ENABLE_MEM_ARENA", "1") == "1"
+# Optimized graphs are saved here and reloaded on the next start ("" disables)
+ORT_OPTIMIZED_MODEL_DIR = os.environ.get("ORT_OPTIMIZED_MODEL_DIR", str(MODEL_DIR / "optimized"))
+
+# Unified server (python server.py): both APIs in one process per worker, on both legacy ports
+SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
+SERVER_PORTS = [int(p) for p in os.environ.get("SERVER_PORTS", "8000,8001").split(",")]
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 1))   # each worker loads its own models; > 1 disables the gallery and attendance sessions
+# Concurrent ONNX Runtime runs per process (each run already uses ORT_INTRA_OP_THREADS cores)
+INFERENCE_MAX_CONCURRENT = int(os.environ.get("INFERENCE_MAX_CONCURRENT", 1))
+
+# Inference worker processes ("workers" execution mode)
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", os.cpu_count() or 1))
+WORKER_POOL_MAX_PENDING = int(os.environ.get("WORKER_POOL_MAX_PENDING", 0))              # 0 = 2 per worker
+WORKER_POOL_SUBMIT_TIMEOUT = float(os.environ.get("WORKER_POOL_SUBMIT_TIMEOUT", 5.0))    # s to wait for a free slot
+WORKER_POOL_START_TIMEOUT = float(os.environ.get("WORKER_POOL_START_TIMEOUT", 120.0))    # s for workers to load models
@@ -0,0 +1,180 @@
+# Shared image download layer: keep-alive pool, retries, per-host limits, concurrent fetch
+import threading
+import numpy as np
+from collections import defaultdict, deque
+import requests
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from facerec.config import (
+    DOWNLOAD_MAX_WORKERS,
+    DOWNLOAD_PER_HOST_LIMIT,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_CONNECT_TIMEOUT,
+    DOWNLOAD_READ_TIMEOUT,
+)
+from facerec.http_cache import HTTPCache
+from face.vision_support.decode import decode_rgb
+
+
+class ImageDownloadError(Exception):
+    """Raised when an image cannot be fetched or decoded."""
+
+
+def decode_image(data: bytes, min_long_side: int = 0) -> np.ndarray:
+    """Decode encoded image bytes to an upright RGB np.ndarray (H, W, 3), possibly at reduced JPEG scale."""
+    return decode_rgb(data, min_long_side)
+
+
+class ImageDownloader:
+    """
+    Fetches images over one keep-alive requests.Session.
+
+    - Connection pool is sized for the worker count, so TCP+TLS handshakes are reused
+    - Idempotent GETs are retried with backoff on connection errors and 429/5xx
+    - Each host gets at most `per_host_limit` concurrent requests; URLs over the limit
+      wait in a per-host queue, not in a pool thread, so a slow host never occupies
+      the threads other hosts' downloads need
+    - Download + decode run on a thread pool, so all URLs of a request are fetched
+      concurrently and decoding overlaps with whatever the caller does meanwhile
+    - With an HTTPCache, a URL fetched before (by either service on the node) is
+      served from disk, after a conditional GET unless it is still fresh
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DOWNLOAD_MAX_WORKERS,
+        per_host_limit: int = DOWNLOAD_PER_HOST_LIMIT,
+        retries: int = DOWNLOAD_RETRIES,
+        connect_timeout: float = DOWNLOAD_CONNECT_TIMEOUT,
+        read_timeout: float = DOWNLOAD_READ_TIMEOUT,
+        cache: Optional[HTTPCache] = None
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.per_host_limit = per_host_limit
+        self.cache = cache
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max_workers, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+        self.host_active: Dict[str, int] = defaultdict(int)
+        self.host_waiting: Dict[str, Deque[Tuple[str, Future, bool]]] = defaultdict(deque)
+        self.host_lock = threading.Lock()
+
+    # ------------------------------------------------------------
+
+    def fetch_bytes(self, url: str) -> bytes:
+        """Blocking GET over the shared session in the calling thread (no per-host limit)."""
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None and cached.fresh:
+            self.cache.record("fresh", len(cached.body))
+            self.cache.touch(url)
+            return cached.body
+
+        try:
+            headers = cached.validators() if cached is not None else None
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached is not None:
+                self.cache.record("revalidated", len(cached.body))
+                self.cache.refresh(cached, response.headers)
+                return cached.body
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise ImageDownloadError(f"Failed to download image: {str(e)}") from e
+
+        if self.cache is not None:
+            self.cache.record("miss")
+            self.cache.put(url, response.content, response.headers)
+        return response.content
+
+    def decode(self, data: bytes, min_long_side: int = 0) -> np.ndarray:
+        """decode_image, with failures reported as ImageDownloadError."""
+        try:
+            return decode_image(data, min_long_side)
+        except Exception as e:
+            raise ImageDownloadError(f"Failed to process image: {str(e)}") from e
+
+    def download_image(self, url: str) -> np.ndarray:
+        """fetch_bytes + decode to RGB np.ndarray, in the calling thread."""
+        return self.decode(self.fetch_bytes(url))
+
+    def fetch_image(self, url: str) -> np.ndarray:
+        """Blocking GET + decode to RGB np.ndarray, through the pool and per-host limit."""
+        return self.submit(url).result()
+
+    # ------------------------------------------------------------
+
+    def submit(self, url: str, decode: bool = True) -> Future:
+        """
+        Start downloading (+ decoding) one URL; the future resolves to an RGB array,
+        or to the raw bytes with decode=False.
+        """
+        future = Future()
+        host = urlparse(url).netloc
+
+        with self.host_lock:
+            if self.host_active[host] >= self.per_host_limit:
+                self.host_waiting[host].append((url, future, decode))
+                return future
+            self.host_active[host] += 1
+
+        self._start(host, url, future, decode)
+        return future
+
+    def submit_all(self, urls: List[str], decode: bool = True) -> List[Future]:
+        """Start all URLs at once; futures are returned in input order."""
+        return [self.submit(url, decode) for url in urls]
+
+    def fetch_all(self, urls: List[str]) -> List[np.ndarray]:
+        """Fetch all URLs concurrently; raises the first ImageDownloadError in input order."""
+        return [future.result() for future in self.submit_all(urls)]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    # ------------------------------------------------------------
+
+    def _start(self, host: str, url: str, future: Future, decode: bool) -> None:
+        """Run one download on the pool; it holds one of the host's slots until done."""
+        if not future.set_running_or_notify_cancel():
+            self._release(host)
+            return
+
+        def run():
+            try:
+                future.set_result(self.download_image(url) if decode else self.fetch_bytes(url))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._release(host)
+
+        self.executor.submit(run)
+
+    def _release(self, host: str) -> None:
+        """Hand a finished download's slot to the host's next waiting URL, if any."""
+        with self.host_lock:
+            waiting = self.host_waiting[host]
+            if not waiting:
+                self.host_active[host] -= 1
+                return
+            url, future, decode = waiting.popleft()
+
+        self._start(host, url, future, decode)
+
+
+# One pool per process, shared by the registration and attendance APIs
+default_downloader = ImageDownloader(cache=HTTPCache())
@@ -1,18 +1,18 @@
 import numpy as np
-import onnxruntime as ort
-from facerec.config import MODEL_PATH_ARCFACE
+from facerec.config import MODEL_PATH_ARCFACE, ARCFACE_MAX_BATCH_SIZE
+from facerec.preprocess import run_bound
+from facerec.registry import default_registry
 
 class ArcFaceONNXEmbedder:
-    def __init__(self, model_path: str = MODEL_PATH_ARCFACE, device: str = "cpu"):
+    def __init__(self, model_path: str = MODEL_PATH_ARCFACE, device: str = "cpu", max_batch_size: int = ARCFACE_MAX_BATCH_SIZE):
         
-        providers = (
-            ["CUDAExecutionProvider", "CPUExecutionProvider"]
-            if device == "cuda"
-            else ["CPUExecutionProvider"]
-        )
-
-        self.sess = ort.InferenceSession(model_path, providers=providers)
+        # One session per model file per process, shared through the registry
+        self.sess = default_registry.session(model_path, device)
         self.input_name = self.sess.get_inputs()[0].name
+        
+        # A fixed batch dim in the exported graph caps the chunk size
+        batch_dim = self.sess.get_inputs()[0].shape[0]
+        self.max_batch_size = batch_dim if isinstance(batch_dim, int) else max_batch_size
 
 
     def embed(self, x: np.ndarray) -> np.ndarray:
@@ -20,10 +20,20 @@ class ArcFaceONNXEmbedder:
         """
         x: np.ndarray (N, 112, 112, 3), float32, range [-1, 1]
         returns: np.ndarray (N, 512), L2-normalized
+        
+        Inputs larger than max_batch_size are run in chunks. Contiguous inputs
+        (as produced by alignment.align_faces) are bound without a copy.
         """
         
-        outs = self.sess.run(None, {self.input_name: x})[0]
+        if len(x) <= self.max_batch_size:
+            outs = run_bound(self.sess, self.input_name, x)[0]
+        else:
+            outs = np.concatenate([
+                run_bound(self.sess, self.input_name, x[i:i + self.max_batch_size])[0]
+                for i in range(0, len(x), self.max_batch_size)
+            ], axis=0)
+        
         norms = np.linalg.norm(outs, axis=1, keepdims=True)
         normalized_embeds = outs / norms
         
-        return normalized_embeds
\ No newline at end of file
+        return normalized_embeds
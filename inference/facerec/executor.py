@@ -0,0 +1,83 @@
+# Bounded thread pool for CPU-bound work awaited from async request handlers
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+from facerec.config import CPU_EXECUTOR_WORKERS, CPU_EXECUTOR_MAX_PENDING
+
+
+class CPUExecutor:
+    """
+    Runs decode/detect/align/embed/matching off the event loop.
+
+    It is separate from the download pool and from FastAPI's default threadpool,
+    so requests stuck on slow image hosts hold no inference thread and never
+    starve the requests whose images have arrived. At most max_pending calls are
+    submitted to the pool at a time; further callers wait on an asyncio
+    semaphore, which holds no thread.
+    """
+
+    def __init__(self, max_workers: int = CPU_EXECUTOR_WORKERS, max_pending: int = CPU_EXECUTOR_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cpu")
+
+        # asyncio primitives belong to one event loop; recreated if the app runs on a new one
+        self._slots = None
+        self._loop = None
+
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait_s = 0.0
+
+    def _loop_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) on the pool, waiting for a slot if max_pending calls are in flight."""
+        slots = self._loop_slots()
+        start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            # Also when cancelled while waiting (client gone): never counted as waiting forever
+            with self._lock:
+                self.waiting -= 1
+
+        try:
+            with self._lock:
+                self.running += 1
+                self.total_wait_s += time.perf_counter() - start
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self.executor, partial(fn, *args, **kwargs))
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+        finally:
+            slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": self.running,
+                "waiting": self.waiting,
+                "completed": self.completed,
+                "avg_wait_ms": round(self.total_wait_s / self.completed * 1000, 2) if self.completed else 0.0,
+            }
+
+
+# One pool per process, shared by the registration and attendance APIs
+default_cpu_executor = CPUExecutor()
@@ -0,0 +1,131 @@
+# Growing pool of face embeddings with incrementally maintained similarity matrices
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional
+from facerec.matching import normalize_rows, match_and_assign
+
+
+class FacePool:
+    """
+    Faces seen so far in one attendance session, matched against a fixed roster.
+
+    Keeps the (S, F) student x face and (F, F) face x face similarity matrices in
+    preallocated, doubling buffers. Adding N faces costs one (S, N) and one (F, N)
+    product; existing entries are never recomputed. A face can be replaced in
+    place (e.g. a track re-embedded at a better view), which recomputes only its
+    row and column.
+
+    identify() gates and assigns over the cached matrices and memoizes the result
+    until the pool changes, so repeated reads are free. Thread-safe.
+    """
+
+    def __init__(self, student_matrix: np.ndarray, capacity: int = 64):
+        self.student_matrix = student_matrix            # (S, D) normalized
+        dim = student_matrix.shape[1]
+
+        self._faces = np.empty((capacity, dim), dtype=np.float32)
+        self._sim = np.empty((len(student_matrix), capacity), dtype=np.float32)
+        self._face_sim = np.empty((capacity, capacity), dtype=np.float32)
+        self.info: List[Dict[str, Any]] = []            # per face, e.g. image_index / face_index / id
+
+        self._lock = threading.Lock()
+        self._identified = None                         # (settings, result) memo
+        self.version = 0                                # bumped on every change
+
+    def __len__(self) -> int:
+        return len(self.info)
+
+    def add(self, embeddings: np.ndarray, info: List[Dict[str, Any]]) -> List[int]:
+        """Append (N, D) embeddings (normalized here) with one info dict each; returns their indices."""
+        embeddings = normalize_rows(embeddings)
+        with self._lock:
+            start, n = len(self.info), len(embeddings)
+            while start + n > len(self._faces):
+                self._grow()
+
+            end = start + n
+            self._faces[start:end] = embeddings
+            self._sim[:, start:end] = self.student_matrix @ embeddings.T
+            block = self._faces[:end] @ embeddings.T    # (end, N): old + new faces vs new faces
+            self._face_sim[:end, start:end] = block
+            self._face_sim[start:end, :end] = block.T
+            self.info.extend(info)
+            self._changed()
+            return list(range(start, end))
+
+    def replace(self, index: int, embedding: np.ndarray, **info) -> None:
+        """Swap in a new embedding for one face (its row and column are recomputed)."""
+        embedding = normalize_rows(embedding[None])[0]
+        with self._lock:
+            n = len(self.info)
+            self._faces[index] = embedding
+            self._sim[:, index] = self.student_matrix @ embedding
+            row = self._faces[:n] @ embedding
+            self._face_sim[index, :n] = row
+            self._face_sim[:n, index] = row
+            self.info[index].update(info)
+            self._changed()
+
+    def _changed(self) -> None:
+        # Caller holds the lock
+        self.version += 1
+        self._identified = None
+
+    def _grow(self) -> None:
+        # Caller holds the lock
+        capacity = 2 * len(self._faces)
+        n = len(self.info)
+        faces = np.empty((capacity, self._faces.shape[1]), dtype=np.float32)
+        sim = np.empty((len(self.student_matrix), capacity), dtype=np.float32)
+        face_sim = np.empty((capacity, capacity), dtype=np.float32)
+        faces[:n], sim[:, :n], face_sim[:n, :n] = self._faces[:n], self._sim[:, :n], self._face_sim[:n, :n]
+        self._faces, self._sim, self._face_sim = faces, sim, face_sim
+
+    # ------------------------------------------------------------
+
+    def similarities(self):
+        """Copies of the current (S, F) student x face and (F, F) face x face matrices."""
+        with self._lock:
+            n = len(self.info)
+            return self._sim[:, :n].copy(), self._face_sim[:n, :n].copy()
+
+    def snapshot(self):
+        """(version, info, sim, face_sim) taken together, so they describe the same faces."""
+        with self._lock:
+            n = len(self.info)
+            info = [dict(i) for i in self.info]
+            return self.version, info, self._sim[:, :n].copy(), self._face_sim[:n, :n].copy()
+
+    def identify(
+        self,
+        similarity_threshold: float,
+        margin_threshold: float,
+        min_absolute_similarity: float,
+        assignment_method: str = "auto"
+    ) -> Dict[int, int]:
+        """Student index -> face index, with the same gating as still-photo attendance (memoized)."""
+        settings = (similarity_threshold, margin_threshold, min_absolute_similarity, assignment_method)
+        with self._lock:
+            if self._identified is not None and self._identified[0] == settings:
+                return self._identified[1]
+            version = self.version
+
+        assigned = {}
+        if len(self):
+            sim, face_sim = self.similarities()
+            _, assigned = match_and_assign(
+                sim, face_sim, similarity_threshold, margin_threshold, min_absolute_similarity, assignment_method
+            )
+
+        with self._lock:
+            if self.version == version:
+                self._identified = (settings, assigned)
+        return assigned
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        with self._lock:
+            return {
+                "faces": len(self.info),
+                "capacity": len(self._faces),
+                "students": len(self.student_matrix),
+            }
@@ -1,29 +1,17 @@
 import cv2
 import numpy as np
-import onnxruntime as ort
 from pathlib import Path
 from typing import Union
 from face.vision_support.frame_renderer import PhotoFrameReader
-from facerec.config import MODEL_PATH_FACEREC
-
-# ArcFace canonical landmark template (112x112)- this step comes after face detection
-ARC_TEMPLATE = np.array(
-    [
-        [38.2946, 51.6963],   # left eye
-        [73.5318, 51.5014],   # right eye
-        [56.0252, 71.7366],   # nose
-        [41.5493, 92.3655],   # left mouth
-        [70.7299, 92.2041],   # right mouth
-    ],
-    dtype=np.float32
-)
-
+from facerec.registry import default_registry
+from facerec.config import MODEL_PATH_FACEREC, REGISTRATION_DETECTOR_INPUT_SIZE
+from facerec import scrfd, alignment, preprocess
 
 class FaceExtractor:
     """
     SCRFD ONNX face detector + landmark alignment.
     Returns ONE FRONTAL face tensor at a time:
-      (3, 112, 112), float32, [-1, 1]
+      (1, 112, 112, 3), float32, [-1, 1] - NHWC, ready for ArcFace
     """
 
     def __init__(
@@ -32,20 +20,17 @@ class FaceExtractor:
         device: str = "cpu",
         det_thresh: float = 0.0,
         frontal_threshold: float = 0.7,  # Symmetry ratio for frontal check
+        input_size: int = REGISTRATION_DETECTOR_INPUT_SIZE,  # letterbox size for SCRFD, None = native resolution
         debug: bool = True
     ):
-        self.reader = PhotoFrameReader()
+        self.reader = PhotoFrameReader(swap_array_channels=False)  # swapped in blob + crop instead (preprocess.swaps_rb)
         self.det_thresh = det_thresh
         self.frontal_threshold = frontal_threshold
+        self.input_size = input_size
         self.debug = debug
 
-        providers = (
-            ["CUDAExecutionProvider", "CPUExecutionProvider"]
-            if device == "cuda"
-            else ["CPUExecutionProvider"]
-        )
-
-        self.sess = ort.InferenceSession(str(model_path), providers=providers)
+        # One session per model file per process, shared through the registry
+        self.sess = default_registry.session(model_path, device)
         self.input_name = self.sess.get_inputs()[0].name
 
         self.base_dir = Path(__file__).resolve().parent
@@ -62,7 +47,7 @@ class FaceExtractor:
         Returns None if face is not frontal.
         
         Returns:
-            np.ndarray or None: Face tensor (1, 3, 112, 112) if frontal, else None
+            np.ndarray or None: Face tensor (1, 112, 112, 3) if frontal, else None
         """
         image_np = self.reader.read(source)
 
@@ -71,11 +56,20 @@ class FaceExtractor:
 
         if image_np.ndim != 3 or image_np.shape[2] != 3:
             raise ValueError("Expected RGB image")
-
-        h, w, _ = image_np.shape
-        blob = self._preprocess(image_np)
-        outputs = self.sess.run(None, {self.input_name: blob})
+        swap_rb = preprocess.swaps_rb(source)
+
+        # Detect on a letterboxed copy, align on the full-resolution image
+        if self.input_size:
+            canvas, scale = scrfd.letterbox(image_np, self.input_size)
+        else:
+            canvas, scale = image_np, 1.0
+
+        h, w, _ = canvas.shape
+        with preprocess.default_pool.borrow((1, 3, h, w)) as blob:
+            preprocess.blob_from_images([canvas], blob, swap_rb=swap_rb)
+            outputs = preprocess.run_bound(self.sess, self.input_name, blob)
         score, lm = self._decode_outputs(outputs, w, h)
+        lm = lm / scale
 
         if score < self.det_thresh:
             raise ValueError("No face above detection threshold")
@@ -104,17 +98,17 @@ class FaceExtractor:
             return None
 
         # Only process frontal faces
-        face = self._align(image_np, lm)
+        face = alignment.align_faces(image_np, lm[None, ...], border_mode=cv2.BORDER_REFLECT, swap_rb=swap_rb)
         
         if self.debug:
-            face_vis = ((face.transpose(1, 2, 0) + 1.0) * 127.5).astype(np.uint8)
+            face_vis = alignment.to_uint8(face[0])
             face_vis_bgr = cv2.cvtColor(face_vis, cv2.COLOR_RGB2BGR)
             source_name = Path(source).stem if isinstance(source, (str, Path)) else f"face_{np.random.randint(1e9)}"
             fname = f"aligned_{source_name}.jpg"
             cv2.imwrite(str(self.debug_dir / fname), face_vis_bgr)
             print(f"  → Saved aligned face: {fname}\n")
         
-        return face[np.newaxis, ...]  # (1, 3, 112, 112)
+        return face  # (1, 112, 112, 3)
     
     # ------------------------------------------------------------
 
@@ -158,109 +152,19 @@ class FaceExtractor:
 
     def _decode_outputs(self, outputs, w, h):
         """
-        SCRFD decoder with proper anchor/stride handling.
+        SCRFD decoder (shared with MultiFaceExtractor), keeping only the best face.
         SCRFD uses anchor-based predictions with strides [8, 16, 32]
         """
+        scores, _, landmarks = scrfd.decode(outputs, w, h, det_thresh=self.det_thresh, top_k=1)
         
-        strides = [8, 16, 32]
-        
-        scores_all = []
-        landmarks_all = []
-        
-        num_levels = 3
-        
-        cls_outputs = outputs[0:num_levels]
-        bbox_outputs = outputs[num_levels:2*num_levels]
-        lmk_outputs = outputs[2*num_levels:3*num_levels]
-        
-        for stride_idx, stride in enumerate(strides):
-            cls_out = cls_outputs[stride_idx]
-            bbox_out = bbox_outputs[stride_idx] 
-            lmk_out = lmk_outputs[stride_idx]
-            
-            if cls_out.ndim == 3:
-                cls_out = cls_out[0]
-            if bbox_out.ndim == 3:
-                bbox_out = bbox_out[0]
-            if lmk_out.ndim == 3:
-                lmk_out = lmk_out[0]
-                
-            num_anchors = cls_out.shape[0]
-            
-            feat_h = int(np.ceil(h / stride))
-            feat_w = int(np.ceil(w / stride))
-            
-            shifts_x = np.arange(feat_w) * stride
-            shifts_y = np.arange(feat_h) * stride
-            shift_x, shift_y = np.meshgrid(shifts_x, shifts_y)
-            
-            anchor_centers = np.stack([shift_x.ravel(), shift_y.ravel()], axis=1).astype(np.float32)
-            
-            anchors_per_loc = 2
-            anchor_centers = np.repeat(anchor_centers, anchors_per_loc, axis=0)
-            
-            if len(anchor_centers) > num_anchors:
-                anchor_centers = anchor_centers[:num_anchors]
-            elif len(anchor_centers) < num_anchors:
-                padding = np.repeat(anchor_centers[-1:], num_anchors - len(anchor_centers), axis=0)
-                anchor_centers = np.vstack([anchor_centers, padding])
-            
-            lmk = lmk_out.reshape(-1, 5, 2)
-            lmk[:, :, 0] = lmk[:, :, 0] * stride + anchor_centers[:, 0:1]
-            lmk[:, :, 1] = lmk[:, :, 1] * stride + anchor_centers[:, 1:2]
-            
-            landmarks_all.append(lmk)
-            scores_all.append(cls_out[:, -1])
-        
-        scores = np.concatenate(scores_all, axis=0)
-        landmarks = np.concatenate(landmarks_all, axis=0)
-        
-        best = int(np.argmax(scores))
-        score = float(scores[best])
-        lm = landmarks[best]
+        if len(scores) == 0:
+            raise ValueError("No face above detection threshold")
         
-        return score, lm
+        return float(scores[0]), landmarks[0]
 
     # ------------------------------------------------------------
 
     def _preprocess(self, img: np.ndarray) -> np.ndarray:
-        """SCRFD preprocessing"""
-        img = img.astype(np.float32)
-        img -= 127.5
-        img /= 128.0
-        img = np.transpose(img, (2, 0, 1))
-        return img[None, ...]
-
-    # ------------------------------------------------------------
-
-    def _align(self, img: np.ndarray, lm: np.ndarray) -> np.ndarray:
-        """Landmark-based affine alignment → ArcFace format"""
-
-        src = lm.astype(np.float32)
-        dst = ARC_TEMPLATE
-
-        m, _ = cv2.estimateAffinePartial2D(
-            src, dst,
-            method=cv2.LMEDS  # Deterministic, robust to outliers
-        )
-        
-        if m is None:
-            raise ValueError("Affine transform failed")
-
-        face = cv2.warpAffine(
-            img, m, (112, 112),
-            flags=cv2.INTER_LINEAR,
-            borderMode=cv2.BORDER_REFLECT
-        )
-
-        if self.debug:
-            fname = f"debug_{np.random.randint(1e9)}.jpg"
-            cv2.imwrite(
-                str(self.debug_dir / fname),
-                cv2.cvtColor(face, cv2.COLOR_RGB2BGR)
-            )
-
-        face = face.astype(np.float32) / 127.5 - 1.0
-        face = np.transpose(face, (2, 0, 1))
-
-        return face
\ No newline at end of file
+        """SCRFD preprocessing into a fresh (1, 3, H, W) blob (hot paths use the buffer pool)"""
+        blob = np.empty((1, 3) + img.shape[:2], dtype=np.float32)
+        return preprocess.blob_from_images([img], blob)
@@ -0,0 +1,212 @@
+# In-process gallery of enrolled student embeddings (contiguous float32 matrix)
+import atexit
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from facerec.config import GALLERY_SNAPSHOT_PATH, GALLERY_CAPACITY, GALLERY_SNAPSHOT_DELAY_S
+
+
+class EmbeddingGallery:
+    """
+    Student embeddings kept in one preallocated (capacity, 512) float32 matrix.
+
+    - Rows are addressed by student_id; lookups gather rows with one fancy index.
+    - When full, the least-recently-used student is evicted.
+    - Every mutation bumps `version`, so clients can detect a stale gallery.
+    - State is persisted to / restored from an .npz snapshot. With autosave, the
+      snapshot is written snapshot_delay_s after a mutation (off the lock), so a
+      bulk enrollment of N upserts costs one write instead of N; flush() forces it.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Optional[Path] = GALLERY_SNAPSHOT_PATH,
+        capacity: int = GALLERY_CAPACITY,
+        dim: int = 512,
+        autosave: bool = True,
+        snapshot_delay_s: float = GALLERY_SNAPSHOT_DELAY_S
+    ):
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.capacity = capacity
+        self.dim = dim
+        self.autosave = autosave
+        self.snapshot_delay_s = snapshot_delay_s
+
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.rows: "OrderedDict[str, int]" = OrderedDict()  # student_id -> row, LRU order
+        self.free_rows = list(range(capacity - 1, -1, -1))
+        self.version = 0
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()   # serializes snapshot writes
+        self._save_timer: Optional[threading.Timer] = None
+
+        if self.snapshot_path and self.snapshot_path.exists():
+            self.load()
+        if self.autosave and self.snapshot_path:
+            atexit.register(self.flush)
+
+    # ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, student_id: str) -> bool:
+        return student_id in self.rows
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "size": len(self.rows),
+            "capacity": self.capacity
+        }
+
+    # ------------------------------------------------------------
+
+    def upsert(self, entries: Dict[str, np.ndarray]) -> int:
+        """
+        Insert or replace embeddings. Embeddings are L2-normalized on the way in.
+        All entries are validated before any is stored.
+
+        Returns:
+            new gallery version
+
+        Raises:
+            ValueError: wrong dimension, zero norm or non-finite values
+        """
+        normalized = {}
+        for student_id, embedding in entries.items():
+            embedding = np.asarray(embedding, dtype=np.float32)
+            if embedding.shape != (self.dim,):
+                raise ValueError(f"Embedding for {student_id} must have {self.dim} dimensions")
+            norm = np.linalg.norm(embedding)
+            if not np.isfinite(norm) or norm == 0:
+                raise ValueError(f"Embedding for {student_id} must be finite with a non-zero norm")
+            normalized[student_id] = embedding / norm
+
+        with self.lock:
+            for student_id, embedding in normalized.items():
+                row = self.rows.get(student_id)
+                if row is None:
+                    row = self._allocate_row()
+                    self.rows[student_id] = row
+                self.rows.move_to_end(student_id)
+
+                self.matrix[row] = embedding
+
+            self.version += 1
+            self._autosave()
+            return self.version
+
+    def delete(self, student_ids: List[str]) -> int:
+        """
+        Remove students from the gallery (unknown IDs are ignored).
+
+        Returns:
+            new gallery version
+        """
+        with self.lock:
+            for student_id in student_ids:
+                row = self.rows.pop(student_id, None)
+                if row is not None:
+                    self.free_rows.append(row)
+
+            self.version += 1
+            self._autosave()
+            return self.version
+
+    def get_matrix(self, student_ids: List[str]) -> np.ndarray:
+        """
+        Gather embeddings for the given students.
+
+        Returns:
+            (S, 512) float32, row order follows student_ids
+
+        Raises:
+            KeyError: with the list of student IDs not in the gallery
+        """
+        with self.lock:
+            missing = [sid for sid in student_ids if sid not in self.rows]
+            if missing:
+                raise KeyError(missing)
+
+            for sid in student_ids:
+                self.rows.move_to_end(sid)
+
+            row_idx = np.fromiter((self.rows[sid] for sid in student_ids), dtype=np.int64, count=len(student_ids))
+            return self.matrix[row_idx]
+
+    # ------------------------------------------------------------
+
+    def save(self) -> None:
+        """Write an atomic snapshot (ids + embeddings + version); the file I/O runs off the lock."""
+        if self.snapshot_path is None:
+            return
+
+        with self.save_lock:
+            with self.lock:
+                ids = list(self.rows.keys())
+                row_idx = np.fromiter(self.rows.values(), dtype=np.int64, count=len(ids))
+                embeddings = self.matrix[row_idx]   # fancy index = copy
+                version = self.version
+
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_suffix(".tmp.npz")
+            np.savez(
+                tmp_path,
+                student_ids=np.array(ids, dtype=str),
+                embeddings=embeddings,
+                version=np.int64(version)
+            )
+            os.replace(tmp_path, self.snapshot_path)
+
+    def flush(self) -> None:
+        """Write a pending autosave snapshot now."""
+        with self.lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    def load(self) -> None:
+        """Replace gallery contents with the snapshot on disk."""
+        with np.load(self.snapshot_path) as data:
+            ids = data["student_ids"].tolist()
+            embeddings = data["embeddings"].astype(np.float32)
+            version = int(data["version"])
+
+        # Keep the most recently used entries if the snapshot exceeds capacity
+        ids = ids[-self.capacity:]
+        embeddings = embeddings[-self.capacity:]
+
+        with self.lock:
+            self.matrix[:len(ids)] = embeddings
+            self.rows = OrderedDict((sid, row) for row, sid in enumerate(ids))
+            self.free_rows = list(range(self.capacity - 1, len(ids) - 1, -1))
+            self.version = version
+
+    # ------------------------------------------------------------
+
+    def _allocate_row(self) -> int:
+        if self.free_rows:
+            return self.free_rows.pop()
+
+        # Evict least-recently-used student
+        _, row = self.rows.popitem(last=False)
+        return row
+
+    def _autosave(self) -> None:
+        # Caller holds the lock: schedule one snapshot for this and any following mutations
+        if self.autosave and self.snapshot_path is not None and self._save_timer is None:
+            self._save_timer = threading.Timer(self.snapshot_delay_s, self._scheduled_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _scheduled_save(self) -> None:
+        with self.lock:
+            if self._save_timer is None:   # flush() got there first
+                return
+            self._save_timer = None
+        self.save()
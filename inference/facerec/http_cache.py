@@ -0,0 +1,244 @@
+# URL-keyed on-disk HTTP response cache for the download layer (conditional GET revalidation)
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+from facerec.config import DOWNLOAD_CACHE_DIR, DOWNLOAD_CACHE_MAX_MB
+
+TRIM_INTERVAL = 64   # stores between full rescans of the directory (other processes write to it too)
+_HEADER = struct.Struct("<I")   # length of the JSON metadata that precedes the body
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float   # fresh (no revalidation) until this time.time()
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional-request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def freshness_lifetime(headers) -> Optional[float]:
+    """
+    Seconds a response may be reused without revalidation (0 = revalidate every
+    time); None if it must not be stored at all.
+    """
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return float(match.group(1))
+
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            return max(parsedate_to_datetime(expires).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+
+class HTTPCache:
+    """
+    Response bodies of image URLs, stored as one file per URL in a directory.
+
+    Every process on the node (registration and attendance services, their
+    workers) can point at the same directory: entries are written atomically
+    (temp file + rename) and read without locks, so a URL downloaded by one
+    service is revalidated, not re-downloaded, by the other. Entries are
+    revalidated with If-None-Match / If-Modified-Since unless Cache-Control or
+    Expires says they are still fresh.
+
+    The directory is bounded to max_mb: when a store pushes it over, the least
+    recently used files (by mtime, refreshed on every hit) are deleted.
+    """
+
+    def __init__(self, directory: Optional[str] = DOWNLOAD_CACHE_DIR, max_mb: float = DOWNLOAD_CACHE_MAX_MB):
+        self.directory = Path(directory) if directory else None
+        self.max_bytes = int(max_mb * 1e6)
+
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._stores_since_trim = 0
+
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+
+        if self.enabled:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._trim()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None and self.max_bytes > 0
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.resp"
+
+    # ------------------------------------------------------------
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Stored response for url, fresh or not (None if absent, unreadable or for another URL)."""
+        if not self.enabled:
+            return None
+
+        path = self._path(url)
+        try:
+            with open(path, "rb") as f:
+                (meta_len,) = _HEADER.unpack(f.read(_HEADER.size))
+                meta = json.loads(f.read(meta_len))
+                body = f.read()
+        except (OSError, ValueError, struct.error):
+            return None
+        if meta.get("url") != url or len(body) != meta.get("size"):
+            return None
+
+        return CachedResponse(url, body, meta.get("etag"), meta.get("last_modified"), meta.get("expires_at", 0.0))
+
+    def put(self, url: str, body: bytes, headers) -> None:
+        """Store a 200 response (skipped if uncacheable or without a validator or lifetime)."""
+        if not self.enabled or len(body) > self.max_bytes:
+            return
+
+        lifetime = freshness_lifetime(headers)
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if lifetime is None or (not lifetime and not etag and not last_modified):
+            return  # could never be reused
+
+        self._write(url, body, etag, last_modified, time.time() + lifetime)
+
+    def refresh(self, entry: CachedResponse, headers) -> None:
+        """Entry was revalidated (304): take over updated validators/lifetime and mark it recently used."""
+        if not self.enabled:
+            return
+
+        lifetime = freshness_lifetime(headers)
+        if lifetime is None:
+            self._path(entry.url).unlink(missing_ok=True)
+            return
+
+        etag = headers.get("ETag") or entry.etag
+        last_modified = headers.get("Last-Modified") or entry.last_modified
+        expires_at = time.time() + lifetime
+        if (etag, last_modified) == (entry.etag, entry.last_modified) and not lifetime:
+            self.touch(entry.url)  # nothing changed, skip rewriting the body
+            return
+        self._write(entry.url, entry.body, etag, last_modified, expires_at)
+
+    def touch(self, url: str) -> None:
+        try:
+            os.utime(self._path(url))
+        except OSError:
+            pass
+
+    def record(self, outcome: str, size: int = 0) -> None:
+        """Count one download: "fresh" / "revalidated" (size = body bytes not transferred) / "miss"."""
+        with self._lock:
+            if outcome == "fresh":
+                self.fresh_hits += 1
+                self.bytes_saved += size
+            elif outcome == "revalidated":
+                self.revalidated += 1
+                self.bytes_saved += size
+            else:
+                self.misses += 1
+
+    # ------------------------------------------------------------
+
+    def _write(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str], expires_at: float) -> None:
+        meta = json.dumps({
+            "url": url, "etag": etag, "last_modified": last_modified,
+            "expires_at": expires_at, "size": len(body),
+        }).encode()
+
+        path = self._path(url)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(len(meta)))
+                f.write(meta)
+                f.write(body)
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self.stores += 1
+            self._bytes += _HEADER.size + len(meta) + len(body)
+            self._stores_since_trim += 1
+            trim = self._bytes > self.max_bytes or self._stores_since_trim >= TRIM_INTERVAL
+        if trim:
+            self._trim()
+
+    def _trim(self) -> None:
+        """Rescan the directory and delete least recently used files until it fits max_bytes."""
+        files = []
+        for path in self.directory.glob("*.resp"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # removed by another process meanwhile
+            files.append((st.st_mtime, st.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._bytes = total
+            self._stores_since_trim = 0
+            self.evictions += evicted
+
+    # ------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.fresh_hits + self.revalidated + self.misses
+            return {
+                "enabled": self.enabled,
+                "directory": str(self.directory) if self.directory else None,
+                "disk_mb": round(self._bytes / 1e6, 2),
+                "max_mb": round(self.max_bytes / 1e6, 2),
+                "fresh_hits": self.fresh_hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "hit_rate": round((self.fresh_hits + self.revalidated) / requests, 3) if requests else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "mb_saved": round(self.bytes_saved / 1e6, 2),
+            }
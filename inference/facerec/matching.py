@@ -0,0 +1,159 @@
+# Vectorized student <-> face matching on top of one similarity matrix
+import logging
+import numpy as np
+from typing import Dict, Tuple
+from facerec.assignment import assign
+
+logger = logging.getLogger(__name__)
+
+NORM_TOLERANCE = 1e-6   # |norm - 1| above this is logged as a non-normalized embedding
+CROSS_VALIDATION_THRESHOLD = 0.75   # two faces at least this similar are the same person
+
+
+def normalize_rows(x: np.ndarray, warn: bool = True) -> np.ndarray:
+    """
+    Defensive row-wise L2 normalization (returns a new array; zero rows stay zero).
+    Every row is divided by its norm, so already-normalized rows change only by
+    float rounding. With warn, rows whose norm is off by more than NORM_TOLERANCE
+    are logged (embeddings are expected to arrive normalized).
+    """
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    off = np.abs(norms - 1.0) > NORM_TOLERANCE
+    if warn and off.any():
+        logger.warning(
+            f"{int(off.sum())}/{len(x)} embeddings not L2-normalized "
+            f"(norms {float(norms[off].min()):.8f}..{float(norms[off].max()):.8f}), re-normalizing"
+        )
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def similarity_matrix(student_embeddings: np.ndarray, face_embeddings: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity for L2-normalized embeddings as a single GEMM.
+
+    Args:
+        student_embeddings: (S, 512) float32
+        face_embeddings: (F, 512) float32
+
+    Returns:
+        (S, F) float32
+    """
+    return student_embeddings @ face_embeddings.T
+
+
+def match_students(
+    sim: np.ndarray,
+    face_sim: np.ndarray,
+    similarity_threshold: float,
+    margin_threshold: float,
+    min_absolute_similarity: float,
+    cross_validation_threshold: float = CROSS_VALIDATION_THRESHOLD
+) -> Dict[str, np.ndarray]:
+    """
+    Top-2 / margin / threshold gating for every student at once.
+
+    Only faces >= min_absolute_similarity are candidates. A student is accepted if
+    the best candidate clears similarity_threshold and either beats the second best
+    by margin_threshold, or the two ambiguous faces are the same person
+    (face-to-face similarity >= cross_validation_threshold).
+
+    Args:
+        sim: (S, F) student-by-face similarity matrix
+        face_sim: (F, F) face-by-face similarity matrix used for cross-validation
+
+    Returns:
+        dict of (S,) arrays:
+            best_face, second_face: face indices (-1 if none)
+            confidence, second_confidence: similarities (nan if none)
+            margin: best - second (best - 0 if no second candidate)
+            has_candidate, accepted, below_threshold, ambiguous, cross_validated: bool
+            face_similarity: cross-check similarity (nan if not checked)
+    """
+    num_students, num_faces = sim.shape
+
+    masked = np.where(sim >= min_absolute_similarity, sim, -np.inf)
+    rows = np.arange(num_students)
+
+    # Two argmax passes keep "first face wins" on ties, same as a stable sort
+    best_face = masked.argmax(axis=1)
+    best = masked[rows, best_face]
+    if num_faces > 1:
+        masked[rows, best_face] = -np.inf
+        second_face = masked.argmax(axis=1)
+        second = masked[rows, second_face]
+    else:
+        second_face = np.zeros(num_students, dtype=np.int64)
+        second = np.full(num_students, -np.inf, dtype=sim.dtype)
+
+    has_candidate = np.isfinite(best)
+    has_second = np.isfinite(second)
+
+    margin = np.where(has_candidate, best - np.where(has_second, second, 0.0), 0.0)
+    below_threshold = has_candidate & (best < similarity_threshold)
+    needs_check = has_candidate & ~below_threshold & has_second & (margin < margin_threshold)
+
+    face_similarity = np.full(num_students, np.nan, dtype=np.float32)
+    face_similarity[needs_check] = face_sim[best_face[needs_check], second_face[needs_check]]
+    cross_ok = needs_check & (face_similarity >= cross_validation_threshold)
+
+    accepted = has_candidate & ~below_threshold & (~needs_check | cross_ok)
+
+    return {
+        "best_face": np.where(has_candidate, best_face, -1),
+        "second_face": np.where(has_second, second_face, -1),
+        "confidence": np.where(has_candidate, best, np.nan),
+        "second_confidence": np.where(has_second, second, np.nan),
+        "margin": margin,
+        "has_candidate": has_candidate,
+        "accepted": accepted,
+        "below_threshold": below_threshold,
+        "ambiguous": needs_check & ~cross_ok,
+        "cross_validated": needs_check,
+        "face_similarity": face_similarity
+    }
+
+
+def match_and_assign(
+    sim: np.ndarray,
+    face_sim: np.ndarray,
+    similarity_threshold: float,
+    margin_threshold: float,
+    min_absolute_similarity: float,
+    assignment_method: str = "auto"
+) -> Tuple[Dict[str, np.ndarray], Dict[int, int]]:
+    """
+    match_students gating, then one global assignment of faces to the accepted students.
+
+    A student can only take a face that clears both similarity_threshold and
+    min_absolute_similarity, and each face goes to at most one student. Acceptance is
+    decided on the student's best face, but when that face goes to another student the
+    student may be assigned a different eligible face: assigned_confidence and
+    assigned_margin describe the face actually assigned, so report those.
+
+    Returns:
+        (matches, face_for_student): the match_students arrays plus (S,) assigned_confidence
+        (similarity to the assigned face) and assigned_margin (that minus the best other
+        candidate face, as in margin; negative if a better face went to someone else),
+        nan for unassigned students; and face index per assigned student index
+    """
+    matches = match_students(sim, face_sim, similarity_threshold, margin_threshold, min_absolute_similarity)
+
+    pair_threshold = max(similarity_threshold, min_absolute_similarity)
+    eligible = matches["accepted"][:, None] & (sim >= pair_threshold)
+    students, faces = assign(sim, eligible, assignment_method)
+
+    assigned_confidence = np.full(sim.shape[0], np.nan, dtype=np.float32)
+    assigned_margin = np.full(sim.shape[0], np.nan, dtype=np.float32)
+    if len(students):
+        confidence = sim[students, faces]
+        others = np.where(sim[students] >= min_absolute_similarity, sim[students], -np.inf)
+        others[np.arange(len(students)), faces] = -np.inf
+        runner_up = others.max(axis=1)
+        assigned_confidence[students] = confidence
+        assigned_margin[students] = confidence - np.where(np.isfinite(runner_up), runner_up, 0.0)
+    matches["assigned_confidence"] = assigned_confidence
+    matches["assigned_margin"] = assigned_margin
+
+    return matches, dict(zip(students.tolist(), faces.tolist()))
@@ -1,31 +1,32 @@
 import cv2
 import numpy as np
-import onnxruntime as ort
 from pathlib import Path
-from typing import Union, Tuple
+from typing import Union, Tuple, List
 from face.vision_support.frame_renderer import PhotoFrameReader
-from facerec.config import MODEL_PATH_FACEREC
-
-# ArcFace canonical landmark template (112x112) - this step comes after face detection as always!
-ARC_TEMPLATE = np.array(
-    [
-        [38.2946, 51.6963],   # left eye
-        [73.5318, 51.5014],   # right eye
-        [56.0252, 71.7366],   # nose
-        [41.5493, 92.3655],   # left mouth
-        [70.7299, 92.2041],   # right mouth
-    ],
-    dtype=np.float32
+from facerec.registry import default_registry
+from facerec.config import (
+    MODEL_PATH_FACEREC,
+    DETECTOR_INPUT_SIZE,
+    DETECTOR_BATCH_INPUT_SIZE,
+    DETECTOR_MODE,
+    DETECTOR_TILE_OVERLAP,
+    DETECTOR_MAX_TILES,
+    DET_NMS_THRESH,
+    DET_TOP_K,
 )
-
+from facerec import scrfd, quality, alignment, preprocess
 
 class MultiFaceExtractor:
     """
     SCRFD ONNX face detector + landmark alignment for MULTIPLE faces.
     Returns N face tensors from a single image:
-      (N, 3, 112, 112), float32, [-1, 1]
+      (N, 112, 112, 3), float32, [-1, 1] - NHWC, ready for ArcFace
     
     NEW: Includes quality filtering to reject occluded, blurry, or side-profile faces
+
+    Array inputs are read as they are; where ARRAY_CHANNEL_ORDER=bgr they are fed to
+    both models channel-swapped (preprocess.swaps_rb) through the detector blob and
+    the aligned crops, so no full-frame swapped copy is made.
     """
 
     def __init__(
@@ -34,23 +35,36 @@ class MultiFaceExtractor:
         device: str = "cpu",
         det_thresh: float = 0.4,
         max_faces: int = None,  # None = return all faces
+        nms_thresh: float = DET_NMS_THRESH,
+        top_k: int = DET_TOP_K,  # max candidates entering NMS
+        input_size: int = DETECTOR_INPUT_SIZE,  # letterbox size for SCRFD, None = native resolution
+        detection_mode: str = DETECTOR_MODE,  # "letterbox" or "tiled"
+        tile_overlap: float = DETECTOR_TILE_OVERLAP,
+        max_tiles: int = DETECTOR_MAX_TILES,
         debug: bool = True,
         enable_quality_filter: bool = True  # NEW: toggle quality filtering
     ):
-        self.reader = PhotoFrameReader()
+        self.reader = PhotoFrameReader(swap_array_channels=False)  # swapped in blob + crops instead
         self.det_thresh = det_thresh
         self.max_faces = max_faces
+        self.nms_thresh = nms_thresh
+        self.top_k = top_k
+        self.input_size = input_size
+        self.detection_mode = detection_mode
+        self.tile_overlap = tile_overlap
+        self.max_tiles = max_tiles
         self.debug = debug
         self.enable_quality_filter = enable_quality_filter
 
-        providers = (
-            ["CUDAExecutionProvider", "CPUExecutionProvider"]
-            if device == "cuda"
-            else ["CPUExecutionProvider"]
-        )
-
-        self.sess = ort.InferenceSession(str(model_path), providers=providers)
+        # One session per model file per process, shared through the registry
+        self.sess = default_registry.session(model_path, device)
         self.input_name = self.sess.get_inputs()[0].name
+        
+        # Exported SCRFD models often have a fixed batch dim of 1, and some have no batch
+        # axis on their outputs at all (2-D, as insightface checks): both run per image
+        batch_dim = self.sess.get_inputs()[0].shape[0]
+        batched_outputs = len(self.sess.get_outputs()[0].shape) == 3
+        self.supports_batch = batched_outputs and (not isinstance(batch_dim, int) or batch_dim > 1)
 
         self.base_dir = Path(__file__).resolve().parent
         self.debug_dir = self.base_dir / "tmp"
@@ -62,6 +76,7 @@ class MultiFaceExtractor:
     def check_face_quality(self, img: np.ndarray, landmarks: np.ndarray) -> Tuple[bool, dict]:
         """
         Check if face is high quality and unoccluded.
+        Single-face wrapper around quality.score_faces (use that directly for many faces).
         
         Args:
             img: RGB image (H, W, 3)
@@ -70,122 +85,13 @@ class MultiFaceExtractor:
         Returns:
             (is_good_quality, quality_metrics): tuple
         """
-        h, w = img.shape[:2]
-        
-        # Extract landmark points
-        left_eye = landmarks[0]
-        right_eye = landmarks[1]
-        nose = landmarks[2]
-        left_mouth = landmarks[3]
-        right_mouth = landmarks[4]
-        
-        metrics = {}
-        rejection_reasons = []
-        
-        # CHECK 1: Face Size (too small = blurry/distant)
-        eye_dist = np.linalg.norm(right_eye - left_eye)
-        metrics['eye_distance'] = eye_dist
-        
-        MIN_EYE_DISTANCE = 10
-        if eye_dist < MIN_EYE_DISTANCE:
-            rejection_reasons.append(f"Too small (eye_dist={eye_dist:.1f}px)")
-        
-        # CHECK 2: Frontal Face (detect side profiles)
-        eye_center_x = (left_eye[0] + right_eye[0]) / 2
-        nose_offset_x = abs(nose[0] - eye_center_x)
-        nose_offset_ratio = nose_offset_x / eye_dist
-        metrics['nose_offset_ratio'] = nose_offset_ratio
-        
-        MAX_NOSE_OFFSET = 0.40
-        if nose_offset_ratio > MAX_NOSE_OFFSET:
-            rejection_reasons.append(f"Side profile (offset={nose_offset_ratio:.2f})")
-        
-        # Check vertical symmetry
-        nose_to_left_eye = np.linalg.norm(nose - left_eye)
-        nose_to_right_eye = np.linalg.norm(nose - right_eye)
-        eye_symmetry = min(nose_to_left_eye, nose_to_right_eye) / max(nose_to_left_eye, nose_to_right_eye)
-        metrics['eye_symmetry'] = eye_symmetry
-        
-        MIN_EYE_SYMMETRY = 0.60
-        if eye_symmetry < MIN_EYE_SYMMETRY:
-            rejection_reasons.append(f"Asymmetric (symmetry={eye_symmetry:.2f})")
-        
-        # CHECK 3: Not truncated at edges
-        all_x = landmarks[:, 0]
-        all_y = landmarks[:, 1]
-        EDGE_MARGIN = 20
-        
-        if (all_x.min() < EDGE_MARGIN or all_y.min() < EDGE_MARGIN or 
-            all_x.max() > (w - EDGE_MARGIN) or all_y.max() > (h - EDGE_MARGIN)):
-            rejection_reasons.append("Near edge")
-        
-        # CHECK 4: Brightness
-        face_points = landmarks.astype(np.int32)
-        x_coords = face_points[:, 0]
-        y_coords = face_points[:, 1]
-        
-        x_margin = int(eye_dist * 0.5)
-        y_margin = int(eye_dist * 0.7)
-        
-        x1_face = max(0, x_coords.min() - x_margin)
-        x2_face = min(w, x_coords.max() + x_margin)
-        y1_face = max(0, y_coords.min() - y_margin)
-        y2_face = min(h, y_coords.max() + y_margin)
-        
-        face_region = img[y1_face:y2_face, x1_face:x2_face]
-        
-        if face_region.size > 0:
-            gray_face = cv2.cvtColor(face_region, cv2.COLOR_RGB2GRAY)
-            mean_brightness = gray_face.mean()
-            metrics['brightness'] = mean_brightness
-            
-            MIN_BRIGHTNESS = 40
-            MAX_BRIGHTNESS = 220
-            
-            if mean_brightness < MIN_BRIGHTNESS:
-                rejection_reasons.append(f"Too dark ({mean_brightness:.0f})")
-            elif mean_brightness > MAX_BRIGHTNESS:
-                rejection_reasons.append(f"Overexposed ({mean_brightness:.0f})")
-            
-            # CHECK 5: Blur Detection
-            laplacian = cv2.Laplacian(gray_face, cv2.CV_64F)
-            blur_score = laplacian.var()
-            metrics['blur_score'] = blur_score
-            
-            MIN_BLUR_SCORE = 80
-            if blur_score < MIN_BLUR_SCORE:
-                rejection_reasons.append(f"Blurry (score={blur_score:.0f})")
-            
-            # CHECK 6: Occlusion Detection
-            def check_landmark_region(img, point, radius=8):
-                x, y = int(point[0]), int(point[1])
-                x1, y1 = max(0, x - radius), max(0, y - radius)
-                x2, y2 = min(w, x + radius), min(h, y + radius)
-                
-                region = img[y1:y2, x1:x2]
-                if region.size == 0:
-                    return 0
-                
-                gray_region = cv2.cvtColor(region, cv2.COLOR_RGB2GRAY)
-                return gray_region.var()
-            
-            eye_variance = (check_landmark_region(img, left_eye) + check_landmark_region(img, right_eye)) / 2
-            nose_variance = check_landmark_region(img, nose)
-            
-            metrics['eye_region_variance'] = eye_variance
-            metrics['nose_region_variance'] = nose_variance
-            
-            MIN_REGION_VARIANCE = 100
-            if eye_variance < MIN_REGION_VARIANCE:
-                rejection_reasons.append(f"Eyes occluded")
-            if nose_variance < MIN_REGION_VARIANCE:
-                rejection_reasons.append(f"Nose occluded")
+        m = quality.score_faces(img, landmarks[None, ...])[0]
         
-        is_good = len(rejection_reasons) == 0
-        metrics['is_good_quality'] = is_good
-        metrics['rejection_reasons'] = rejection_reasons
+        metrics = {name: float(m[name]) for name in quality.QUALITY_DTYPE.names if name not in ('rejections', 'is_good_quality')}
+        metrics['is_good_quality'] = bool(m['is_good_quality'])
+        metrics['rejection_reasons'] = quality.rejection_reasons(m)
         
-        return is_good, metrics
+        return metrics['is_good_quality'], metrics
 
     # ------------------------------------------------------------
 
@@ -194,9 +100,171 @@ class MultiFaceExtractor:
         Extract and align ALL high-quality faces from source image.
         
         Returns:
-            faces: np.ndarray with shape (N, 3, 112, 112), float32, range [-1, 1]
+            faces: np.ndarray with shape (N, 112, 112, 3), float32, range [-1, 1]
             num_faces: int, number of faces detected
         """
+        image_np = self.read_image(source)
+        swap_rb = preprocess.swaps_rb(source)
+        detections = self.detect(image_np, swap_rb)
+        
+        if len(detections) == 0:
+            raise ValueError(f"No faces detected above threshold {self.det_thresh}")
+
+        return self.select_and_align(image_np, detections, source, swap_rb)
+
+    # ------------------------------------------------------------
+
+    def detect(self, image_np: np.ndarray, swap_rb: bool = False) -> list:
+        """
+        Run SCRFD on an already-read image (with R and B swapped in the blob if swap_rb).
+        
+        With input_size set, the image is letterboxed to (input_size, input_size)
+        and landmarks are mapped back, so alignment still uses the full-resolution image.
+        
+        Returns:
+            list of (score, landmarks (5, 2)) in original image coordinates
+        """
+        if self.detection_mode == "tiled":
+            return self.detect_tiled(image_np, swap_rb)
+        
+        if self.input_size:
+            canvas, scale = scrfd.letterbox(image_np, self.input_size)
+        else:
+            canvas, scale = image_np, 1.0
+        
+        h, w, _ = canvas.shape
+        
+        # Pooled input buffer, bound to the session without another copy
+        with preprocess.default_pool.borrow((1, 3, h, w)) as blob:
+            preprocess.blob_from_images([canvas], blob, swap_rb=swap_rb)
+            outputs = preprocess.run_bound(self.sess, self.input_name, blob)
+
+        # Get ALL detections above threshold
+        detections = self._decode_outputs(outputs, w, h)
+        return [(score, lm / scale) for score, lm in detections]
+
+    # ------------------------------------------------------------
+
+    def detect_tiled(self, image_np: np.ndarray, swap_rb: bool = False) -> list:
+        """
+        High-resolution detection for large classroom photos.
+        
+        One coarse letterboxed pass of the full frame catches large faces; overlapping
+        tiles at detector input size catch small back-row faces at (close to) native
+        resolution. The image is downscaled first if needed so the grid never exceeds
+        max_tiles, which bounds the cost per image regardless of resolution. All tiles
+        and the coarse frame run as one batch; detections are merged with global NMS.
+        
+        Returns:
+            list of (score, landmarks (5, 2)) in original image coordinates
+        """
+        size = self.input_size or DETECTOR_BATCH_INPUT_SIZE
+        h, w = image_np.shape[:2]
+        
+        tile_scale = scrfd.tile_scale(h, w, size, self.tile_overlap, self.max_tiles)
+        tiled_img = image_np if tile_scale == 1.0 else cv2.resize(
+            image_np, (int(round(w * tile_scale)), int(round(h * tile_scale))), interpolation=cv2.INTER_AREA
+        )
+        tiles, offsets = scrfd.make_tiles(tiled_img, size, self.tile_overlap)
+        coarse, coarse_scale = scrfd.letterbox(image_np, size)
+        
+        with preprocess.default_pool.borrow((1 + len(tiles), 3, size, size)) as blob:
+            preprocess.blob_from_images([coarse] + tiles, blob, swap_rb=swap_rb)
+            per_item_outputs = self._run_detector(blob)
+        
+        scores_all, boxes_all, landmarks_all = [], [], []
+        
+        # Coarse pass: letterboxed coords -> original
+        scores, boxes, landmarks = scrfd.decode(per_item_outputs[0], size, size, self.det_thresh, self.nms_thresh, self.top_k)
+        scores_all.append(scores)
+        boxes_all.append(boxes / coarse_scale)
+        landmarks_all.append(landmarks / coarse_scale)
+        
+        # Tiles: tile coords -> tiled image -> original
+        th, tw = tiled_img.shape[:2]
+        for (x0, y0), outputs in zip(offsets, per_item_outputs[1:]):
+            scores, boxes, landmarks = scrfd.decode(outputs, size, size, self.det_thresh, self.nms_thresh, self.top_k)
+            
+            # Faces cut by an inner tile edge are seen whole by the neighbouring tile
+            keep = scrfd.inside_tile(boxes, x0, y0, size, tw, th)
+            offset = np.array([x0, y0], dtype=np.float32)
+            
+            scores_all.append(scores[keep])
+            boxes_all.append((boxes[keep] + np.tile(offset, 2)) / tile_scale)
+            landmarks_all.append((landmarks[keep] + offset) / tile_scale)
+        
+        scores = np.concatenate(scores_all)
+        boxes = np.concatenate(boxes_all)
+        landmarks = np.concatenate(landmarks_all)
+        
+        keep = scrfd.nms(boxes, scores, self.nms_thresh)
+        
+        if self.debug:
+            print(f"Tiled detection: {len(tiles)} tiles (scale={tile_scale:.2f}), {len(scores)} candidates → {len(keep)} faces")
+        
+        return [(float(scores[i]), landmarks[i]) for i in keep]
+
+    # ------------------------------------------------------------
+
+    def _run_detector(self, blob: np.ndarray) -> list:
+        """
+        Run SCRFD on an (N, 3, H, W) blob as one batch, or back-to-back with the same
+        shape if the model has a fixed batch dim. Returns per-item output lists.
+        """
+        if self.supports_batch:
+            outputs = preprocess.run_bound(self.sess, self.input_name, blob)
+            return [[out[i] for out in outputs] for i in range(len(blob))]
+        
+        return [preprocess.run_bound(self.sess, self.input_name, blob[i:i + 1]) for i in range(len(blob))]
+
+    # ------------------------------------------------------------
+
+    def return_tensors_batch(self, sources: list, input_size: int = None) -> List[Tuple[np.ndarray, int]]:
+        """
+        Detect faces in several images with one SCRFD call.
+        
+        All images are letterboxed to a shared (input_size, input_size) input and run
+        as one batch (or back-to-back with the same shape if the model has a fixed
+        batch dim). Landmarks are mapped back to original coordinates, so alignment
+        still crops from the full-resolution image.
+        
+        Returns:
+            List of (faces, num_faces) per source, same format as return_tensors.
+            Images without usable faces yield an empty (0, 112, 112, 3) array and 0.
+        """
+        input_size = input_size or self.input_size or DETECTOR_BATCH_INPUT_SIZE
+        images = [self.read_image(source) for source in sources]
+        swaps = [preprocess.swaps_rb(source) for source in sources]
+        
+        if self.detection_mode == "tiled":
+            # Tiles of each image are already batched inside detect_tiled
+            all_detections = [self.detect_tiled(img, swap_rb) for img, swap_rb in zip(images, swaps)]
+        else:
+            boxed = [scrfd.letterbox(img, input_size) for img in images]
+            with preprocess.default_pool.borrow((len(boxed), 3, input_size, input_size)) as blob:
+                for i, ((canvas, _), swap_rb) in enumerate(zip(boxed, swaps)):
+                    preprocess.blob_from_images([canvas], blob[i:i + 1], swap_rb=swap_rb)
+                per_item_outputs = self._run_detector(blob)
+            
+            all_detections = []
+            for (_, scale), outputs in zip(boxed, per_item_outputs):
+                detections = self._decode_outputs(outputs, input_size, input_size)
+                all_detections.append([(score, lm / scale) for score, lm in detections])
+        
+        results = []
+        for image_np, detections, source, swap_rb in zip(images, all_detections, sources, swaps):
+            try:
+                results.append(self.select_and_align(image_np, detections, source, swap_rb))
+            except ValueError as e:
+                if self.debug:
+                    print(f"  No usable faces: {e}")
+                results.append((np.empty((0, 112, 112, 3), dtype=np.float32), 0))
+        
+        return results
+
+    # ------------------------------------------------------------
+
+    def read_image(self, source) -> np.ndarray:
         image_np = self.reader.read(source)
 
         if image_np is None:
@@ -205,14 +273,15 @@ class MultiFaceExtractor:
         if image_np.ndim != 3 or image_np.shape[2] != 3:
             raise ValueError("Expected RGB image")
 
-        h, w, _ = image_np.shape
-        blob = self._preprocess(image_np)
+        return image_np
 
-        outputs = self.sess.run(None, {self.input_name: blob})
+    # ------------------------------------------------------------
 
-        # Get ALL detections above threshold
-        detections = self._decode_outputs(outputs, w, h)
-        
+    def select_and_align(self, image_np: np.ndarray, detections: list, source=None, swap_rb: bool = False) -> Tuple[np.ndarray, int]:
+        """
+        Sort, quality-filter, cap and align detections given in original image coordinates
+        (quality and crops as if R and B were swapped, if swap_rb).
+        """
         if len(detections) == 0:
             raise ValueError(f"No faces detected above threshold {self.det_thresh}")
 
@@ -221,27 +290,24 @@ class MultiFaceExtractor:
         
         # ===== NEW: QUALITY FILTERING =====
         if self.enable_quality_filter:
-            quality_filtered_detections = []
+            # All detections scored in one pass over a shared gray buffer
+            metrics = quality.score_faces(image_np, np.stack([lm for _, lm in detections]), swap_rb)
             
-            for idx, (score, lm) in enumerate(detections):
-                is_good, metrics = self.check_face_quality(image_np, lm)
-                
-                if is_good:
-                    quality_filtered_detections.append((score, lm))
-                    if self.debug:
+            if self.debug:
+                for idx, ((score, _), m) in enumerate(zip(detections, metrics)):
+                    if m['is_good_quality']:
                         print(f"  ✓ Face {idx}: PASSED quality checks (score={score:.3f})")
-                else:
-                    if self.debug:
-                        reasons = ', '.join(metrics['rejection_reasons'])
-                        print(f"  ✗ Face {idx}: REJECTED - {reasons}")
+                    else:
+                        print(f"  ✗ Face {idx}: REJECTED - {', '.join(quality.rejection_reasons(m))}")
             
-            if len(quality_filtered_detections) == 0:
-                raise ValueError("No high-quality faces detected after filtering")
+            total = len(detections)
+            detections = [d for d, good in zip(detections, metrics['is_good_quality']) if good]
             
-            detections = quality_filtered_detections
+            if len(detections) == 0:
+                raise ValueError("No high-quality faces detected after filtering")
             
             if self.debug:
-                print(f"Quality filtering: {len(detections)} faces passed out of {len(detections) + len([d for d in detections if not d])} total")
+                print(f"Quality filtering: {len(detections)} faces passed out of {total} total")
         # ===== END QUALITY FILTERING =====
         
         # Limit number of faces if specified
@@ -266,17 +332,17 @@ class MultiFaceExtractor:
             cv2.imwrite(str(self.debug_dir / fname_lm), cv2.cvtColor(img_with_all_lm, cv2.COLOR_RGB2BGR))
             print(f"Saved landmarks to: {self.debug_dir / fname_lm}")
         
-        # Align all detected faces
-        face_tensors = []
-        for idx, (score, lm) in enumerate(detections):
-            if self.debug:
-                print(f"Aligning face {idx+1}/{num_faces}: score={score:.4f}")
-            
-            face = self._align(image_np, lm, idx, source)
-            face_tensors.append(face)
+        # Align all detected faces in one batch: (N, 112, 112, 3)
+        landmarks = np.stack([lm for _, lm in detections])
+        faces = alignment.align_faces(image_np, landmarks, border_mode=cv2.BORDER_CONSTANT, swap_rb=swap_rb)
         
-        # Stack into (N, 3, 112, 112)
-        faces = np.stack(face_tensors, axis=0)
+        if self.debug:
+            from pathlib import Path
+            source_name = Path(source).stem if isinstance(source, (str, Path)) else f"frame_{np.random.randint(1e9)}"
+            for idx, ((score, _), face) in enumerate(zip(detections, alignment.to_uint8(faces))):
+                print(f"Aligned face {idx+1}/{num_faces}: score={score:.4f}")
+                fname = f"aligned_face{idx}_{source_name}.jpg"
+                cv2.imwrite(str(self.debug_dir / fname), cv2.cvtColor(face, cv2.COLOR_RGB2BGR))
         
         return faces, num_faces
 
@@ -284,130 +350,21 @@ class MultiFaceExtractor:
     
     def _decode_outputs(self, outputs, w, h):
         """
-        SCRFD decoder that returns ALL detections above threshold.
-        Returns list of (score, landmarks) tuples.
+        SCRFD decoder that returns ALL detections above threshold, after NMS.
+        Returns list of (score, landmarks) tuples, highest score first.
         """
+        scores, _, landmarks = scrfd.decode(
+            outputs, w, h,
+            det_thresh=self.det_thresh,
+            nms_thresh=self.nms_thresh,
+            top_k=self.top_k
+        )
         
-        strides = [8, 16, 32]
-        
-        scores_all = []
-        landmarks_all = []
-        
-        # Group outputs by stride level
-        num_levels = 3
-        cls_outputs = outputs[0:num_levels]
-        bbox_outputs = outputs[num_levels:2*num_levels]
-        lmk_outputs = outputs[2*num_levels:3*num_levels]
-        
-        for stride_idx, stride in enumerate(strides):
-            cls_out = cls_outputs[stride_idx]
-            bbox_out = bbox_outputs[stride_idx] 
-            lmk_out = lmk_outputs[stride_idx]
-            
-            # Remove batch dim if present
-            if cls_out.ndim == 3:
-                cls_out = cls_out[0]
-            if bbox_out.ndim == 3:
-                bbox_out = bbox_out[0]
-            if lmk_out.ndim == 3:
-                lmk_out = lmk_out[0]
-                
-            num_anchors = cls_out.shape[0]
-            
-            # Generate anchor grid
-            feat_h = int(np.ceil(h / stride))
-            feat_w = int(np.ceil(w / stride))
-            
-            shifts_x = np.arange(feat_w) * stride
-            shifts_y = np.arange(feat_h) * stride
-            shift_x, shift_y = np.meshgrid(shifts_x, shifts_y)
-            
-            anchor_centers = np.stack([shift_x.ravel(), shift_y.ravel()], axis=1).astype(np.float32)
-            
-            # SCRFD uses 2 anchors per location
-            anchors_per_loc = 2
-            anchor_centers = np.repeat(anchor_centers, anchors_per_loc, axis=0)
-            
-            # Match anchor count
-            if len(anchor_centers) > num_anchors:
-                anchor_centers = anchor_centers[:num_anchors]
-            elif len(anchor_centers) < num_anchors:
-                padding = np.repeat(anchor_centers[-1:], num_anchors - len(anchor_centers), axis=0)
-                anchor_centers = np.vstack([anchor_centers, padding])
-            
-            # Decode landmarks
-            lmk = lmk_out.reshape(-1, 5, 2)
-            lmk[:, :, 0] = lmk[:, :, 0] * stride + anchor_centers[:, 0:1]
-            lmk[:, :, 1] = lmk[:, :, 1] * stride + anchor_centers[:, 1:2]
-            
-            landmarks_all.append(lmk)
-            scores_all.append(cls_out[:, -1])
-        
-        # Concatenate all detections
-        scores = np.concatenate(scores_all, axis=0)
-        landmarks = np.concatenate(landmarks_all, axis=0)
-        
-        # Filter by threshold
-        valid_mask = scores >= self.det_thresh
-        valid_indices = np.where(valid_mask)[0]
-        
-        # Return list of (score, landmarks) for all valid detections
-        detections = []
-        for idx in valid_indices:
-            detections.append((float(scores[idx]), landmarks[idx]))
-        
-        return detections
+        return [(float(score), lm) for score, lm in zip(scores, landmarks)]
 
     # ------------------------------------------------------------
 
     def _preprocess(self, img: np.ndarray) -> np.ndarray:
-        """SCRFD preprocessing"""
-        img = img.astype(np.float32)
-        img -= 127.5
-        img /= 128.0
-        img = np.transpose(img, (2, 0, 1))
-        return img[None, ...]
-
-    # ------------------------------------------------------------
-
-    def _align(self, img: np.ndarray, lm: np.ndarray, face_idx: int = 0, source=None) -> np.ndarray:
-        """
-        Landmark-based affine alignment → ArcFace format
-        UPDATED: Uses LMEDS (deterministic) instead of RANSAC
-        """
-        src = lm.astype(np.float32)
-        dst = ARC_TEMPLATE
-        
-        # Use LMEDS - deterministic and stable for clean landmarks
-        m, _ = cv2.estimateAffinePartial2D(
-            src, dst,
-            method=cv2.LMEDS
-        )
-        
-        if m is None:
-            raise ValueError(f"Affine transform failed for face {face_idx}")
-
-        # Use LINEAR interpolation (better than CUBIC for face recognition)
-        face = cv2.warpAffine(
-            img, m, (112, 112),
-            flags=cv2.INTER_LINEAR,
-            borderMode=cv2.BORDER_CONSTANT,
-            borderValue=(0, 0, 0)
-        )        
-
-        if self.debug:
-            # Convert from [0, 255] to save
-            face_vis_bgr = cv2.cvtColor(face, cv2.COLOR_RGB2BGR)
-            
-            from pathlib import Path
-            source_name = Path(source).stem if isinstance(source, (str, Path)) else f"frame_{np.random.randint(1e9)}"
-            fname = f"aligned_face{face_idx}_{source_name}.jpg"
-            
-            save_path = self.debug_dir / fname
-            cv2.imwrite(str(save_path), face_vis_bgr)
-
-        # Normalize to [-1, 1]
-        face = face.astype(np.float32) / 127.5 - 1.0
-        face = np.transpose(face, (2, 0, 1))
-
-        return face
\ No newline at end of file
+        """SCRFD preprocessing into a fresh (1, 3, H, W) blob (hot paths use the buffer pool)"""
+        blob = np.empty((1, 3) + img.shape[:2], dtype=np.float32)
+        return preprocess.blob_from_images([img], blob)
@@ -1,7 +1,10 @@
+import threading
 import numpy as np
 from typing import Dict, Any, List
 from facerec.multi_face_extractor import MultiFaceExtractor
 from facerec.embedding_model import ArcFaceONNXEmbedder as FaceEmbeddingInference
+from facerec.pipeline import FacePipeline
+from facerec.registry import default_registry, EMBEDDER
 
 
 class AttendanceOrchestrator:
@@ -15,8 +18,28 @@ class AttendanceOrchestrator:
         detector: MultiFaceExtractor = None,
         embedder: FaceEmbeddingInference = None
     ):
-        self.detector = detector or MultiFaceExtractor()
-        self.embedder = embedder or FaceEmbeddingInference()
+        # Defaults are resolved from the shared registry on first use, not at import time
+        self._detector = detector
+        self._embedder = embedder
+        self._pipeline = None
+        self._pipeline_lock = threading.Lock()
+
+    @property
+    def detector(self) -> MultiFaceExtractor:
+        return self._detector or default_registry.get("detector")
+
+    @property
+    def embedder(self) -> FaceEmbeddingInference:
+        return self._embedder or default_registry.get(EMBEDDER)
+
+    @property
+    def pipeline(self) -> FacePipeline:
+        """Staged decode/detect/align/embed pipeline, started on first use (once, even under concurrent first use)."""
+        if self._pipeline is None:
+            with self._pipeline_lock:
+                if self._pipeline is None:
+                    self._pipeline = FacePipeline(self.detector, self.embedder)
+        return self._pipeline
 
     def run(self, image_path: str) -> Dict[str, Any]:
         """
@@ -29,11 +52,11 @@ class AttendanceOrchestrator:
             {
                 "embeddings": np.ndarray (N, 512), L2-normalized embeddings
                 "num_faces": int, number of faces detected
-                "face_tensors": np.ndarray (N, 3, 112, 112), aligned face crops
+                "face_tensors": np.ndarray (N, 112, 112, 3), aligned face crops
             }
         """
         
-        # Extract all faces from image: (N, 3, 112, 112)
+        # Extract all faces from image: (N, 112, 112, 3), already NHWC
         face_tensors, num_faces = self.detector.return_tensors(image_path)
         
         if num_faces == 0:
@@ -43,11 +66,8 @@ class AttendanceOrchestrator:
                 "face_tensors": np.array([])
             }
         
-        # Convert from NCHW to NHWC for embedding model
-        faces_nhwc = np.transpose(face_tensors, (0, 2, 3, 1))  # (N, 112, 112, 3)
-        
         # Generate embeddings for all faces
-        embeddings = self.embedder.embed(faces_nhwc)  # (N, 512), L2-normalized
+        embeddings = self.embedder.embed(face_tensors)  # (N, 512), L2-normalized
         
         return {
             "embeddings": embeddings,
@@ -59,16 +79,36 @@ class AttendanceOrchestrator:
         """
         Process multiple images, each potentially containing multiple faces.
         
+        Detection runs as one batched SCRFD call, then all aligned crops from all
+        images go through ArcFace together (chunked by the embedder's max batch size).
+        
         Args:
-            image_paths: List of image paths
+            image_paths: List of image paths (or RGB arrays / bytes)
         
         Returns:
             List of results, one per image
         """
+        detections = self.detector.return_tensors_batch(image_paths)
+        
+        counts = [num_faces for _, num_faces in detections]
+        all_tensors = [face_tensors for face_tensors, num_faces in detections if num_faces > 0]
+        
+        if all_tensors:
+            # One ArcFace call for every face across all images: (sum N, 112, 112, 3)
+            all_embeddings = self.embedder.embed(np.concatenate(all_tensors, axis=0))
+        else:
+            all_embeddings = np.empty((0, 512), dtype=np.float32)
+        
+        split_points = np.cumsum(counts)[:-1]
+        per_image_embeddings = np.split(all_embeddings, split_points)
+        
         results = []
-        for path in image_paths:
-            result = self.run(path)
-            result["image_path"] = path
-            results.append(result)
+        for path, (face_tensors, num_faces), embeddings in zip(image_paths, detections, per_image_embeddings):
+            results.append({
+                "embeddings": embeddings,
+                "num_faces": num_faces,
+                "face_tensors": face_tensors,
+                "image_path": path
+            })
         
-        return results
\ No newline at end of file
+        return results
@@ -4,16 +4,26 @@ from typing import Dict, Any
 from facerec.facerec_model import FaceExtractor
 from facerec.embedding_model import ArcFaceONNXEmbedder as FaceEmbeddingInference
 from facerec.aggregation import aggregate_embeddings, embeddings_consistent
+from facerec.registry import default_registry, EMBEDDER
 
 
 class FaceRegistrationOrchestrator:
     def __init__(
         self,
-        retinaface: FaceExtractor = FaceExtractor(),
-        embedder: FaceEmbeddingInference = FaceEmbeddingInference()
+        retinaface: FaceExtractor = None,
+        embedder: FaceEmbeddingInference = None
     ):
-        self.r = retinaface
-        self.e = embedder
+        # Defaults are resolved from the shared registry on first use, not at import time
+        self._r = retinaface
+        self._e = embedder
+
+    @property
+    def r(self) -> FaceExtractor:
+        return self._r or default_registry.get("registration_detector")
+
+    @property
+    def e(self) -> FaceEmbeddingInference:
+        return self._e or default_registry.get(EMBEDDER)
 
     # orchestrator.py - filters out None, keeps same output format
     def run(self, image_paths: list[str]) -> Dict[str, Any]:
@@ -40,13 +50,10 @@ class FaceRegistrationOrchestrator:
             raise ValueError("No frontal face found in any of the provided images")
         
         # Use only the first frontal face found
-        frontal_face = face_tensors[0]  # (1, 3, 112, 112)
-        
-        # Convert to NHWC
-        face_nhwc = np.transpose(frontal_face, (0, 2, 3, 1))  # (1, 112, 112, 3)
+        frontal_face = face_tensors[0]  # (1, 112, 112, 3), already NHWC
         
         # Generate embedding
-        embedding = self.e.embed(face_nhwc)  # (1, 512)
+        embedding = self.e.embed(frontal_face)  # (1, 512)
         
         # Check consistency (always True for single image)
         if not embeddings_consistent(embedding):
@@ -0,0 +1,185 @@
+# Staged decode -> detect -> align -> embed pipeline with bounded queues between stages
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+from facerec.config import PIPELINE_QUEUE_SIZE, PIPELINE_WORKERS, ATTENDANCE_DECODE_LONG_SIDE, ARRAY_CHANNEL_ORDER
+from facerec.downloader import default_downloader
+from facerec import preprocess
+
+_STOP = object()
+
+
+class _StageStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def record(self, elapsed: float, ok: bool) -> None:
+        with self.lock:
+            self.processed += 1
+            self.failed += 0 if ok else 1
+            self.total_s += elapsed
+            self.max_s = max(self.max_s, elapsed)
+
+
+class StagePipeline:
+    """
+    Generic multi-stage worker pipeline.
+
+    Each stage has its own worker thread(s) and a bounded input queue, so a slow
+    stage applies backpressure upstream instead of buffering unboundedly. Items are
+    submitted individually and complete through a Future; a stage that raises fails
+    only that item.
+
+    stages: list of (name, fn, num_workers); fn takes the previous stage's output.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any], int]], queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.names = [name for name, _, _ in stages]
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.stats_by_stage = {name: _StageStats() for name in self.names}
+        self.threads = []
+
+        for idx, (name, fn, num_workers) in enumerate(stages):
+            for worker in range(num_workers):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(idx, fn),
+                    name=f"pipeline-{name}-{worker}",
+                    daemon=True
+                )
+                t.start()
+                self.threads.append(t)
+
+    # ------------------------------------------------------------
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item at the first stage (blocks while that queue is full)."""
+        future = Future()
+        self.queues[0].put((item, future))
+        return future
+
+    def map(self, items: List[Any]) -> List[Future]:
+        """Submit all items; futures are returned in input order."""
+        return [self.submit(item) for item in items]
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage queue depth, throughput and latency."""
+        out = {}
+        for name, q in zip(self.names, self.queues):
+            s = self.stats_by_stage[name]
+            with s.lock:
+                out[name] = {
+                    "queue_depth": q.qsize(),
+                    "processed": s.processed,
+                    "failed": s.failed,
+                    "avg_latency_ms": round(s.total_s / s.processed * 1000, 2) if s.processed else 0.0,
+                    "max_latency_ms": round(s.max_s * 1000, 2)
+                }
+        return out
+
+    def close(self) -> None:
+        for q, name in zip(self.queues, self.names):
+            workers = sum(1 for t in self.threads if t.name.startswith(f"pipeline-{name}-"))
+            for _ in range(workers):
+                q.put(_STOP)
+
+    # ------------------------------------------------------------
+
+    def _worker(self, idx: int, fn: Callable[[Any], Any]) -> None:
+        in_q = self.queues[idx]
+        out_q = self.queues[idx + 1] if idx + 1 < len(self.queues) else None
+        stats = self.stats_by_stage[self.names[idx]]
+
+        while True:
+            job = in_q.get()
+            if job is _STOP:
+                return
+
+            item, future = job
+            start = time.perf_counter()
+            try:
+                result = fn(item)
+            except Exception as e:
+                stats.record(time.perf_counter() - start, ok=False)
+                future.set_exception(e)
+                continue
+            stats.record(time.perf_counter() - start, ok=True)
+
+            if out_q is None:
+                future.set_result(result)
+            else:
+                out_q.put((result, future))
+
+
+class FacePipeline(StagePipeline):
+    """
+    decode -> detect -> quality filter + align -> embed, one StagePipeline per process.
+
+    Sources are normally downloaded image bytes: the decode stage decodes them (at
+    reduced scale, decode_long_side) so decoding of one image overlaps detection and
+    embedding of others. Bytes and http(s) URLs (fetched through the shared downloader)
+    are fed like the arrays the batch path decodes them to, i.e. in ARRAY_CHANNEL_ORDER;
+    file paths and RGB arrays are read as by the detector. Each future resolves to the
+    same dict AttendanceOrchestrator.run returns: {"embeddings", "num_faces", "face_tensors"}.
+    """
+
+    def __init__(
+        self,
+        detector,
+        embedder,
+        workers: Dict[str, int] = PIPELINE_WORKERS,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        decode_long_side: int = ATTENDANCE_DECODE_LONG_SIDE
+    ):
+        self.detector = detector
+        self.embedder = embedder
+        self.decode_long_side = decode_long_side
+
+        super().__init__(
+            [
+                ("decode", self._decode, workers["decode"]),
+                ("detect", self._detect, workers["detect"]),
+                ("align", self._align, workers["align"]),
+                ("embed", self._embed, workers["embed"]),
+            ],
+            queue_size=queue_size
+        )
+
+    def _decode(self, source):
+        if isinstance(source, str) and source.startswith(("http://", "https://")):
+            source = default_downloader.fetch_bytes(source)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return source, default_downloader.decode(source, self.decode_long_side), ARRAY_CHANNEL_ORDER == "bgr"
+        return source, self.detector.read_image(source), preprocess.swaps_rb(source)
+
+    def _detect(self, item):
+        source, image_np, swap_rb = item
+        return source, image_np, swap_rb, self.detector.detect(image_np, swap_rb)
+
+    def _align(self, item):
+        source, image_np, swap_rb, detections = item
+        try:
+            return self.detector.select_and_align(image_np, detections, source, swap_rb)
+        except ValueError:
+            # No (good) faces in this image
+            return np.empty((0, 112, 112, 3), dtype=np.float32), 0
+
+    def _embed(self, item):
+        face_tensors, num_faces = item
+        if num_faces == 0:
+            embeddings = np.empty((0, 512), dtype=np.float32)
+        else:
+            embeddings = self.embedder.embed(face_tensors)
+
+        return {
+            "embeddings": embeddings,
+            "num_faces": num_faces,
+            "face_tensors": face_tensors
+        }
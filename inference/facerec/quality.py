@@ -0,0 +1,216 @@
+# Batched face quality scoring over all detections of one image
+import cv2
+import numpy as np
+from typing import List
+
+MIN_EYE_DISTANCE = 10
+MAX_NOSE_OFFSET = 0.40
+MIN_EYE_SYMMETRY = 0.60
+EDGE_MARGIN = 20
+MIN_BRIGHTNESS = 40
+MAX_BRIGHTNESS = 220
+MIN_BLUR_SCORE = 80
+MIN_REGION_VARIANCE = 100
+LANDMARK_PATCH_RADIUS = 8
+SHARED_GRAY_MIN_COVERAGE = 0.5   # face area / bounding box area above which one gray buffer is shared
+
+# Rejection bit flags
+TOO_SMALL = 1 << 0
+SIDE_PROFILE = 1 << 1
+ASYMMETRIC = 1 << 2
+NEAR_EDGE = 1 << 3
+TOO_DARK = 1 << 4
+OVEREXPOSED = 1 << 5
+BLURRY = 1 << 6
+EYES_OCCLUDED = 1 << 7
+NOSE_OCCLUDED = 1 << 8
+
+QUALITY_DTYPE = np.dtype([
+    ("eye_distance", np.float32),
+    ("nose_offset_ratio", np.float32),
+    ("eye_symmetry", np.float32),
+    ("brightness", np.float32),          # nan if the face region is empty
+    ("blur_score", np.float32),
+    ("eye_region_variance", np.float32),
+    ("nose_region_variance", np.float32),
+    ("rejections", np.uint16),           # OR of the flags above
+    ("is_good_quality", np.bool_),
+])
+
+
+def _patch_variances(img: np.ndarray, x1, y1, x2, y2, to_gray: int = cv2.COLOR_RGB2GRAY) -> np.ndarray:
+    """
+    Gray-level variance of many small patches of one RGB image.
+
+    Full-size patches are gathered into one (K * size, size, 3) stack and converted
+    to gray in a single call; the few clipped by the image border are done one by
+    one. Empty patches get 0.
+    """
+    size = 2 * LANDMARK_PATCH_RADIUS
+    out = np.zeros(x1.shape, dtype=np.float64)
+
+    full = ((x2 - x1) == size) & ((y2 - y1) == size)
+    if full.any():
+        offsets = np.arange(size)
+        rows = y1[full][:, None, None] + offsets[None, :, None]
+        cols = x1[full][:, None, None] + offsets[None, None, :]
+        stack = img[rows, cols].reshape(-1, size, 3)
+        gray = cv2.cvtColor(stack, to_gray)
+        out[full] = gray.reshape(-1, size * size).astype(np.float32).var(axis=1)
+
+    for idx in zip(*np.nonzero(~full & (x2 > x1) & (y2 > y1))):
+        patch = np.ascontiguousarray(img[y1[idx]:y2[idx], x1[idx]:x2[idx]])
+        out[idx] = cv2.cvtColor(patch, to_gray).var()
+
+    return out
+
+
+def _face_gray_regions(img: np.ndarray, x1, y1, x2, y2, has_region, to_gray: int = cv2.COLOR_RGB2GRAY):
+    """
+    Yield (i, gray face region). When the regions cover most of their bounding box
+    (crowded frames) the box is converted once and regions are views into it;
+    otherwise each region is converted on its own, so sparse faces in a large
+    frame never pay for a full-frame conversion.
+    """
+    idx = np.flatnonzero(has_region)
+    if idx.size == 0:
+        return
+
+    rx1, ry1 = int(x1[idx].min()), int(y1[idx].min())
+    rx2, ry2 = int(x2[idx].max()), int(y2[idx].max())
+    covered = ((x2 - x1) * (y2 - y1))[idx].sum()
+
+    if covered >= SHARED_GRAY_MIN_COVERAGE * (rx2 - rx1) * (ry2 - ry1):
+        gray = cv2.cvtColor(np.ascontiguousarray(img[ry1:ry2, rx1:rx2]), to_gray)
+        for i in idx:
+            yield i, gray[y1[i] - ry1:y2[i] - ry1, x1[i] - rx1:x2[i] - rx1]
+    else:
+        for i in idx:
+            yield i, cv2.cvtColor(np.ascontiguousarray(img[y1[i]:y2[i], x1[i]:x2[i]]), to_gray)
+
+
+def score_faces(img: np.ndarray, landmarks: np.ndarray, swap_rb: bool = False) -> np.ndarray:
+    """
+    Quality metrics for N faces of one image.
+
+    Size, pose and edge checks are array ops over all faces. Landmark-patch occlusion
+    variances come from one gather + one gray conversion for all (N, 3) patches;
+    brightness and blur (Laplacian variance) read gray face regions, shared from a
+    single conversion when faces are crowded.
+
+    Args:
+        img: RGB image (H, W, 3)
+        landmarks: (N, 5, 2) facial landmarks [x, y]
+        swap_rb: score as if R and B were swapped (the gray conversion weights them the other way round)
+
+    Returns:
+        structured array (N,) with QUALITY_DTYPE
+    """
+    h, w = img.shape[:2]
+    landmarks = np.asarray(landmarks, dtype=np.float32).reshape(-1, 5, 2)
+    n = len(landmarks)
+    out = np.zeros(n, dtype=QUALITY_DTYPE)
+    if n == 0:
+        return out
+
+    left_eye, right_eye, nose = landmarks[:, 0], landmarks[:, 1], landmarks[:, 2]
+    rejections = np.zeros(n, dtype=np.uint16)
+
+    # CHECK 1: Face size
+    eye_dist = np.linalg.norm(right_eye - left_eye, axis=1)
+    rejections |= np.where(eye_dist < MIN_EYE_DISTANCE, TOO_SMALL, 0).astype(np.uint16)
+
+    # CHECK 2: Frontal face
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nose_offset_ratio = np.abs(nose[:, 0] - (left_eye[:, 0] + right_eye[:, 0]) / 2) / eye_dist
+        d_left = np.linalg.norm(nose - left_eye, axis=1)
+        d_right = np.linalg.norm(nose - right_eye, axis=1)
+        eye_symmetry = np.minimum(d_left, d_right) / np.maximum(d_left, d_right)
+    rejections |= np.where(nose_offset_ratio > MAX_NOSE_OFFSET, SIDE_PROFILE, 0).astype(np.uint16)
+    rejections |= np.where(eye_symmetry < MIN_EYE_SYMMETRY, ASYMMETRIC, 0).astype(np.uint16)
+
+    # CHECK 3: Truncated at edges
+    mins = landmarks.min(axis=1)
+    maxs = landmarks.max(axis=1)
+    near_edge = (
+        (mins[:, 0] < EDGE_MARGIN) | (mins[:, 1] < EDGE_MARGIN) |
+        (maxs[:, 0] > w - EDGE_MARGIN) | (maxs[:, 1] > h - EDGE_MARGIN)
+    )
+    rejections |= np.where(near_edge, NEAR_EDGE, 0).astype(np.uint16)
+
+    # Face regions around the landmarks
+    pts = landmarks.astype(np.int32)
+    x_margin = (eye_dist * 0.5).astype(np.int32)
+    y_margin = (eye_dist * 0.7).astype(np.int32)
+    fx1 = np.clip(pts[:, :, 0].min(axis=1) - x_margin, 0, w)
+    fx2 = np.clip(pts[:, :, 0].max(axis=1) + x_margin, 0, w)
+    fy1 = np.clip(pts[:, :, 1].min(axis=1) - y_margin, 0, h)
+    fy2 = np.clip(pts[:, :, 1].max(axis=1) + y_margin, 0, h)
+    fx2, fy2 = np.maximum(fx2, fx1), np.maximum(fy2, fy1)
+
+    # Landmark patches (eyes + nose)
+    centers = pts[:, :3]  # (N, 3, 2)
+    r = LANDMARK_PATCH_RADIUS
+    px1 = np.clip(centers[:, :, 0] - r, 0, w)
+    px2 = np.clip(centers[:, :, 0] + r, 0, w)
+    py1 = np.clip(centers[:, :, 1] - r, 0, h)
+    py2 = np.clip(centers[:, :, 1] + r, 0, h)
+    px2, py2 = np.maximum(px2, px1), np.maximum(py2, py1)
+
+    # CHECK 4: Brightness, CHECK 5: Blur
+    has_region = (fx2 > fx1) & (fy2 > fy1)
+    brightness = np.full(n, np.nan, dtype=np.float64)
+    blur_score = np.full(n, np.nan, dtype=np.float64)
+    to_gray = cv2.COLOR_BGR2GRAY if swap_rb else cv2.COLOR_RGB2GRAY
+    for i, face in _face_gray_regions(img, fx1, fy1, fx2, fy2, has_region, to_gray):
+        brightness[i] = cv2.mean(face)[0]
+        blur_score[i] = cv2.meanStdDev(cv2.Laplacian(face, cv2.CV_32F))[1][0, 0] ** 2
+
+    rejections |= np.where(has_region & (brightness < MIN_BRIGHTNESS), TOO_DARK, 0).astype(np.uint16)
+    rejections |= np.where(has_region & (brightness > MAX_BRIGHTNESS), OVEREXPOSED, 0).astype(np.uint16)
+    rejections |= np.where(has_region & (blur_score < MIN_BLUR_SCORE), BLURRY, 0).astype(np.uint16)
+
+    # CHECK 6: Occlusion - texture variance of all (N, 3) landmark patches in one gather
+    patch_var = _patch_variances(img, px1, py1, px2, py2, to_gray)
+    eye_variance = (patch_var[:, 0] + patch_var[:, 1]) / 2
+    nose_variance = patch_var[:, 2]
+
+    rejections |= np.where(has_region & (eye_variance < MIN_REGION_VARIANCE), EYES_OCCLUDED, 0).astype(np.uint16)
+    rejections |= np.where(has_region & (nose_variance < MIN_REGION_VARIANCE), NOSE_OCCLUDED, 0).astype(np.uint16)
+
+    out["eye_distance"] = eye_dist
+    out["nose_offset_ratio"] = nose_offset_ratio
+    out["eye_symmetry"] = eye_symmetry
+    out["brightness"] = np.where(has_region, brightness, np.nan)
+    out["blur_score"] = np.where(has_region, blur_score, np.nan)
+    out["eye_region_variance"] = np.where(has_region, eye_variance, np.nan)
+    out["nose_region_variance"] = np.where(has_region, nose_variance, np.nan)
+    out["rejections"] = rejections
+    out["is_good_quality"] = rejections == 0
+
+    return out
+
+
+def rejection_reasons(metrics: np.void) -> List[str]:
+    """Human-readable reasons for one row of score_faces output."""
+    flags = int(metrics["rejections"])
+    reasons = []
+    if flags & TOO_SMALL:
+        reasons.append(f"Too small (eye_dist={metrics['eye_distance']:.1f}px)")
+    if flags & SIDE_PROFILE:
+        reasons.append(f"Side profile (offset={metrics['nose_offset_ratio']:.2f})")
+    if flags & ASYMMETRIC:
+        reasons.append(f"Asymmetric (symmetry={metrics['eye_symmetry']:.2f})")
+    if flags & NEAR_EDGE:
+        reasons.append("Near edge")
+    if flags & TOO_DARK:
+        reasons.append(f"Too dark ({metrics['brightness']:.0f})")
+    if flags & OVEREXPOSED:
+        reasons.append(f"Overexposed ({metrics['brightness']:.0f})")
+    if flags & BLURRY:
+        reasons.append(f"Blurry (score={metrics['blur_score']:.0f})")
+    if flags & EYES_OCCLUDED:
+        reasons.append("Eyes occluded")
+    if flags & NOSE_OCCLUDED:
+        reasons.append("Nose occluded")
+    return reasons
@@ -0,0 +1,204 @@
+# Offline INT8 / FP16 variants of the ArcFace and SCRFD models for CPU deployments.
+# Run from inference/: python -m facerec.quantization [--fp16] [--images DIR]
+# Needs the `onnx` package (build time only - the services just load the produced .onnx files).
+import argparse
+import numpy as np
+import onnx
+from pathlib import Path
+from typing import Iterator, List, Optional
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+from onnxruntime.transformers.float16 import convert_float_to_float16
+from facerec import scrfd, preprocess
+from facerec.config import (
+    MODEL_PATH_ARCFACE_FP32,
+    MODEL_PATH_FACEREC_FP32,
+    PRECISION_SUFFIXES,
+    CALIBRATION_DIR,
+    CALIBRATION_MAX_FACES,
+    DETECTOR_INPUT_SIZE,
+    ATTENDANCE_DECODE_LONG_SIDE,
+)
+from face.vision_support.decode import read_rgb
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+DEFAULT_IMAGE_DIR = Path(__file__).resolve().parents[2] / "server" / "uploads"
+
+
+def variant_path(fp32_path: Path, precision: str) -> Path:
+    """models/arc.onnx -> models/arc.int8.onnx (the name config.py resolves for that precision)."""
+    return fp32_path.with_name(f"{fp32_path.stem}{PRECISION_SUFFIXES[precision]}{fp32_path.suffix}")
+
+
+def list_images(image_dir: Path) -> List[Path]:
+    return sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+# ------------------------------------------------------------
+# Calibration data
+
+def read_as_downloaded(path: Path) -> np.ndarray:
+    """
+    A calibration photo decoded as attendance decodes downloaded photos: a reduced-scale
+    RGB array, which the extractors then feed to both models in ARRAY_CHANNEL_ORDER
+    (preprocess.swaps_rb) - not the RGB order they use for file paths.
+    """
+    return read_rgb(path, ATTENDANCE_DECODE_LONG_SIDE)
+
+
+def build_calibration_faces(image_paths: List[Path], max_faces: int = CALIBRATION_MAX_FACES) -> np.ndarray:
+    """
+    Aligned ArcFace inputs (N, 112, 112, 3) from real photos, decoded, detected with the
+    FP32 SCRFD model and aligned exactly as downloaded photos are in production
+    (quality filter on, channel order included).
+    """
+    from facerec.multi_face_extractor import MultiFaceExtractor
+
+    detector = MultiFaceExtractor(model_path=MODEL_PATH_FACEREC_FP32, debug=False)
+    faces = []
+    for faces_np, num_faces in detector.return_tensors_batch([read_as_downloaded(p) for p in image_paths]):
+        if num_faces:
+            faces.append(faces_np)
+
+    if not faces:
+        raise ValueError("No usable faces found in the calibration images")
+
+    faces = np.concatenate(faces, axis=0)
+    return faces[:max_faces]
+
+
+class ArcFaceCalibrationReader(CalibrationDataReader):
+    """Feeds aligned faces one at a time (works with fixed batch-1 exports too)."""
+
+    def __init__(self, faces: np.ndarray, input_name: str):
+        self.faces = faces
+        self.input_name = input_name
+        self._iter = None
+        self.rewind()
+
+    def get_next(self) -> Optional[dict]:
+        return next(self._iter, None)
+
+    def rewind(self) -> None:
+        self._iter = ({self.input_name: face[None, ...]} for face in self.faces)
+
+
+class SCRFDCalibrationReader(CalibrationDataReader):
+    """
+    Letterboxed detector blobs, produced lazily so full-size inputs never pile up in memory.
+    Decoded and channel-ordered like downloaded photos in production (read_as_downloaded).
+    """
+
+    def __init__(self, image_paths: List[Path], input_name: str, input_size: int = DETECTOR_INPUT_SIZE):
+        self.image_paths = image_paths
+        self.input_name = input_name
+        self.input_size = input_size
+        self._iter = None
+        self.rewind()
+
+    def _blobs(self) -> Iterator[dict]:
+        for path in self.image_paths:
+            image_np = read_as_downloaded(path)
+            canvas, _ = scrfd.letterbox(image_np, self.input_size)
+            blob = np.empty((1, 3, self.input_size, self.input_size), dtype=np.float32)
+            yield {self.input_name: preprocess.blob_from_images([canvas], blob, swap_rb=preprocess.swaps_rb(image_np))}
+
+    def get_next(self) -> Optional[dict]:
+        return next(self._iter, None)
+
+    def rewind(self) -> None:
+        self._iter = self._blobs()
+
+
+# ------------------------------------------------------------
+# Conversions
+
+def quantize_int8(
+    fp32_path: Path,
+    out_path: Path,
+    reader: CalibrationDataReader,
+    per_channel: bool = True,
+    calibrate_method: CalibrationMethod = CalibrationMethod.MinMax
+) -> Path:
+    """
+    Static INT8 quantization in QDQ format: int8 weights (per output channel), uint8
+    activations with ranges taken from the calibration reader - the layout ORT's x86
+    kernels run fastest. The model is shape-inferred and pre-optimized first.
+    """
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    prepared = out_path.with_suffix(".prep.onnx")
+
+    quant_pre_process(str(fp32_path), str(prepared), skip_symbolic_shape=True)
+    try:
+        quantize_static(
+            str(prepared),
+            str(out_path),
+            reader,
+            quant_format=QuantFormat.QDQ,
+            per_channel=per_channel,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=calibrate_method,
+        )
+    finally:
+        prepared.unlink(missing_ok=True)
+
+    return out_path
+
+
+def convert_fp16(fp32_path: Path, out_path: Path) -> Path:
+    """FP16 weights/compute with float32 inputs and outputs, so callers need no changes."""
+    model = convert_float_to_float16(onnx.load(str(fp32_path)), keep_io_types=True)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    onnx.save(model, str(out_path))
+    return out_path
+
+
+def input_name(model_path: Path) -> str:
+    return onnx.load(str(model_path), load_external_data=False).graph.input[0].name
+
+
+# ------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Build INT8 (and optionally FP16) model variants")
+    parser.add_argument("--images", type=Path, default=DEFAULT_IMAGE_DIR, help="calibration photos")
+    parser.add_argument("--max-faces", type=int, default=CALIBRATION_MAX_FACES)
+    parser.add_argument("--fp16", action="store_true", help="also write FP16 variants")
+    args = parser.parse_args()
+
+    image_paths = list_images(args.images)
+    print(f"{len(image_paths)} calibration images from {args.images}")
+
+    faces = build_calibration_faces(image_paths, args.max_faces)
+    CALIBRATION_DIR.mkdir(parents=True, exist_ok=True)
+    np.save(CALIBRATION_DIR / "faces.npy", faces)
+    print(f"{len(faces)} aligned calibration faces -> {CALIBRATION_DIR / 'faces.npy'}")
+
+    arc_int8 = quantize_int8(
+        MODEL_PATH_ARCFACE_FP32, variant_path(MODEL_PATH_ARCFACE_FP32, "int8"),
+        ArcFaceCalibrationReader(faces, input_name(MODEL_PATH_ARCFACE_FP32))
+    )
+    print(f"ArcFace INT8 -> {arc_int8}")
+
+    scrfd_int8 = quantize_int8(
+        MODEL_PATH_FACEREC_FP32, variant_path(MODEL_PATH_FACEREC_FP32, "int8"),
+        SCRFDCalibrationReader(image_paths, input_name(MODEL_PATH_FACEREC_FP32))
+    )
+    print(f"SCRFD INT8 -> {scrfd_int8}")
+
+    if args.fp16:
+        for path in (MODEL_PATH_ARCFACE_FP32, MODEL_PATH_FACEREC_FP32):
+            print(f"FP16 -> {convert_fp16(path, variant_path(path, 'fp16'))}")
+
+    print("\nCheck accuracy/latency with: python -m benchmarks.bench_quantization")
+
+
+if __name__ == "__main__":
+    main()
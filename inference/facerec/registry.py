@@ -0,0 +1,124 @@
+# Process-wide model registry: each ONNX model and model wrapper is loaded once, on first use,
+# and shared by every orchestrator and both FastAPI apps in the process.
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+from facerec.sessions import create_session
+from facerec.config import ARCFACE_MICROBATCH
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, shared model instances.
+
+    - session(path, device): one ONNX Runtime session per model file and device.
+      FaceExtractor and MultiFaceExtractor both run SCRFD through the same session.
+    - get(name): named wrappers (detector, embedder, ...) built by registered factories.
+
+    Resident memory is measured as the process RSS growth while a model loads
+    (weights + optimized graph; the ORT arena grows further on first inference).
+    """
+
+    def __init__(self):
+        # Re-entrant: component factories load their sessions through session()
+        self._lock = threading.RLock()
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._components: Dict[str, Any] = {}
+        self._sessions: Dict[tuple, Any] = {}
+        self._models: Dict[str, dict] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        with self._lock:
+            self._factories[name] = factory
+
+    def session(self, model_path, device: str = "cpu"):
+        key = (str(Path(model_path).resolve()), device)
+        with self._lock:
+            if key not in self._sessions:
+                before, start = rss_bytes(), time.perf_counter()
+                self._sessions[key] = create_session(model_path, device)
+                self._models[f"{Path(model_path).name}:{device}"] = {
+                    "path": key[0],
+                    "resident_mb": round((rss_bytes() - before) / 1e6, 1),
+                    "load_ms": round((time.perf_counter() - start) * 1000, 1),
+                }
+            return self._sessions[key]
+
+    def get(self, name: str) -> Any:
+        with self._lock:
+            if name not in self._components:
+                if name not in self._factories:
+                    raise KeyError(f"No model registered as '{name}'")
+                self._components[name] = self._factories[name]()
+            return self._components[name]
+
+    def peek(self, name: str) -> Optional[Any]:
+        """The component if it has already been built, else None (never loads anything)."""
+        with self._lock:
+            return self._components.get(name)
+
+    def preload(self, names: Iterable[str]) -> None:
+        for name in names:
+            self.get(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": dict(self._models),
+                "components": sorted(self._components),
+                "process_rss_mb": round(rss_bytes() / 1e6, 1),
+            }
+
+
+def _multi_face_detector():
+    from facerec.multi_face_extractor import MultiFaceExtractor
+    return MultiFaceExtractor()
+
+
+def _stream_detector():
+    from facerec.multi_face_extractor import MultiFaceExtractor
+    from facerec.config import STREAM_DETECTOR_INPUT_SIZE
+    return MultiFaceExtractor(input_size=STREAM_DETECTOR_INPUT_SIZE, detection_mode="letterbox", debug=False)
+
+
+def _registration_detector():
+    from facerec.facerec_model import FaceExtractor
+    return FaceExtractor(debug=False)
+
+
+def _embedder():
+    from facerec.embedding_model import ArcFaceONNXEmbedder
+    return ArcFaceONNXEmbedder()
+
+
+def _batched_embedder():
+    from facerec.batcher import MicroBatcher
+    return MicroBatcher(default_registry.get("embedder"))
+
+
+default_registry = ModelRegistry()
+default_registry.register("detector", _multi_face_detector)
+default_registry.register("stream_detector", _stream_detector)
+default_registry.register("registration_detector", _registration_detector)
+default_registry.register("embedder", _embedder)
+default_registry.register("batched_embedder", _batched_embedder)
+
+# Component request handlers embed through: crops of concurrent requests share ArcFace calls
+EMBEDDER = "batched_embedder" if ARCFACE_MICROBATCH else "embedder"
+
+
+def embedding_batcher_stats():
+    """Micro-batcher stats if this process has built one, else None (a health check must not load ArcFace)."""
+    batcher = default_registry.peek("batched_embedder")
+    return batcher.stats() if batcher is not None else None
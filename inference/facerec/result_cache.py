@@ -0,0 +1,272 @@
+# Content-addressed cache of per-image inference results (resubmitted photos skip inference)
+import hashlib
+import inspect
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+from facerec.config import (
+    MODEL_PATH_ARCFACE,
+    MODEL_PATH_FACEREC,
+    DECODE_MIN_SCALE,
+    ARRAY_CHANNEL_ORDER,
+    RESULT_CACHE_MAX_MB,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_DISK_MAX_MB,
+)
+from facerec import quality
+
+TRIM_INTERVAL = 64   # spills between full rescans of the spill directory (other processes spill there too)
+
+# Detector attributes that change what a cached result would contain
+DETECTOR_SETTINGS = (
+    "det_thresh", "max_faces", "nms_thresh", "top_k", "input_size",
+    "detection_mode", "tile_overlap", "max_tiles", "enable_quality_filter",
+)
+
+
+def model_fingerprint(model_path) -> str:
+    """name:size:mtime of a model file (just the name if it is missing)."""
+    path = Path(model_path)
+    try:
+        st = path.stat()
+    except OSError:
+        return path.name
+    return f"{path.name}:{st.st_size}:{int(st.st_mtime)}"
+
+
+def detector_settings(detector: Any) -> dict:
+    """DETECTOR_SETTINGS of a detector instance, or the constructor defaults of a detector class."""
+    if isinstance(detector, type):
+        params = inspect.signature(detector).parameters
+        return {name: params[name].default if name in params else None for name in DETECTOR_SETTINGS}
+    return {name: getattr(detector, name, None) for name in DETECTOR_SETTINGS}
+
+
+def result_version(kind: str, detector: Any) -> str:
+    """
+    Version tag of everything between image bytes and a cached result: both models,
+    the detector's thresholds/modes, the decode scale, the channel order of decoded
+    images and the quality-filter limits.
+    Changing any of them starts a fresh key space.
+    """
+    parts = [
+        kind,
+        model_fingerprint(MODEL_PATH_FACEREC),
+        model_fingerprint(MODEL_PATH_ARCFACE),
+        sorted(detector_settings(detector).items()),
+        DECODE_MIN_SCALE,
+        ARRAY_CHANNEL_ORDER,
+        sorted((k, v) for k, v in vars(quality).items() if k.isupper() and isinstance(v, (int, float))),
+    ]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+def content_key(data: bytes, version: str) -> str:
+    """Cache key of one encoded image under a result version."""
+    return f"{version}-{hashlib.sha256(data).hexdigest()}"
+
+
+def combined_key(keys: Iterable[str], version: str) -> str:
+    """Cache key of a result computed from several images, in order."""
+    return f"{version}-{hashlib.sha256('|'.join(keys).encode()).hexdigest()}"
+
+
+class ResultCache:
+    """
+    Size-bounded LRU of float32 result arrays (e.g. the (N, 512) embeddings of one
+    photo), keyed by content_key.
+
+    Entries evicted from memory are spilled to spill_dir as .npy files when a
+    directory is configured; a memory miss falls back to that store (memory-mapped
+    read, then promoted back into memory). Files are written atomically and outside
+    the cache lock, so lookups never wait on disk I/O. Every process on the node can
+    share the directory: it is bounded to spill_max_mb by rescanning it (every
+    TRIM_INTERVAL spills, or when this process's estimate exceeds the bound) and
+    deleting the least recently used files by mtime, which disk hits refresh.
+    Stored arrays are read-only and shared between callers.
+    """
+
+    def __init__(self, max_mb: float = RESULT_CACHE_MAX_MB, spill_dir: Optional[str] = RESULT_CACHE_DIR, spill_max_mb: float = RESULT_CACHE_DISK_MAX_MB):
+        self.max_bytes = int(max_mb * 1e6)
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.spill_max_bytes = int(spill_max_mb * 1e6)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_files = 0     # as of the last rescan, plus this process's spills since
+        self._disk_bytes = 0
+        self._spills_since_trim = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            self._trim()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    # ------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            evicted = self._insert(key, value)
+        self._spill(evicted)
+        return value
+
+    def put(self, key: str, value: np.ndarray) -> None:
+        if not self.enabled:
+            return
+
+        value = np.array(value, dtype=np.float32)  # private copy
+        value.setflags(write=False)
+        with self._lock:
+            evicted = self._insert(key, value)
+        self._spill(evicted)
+
+    def clear(self) -> None:
+        """Drop the in-memory entries (the disk store is left alone)."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    # ------------------------------------------------------------
+
+    def _insert(self, key: str, value: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+        # Caller holds the lock; returns the entries evicted from memory, to be spilled after releasing it
+        evicted = []
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key).nbytes
+        self._memory[key] = value
+        self._memory_bytes += value.nbytes
+
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            old_key, old_value = self._memory.popitem(last=False)
+            self._memory_bytes -= old_value.nbytes
+            self.evictions += 1
+            evicted.append((old_key, old_value))
+        return evicted if self.spill_dir is not None else []
+
+    def _path(self, key: str) -> Path:
+        return self.spill_dir / f"{key}.npy"
+
+    def _spill(self, entries: List[Tuple[str, np.ndarray]]) -> None:
+        """Write evicted entries to the spill directory (called without the lock)."""
+        for key, value in entries:
+            path = self._path(key)
+            if path.exists():
+                self._touch(path)  # already spilled, possibly by another process
+                continue
+
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with open(tmp, "wb") as f:
+                    np.save(f, value)
+                os.replace(tmp, path)
+                size = path.stat().st_size
+            except OSError:
+                tmp.unlink(missing_ok=True)
+                continue
+
+            with self._lock:
+                self._disk_files += 1
+                self._disk_bytes += size
+                self._spills_since_trim += 1
+                trim = self._disk_bytes > self.spill_max_bytes or self._spills_since_trim >= TRIM_INTERVAL
+            if trim:
+                self._trim()
+
+    def _trim(self) -> None:
+        """Rescan the spill directory and delete least recently used files until it fits spill_max_bytes."""
+        files = []
+        for path in self.spill_dir.glob("*.npy"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # removed by another process meanwhile
+            files.append((st.st_mtime, st.st_size, path))
+        files.sort()
+
+        total, count, evicted = sum(size for _, size, _ in files), len(files), 0
+        for _, size, path in files:
+            if total <= self.spill_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            count -= 1
+            evicted += 1
+
+        with self._lock:
+            self._disk_files = count
+            self._disk_bytes = total
+            self._spills_since_trim = 0
+            self.disk_evictions += evicted
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _read_disk(self, key: str) -> Optional[np.ndarray]:
+        # Looked up by file: any process on the node may have spilled it
+        if self.spill_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            value = np.array(np.load(path, mmap_mode="r"))
+        except (OSError, ValueError):
+            return None
+
+        value.setflags(write=False)
+        self._touch(path)  # most recently used, for every process's trim
+        return value
+
+    # ------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._memory),
+                "memory_mb": round(self._memory_bytes / 1e6, 2),
+                "max_memory_mb": round(self.max_bytes / 1e6, 2),
+                "disk_entries": self._disk_files if self.spill_dir is not None else None,
+                "disk_mb": round(self._disk_bytes / 1e6, 2) if self.spill_dir is not None else None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+            }
+
+
+# One cache per process, shared by the registration and attendance APIs
+default_result_cache = ResultCache()
@@ -0,0 +1,67 @@
+# Process-wide gate for ONNX Runtime runs, shared by every model and both APIs
+import threading
+import time
+from typing import Any, Callable
+from facerec.config import INFERENCE_MAX_CONCURRENT
+
+
+class InferenceScheduler:
+    """
+    Admits at most `max_concurrent` model runs at a time, in arrival order.
+
+    Each ORT run already spreads over ORT_INTRA_OP_THREADS cores, so letting
+    registration and attendance requests run models concurrently only makes them
+    fight over the same cores. Requests queue here instead; pre/post-processing
+    (download, decode, alignment, matching) still overlaps freely.
+    """
+
+    def __init__(self, max_concurrent: int = INFERENCE_MAX_CONCURRENT):
+        self.max_concurrent = max_concurrent
+        self._cond = threading.Condition()
+        self._running = 0
+        self._next_ticket = 0
+        self._serving = 0
+
+        self.runs = 0
+        self.waiting = 0
+        self.total_wait_s = 0.0
+        self.total_run_s = 0.0
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self.waiting += 1
+            # FIFO: wait for our turn and a free slot
+            while ticket != self._serving or self._running >= self.max_concurrent:
+                self._cond.wait()
+            self._serving += 1
+            self._running += 1
+            self.waiting -= 1
+            self._cond.notify_all()
+
+        admitted = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._cond:
+                self._running -= 1
+                self.runs += 1
+                self.total_wait_s += admitted - start
+                self.total_run_s += time.perf_counter() - admitted
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "running": self._running,
+                "waiting": self.waiting,
+                "runs": self.runs,
+                "avg_wait_ms": round(self.total_wait_s / self.runs * 1000, 2) if self.runs else 0.0,
+                "avg_run_ms": round(self.total_run_s / self.runs * 1000, 2) if self.runs else 0.0,
+            }
+
+
+default_scheduler = InferenceScheduler()
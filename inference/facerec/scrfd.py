@@ -0,0 +1,220 @@
+# SCRFD post-processing: score pre-filter, box/landmark decode for survivors, NMS
+import cv2
+import numpy as np
+from functools import lru_cache
+from typing import List, Tuple
+from facerec.config import ANCHOR_CACHE_SIZE
+
+STRIDES = (8, 16, 32)
+ANCHORS_PER_LOC = 2
+
+
+def letterbox(img: np.ndarray, size: int) -> Tuple[np.ndarray, float]:
+    """
+    Aspect-preserving resize into a (size, size) canvas, padded bottom/right with zeros.
+    Keeps detector input shapes fixed, so ONNX Runtime plans each shape once.
+
+    Returns:
+        (canvas, scale) - original coords = letterboxed coords / scale
+    """
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    canvas = np.zeros((size, size, 3), dtype=img.dtype)
+    canvas[:new_h, :new_w] = cv2.resize(img, (new_w, new_h), interpolation=interpolation)
+
+    return canvas, scale
+
+
+def _tile_starts(length: int, size: int, step: int) -> List[int]:
+    """Evenly spaced tile origins, first flush with 0 and last flush with the far edge."""
+    if length <= size:
+        return [0]
+    num = int(np.ceil((length - size) / step)) + 1
+    return np.linspace(0, length - size, num).round().astype(int).tolist()
+
+
+def tile_scale(h: int, w: int, size: int, overlap: float, max_tiles: int) -> float:
+    """Largest scale <= 1 at which the (size x size) tile grid has at most max_tiles tiles."""
+    step = max(1, int(size * (1 - overlap)))
+    scale = 1.0
+    while True:
+        th, tw = int(round(h * scale)), int(round(w * scale))
+        if len(_tile_starts(th, size, step)) * len(_tile_starts(tw, size, step)) <= max_tiles:
+            return scale
+        scale *= 0.9
+
+
+def make_tiles(img: np.ndarray, size: int, overlap: float) -> Tuple[List[np.ndarray], List[Tuple[int, int]]]:
+    """
+    Cut overlapping (size, size) tiles; tiles past a short image edge are zero-padded.
+
+    Returns:
+        (tiles, offsets) - offsets are the [x0, y0] of each tile in img
+    """
+    h, w = img.shape[:2]
+    step = max(1, int(size * (1 - overlap)))
+
+    tiles, offsets = [], []
+    for y0 in _tile_starts(h, size, step):
+        for x0 in _tile_starts(w, size, step):
+            crop = img[y0:y0 + size, x0:x0 + size]
+            tile = np.zeros((size, size, 3), dtype=img.dtype)
+            tile[:crop.shape[0], :crop.shape[1]] = crop
+            tiles.append(tile)
+            offsets.append((x0, y0))
+
+    return tiles, offsets
+
+
+def inside_tile(boxes: np.ndarray, x0: int, y0: int, size: int, w: int, h: int, margin: float = 2.0) -> np.ndarray:
+    """
+    Mask of tile-local boxes that do not touch an inner tile edge (edges on the
+    image border are fine - nothing lies beyond them).
+    """
+    keep = np.ones(len(boxes), dtype=bool)
+    if x0 > 0:
+        keep &= boxes[:, 0] > margin
+    if y0 > 0:
+        keep &= boxes[:, 1] > margin
+    if x0 + size < w:
+        keep &= boxes[:, 2] < size - margin
+    if y0 + size < h:
+        keep &= boxes[:, 3] < size - margin
+    return keep
+
+
+@lru_cache(maxsize=ANCHOR_CACHE_SIZE)
+def _anchor_grid(feat_h: int, feat_w: int, stride: int, anchors_per_loc: int) -> np.ndarray:
+    shift_x, shift_y = np.meshgrid(np.arange(feat_w) * stride, np.arange(feat_h) * stride)
+    centers = np.stack([shift_x.ravel(), shift_y.ravel()], axis=1).astype(np.float32)
+    centers = np.repeat(centers, anchors_per_loc, axis=0)
+
+    # Shared between callers - must never be modified in place
+    centers.setflags(write=False)
+    return centers
+
+
+def anchor_cache_info():
+    """Hit/miss statistics of the anchor grid cache."""
+    return _anchor_grid.cache_info()
+
+
+def anchor_centers(h: int, w: int, stride: int, num_anchors: int, anchors_per_loc: int = ANCHORS_PER_LOC) -> np.ndarray:
+    """
+    (num_anchors, 2) anchor centers [x, y] for one stride level, row-major,
+    anchors_per_loc consecutive anchors per location.
+
+    Grids are cached (bounded LRU) per (feat_h, feat_w, stride, anchors_per_loc),
+    so fixed-size frames never rebuild them. The returned array is read-only.
+    """
+    feat_h = int(np.ceil(h / stride))
+    feat_w = int(np.ceil(w / stride))
+    centers = _anchor_grid(feat_h, feat_w, stride, anchors_per_loc)
+
+    # Match anchor count of the model output
+    if len(centers) > num_anchors:
+        centers = centers[:num_anchors]
+    elif len(centers) < num_anchors:
+        padding = np.repeat(centers[-1:], num_anchors - len(centers), axis=0)
+        centers = np.vstack([centers, padding])
+
+    return centers
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_thresh: float) -> np.ndarray:
+    """
+    Greedy NMS with vectorized IoU against all remaining boxes.
+
+    Returns:
+        indices of kept boxes, highest score first
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = np.argsort(-scores, kind="stable")
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+
+        order = rest[iou <= iou_thresh]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def decode(
+    outputs: List[np.ndarray],
+    w: int,
+    h: int,
+    det_thresh: float,
+    nms_thresh: float = 0.4,
+    top_k: int = 1000
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode raw SCRFD outputs for one image.
+
+    Scores are thresholded first; boxes and landmarks are decoded only for the
+    survivors, the top_k highest-scoring survivors go through NMS.
+
+    Args:
+        outputs: 9 arrays ([cls x3, bbox x3, kps x3]), with or without batch dim 1
+        w, h: detector input size the outputs were produced from
+
+    Returns:
+        scores (K,), boxes (K, 4) [x1, y1, x2, y2], landmarks (K, 5, 2), highest score first
+    """
+    num_levels = len(STRIDES)
+    scores_all, boxes_all, landmarks_all = [], [], []
+
+    for level, stride in enumerate(STRIDES):
+        cls_out = outputs[level]
+        bbox_out = outputs[level + num_levels]
+        lmk_out = outputs[level + 2 * num_levels]
+
+        # Remove batch dim if present
+        if cls_out.ndim == 3:
+            cls_out, bbox_out, lmk_out = cls_out[0], bbox_out[0], lmk_out[0]
+
+        scores = cls_out[:, -1]
+        idx = np.flatnonzero(scores >= det_thresh)
+        if idx.size == 0:
+            continue
+
+        centers = anchor_centers(h, w, stride, cls_out.shape[0])[idx]
+
+        d = bbox_out[idx] * stride
+        boxes = np.concatenate([centers - d[:, 0:2], centers + d[:, 2:4]], axis=1)
+
+        lmk = lmk_out[idx].reshape(-1, 5, 2) * stride + centers[:, None, :]
+
+        scores_all.append(scores[idx])
+        boxes_all.append(boxes)
+        landmarks_all.append(lmk)
+
+    if not scores_all:
+        return (
+            np.empty(0, dtype=np.float32),
+            np.empty((0, 4), dtype=np.float32),
+            np.empty((0, 5, 2), dtype=np.float32)
+        )
+
+    scores = np.concatenate(scores_all)
+    boxes = np.concatenate(boxes_all)
+    landmarks = np.concatenate(landmarks_all)
+
+    if scores.size > top_k:
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        scores, boxes, landmarks = scores[top], boxes[top], landmarks[top]
+
+    keep = nms(boxes, scores, nms_thresh)
+
+    return scores[keep], boxes[keep], landmarks[keep]
@@ -0,0 +1,132 @@
+# Shared ONNX Runtime session factory: one place for providers, threading and graph optimization
+import hashlib
+import os
+import platform
+import onnxruntime as ort
+from pathlib import Path
+from typing import List, Optional
+from facerec.config import (
+    ORT_GRAPH_OPTIMIZATION,
+    ORT_EXECUTION_MODE,
+    ORT_INTRA_OP_THREADS,
+    ORT_INTER_OP_THREADS,
+    ORT_INTRA_OP_AFFINITIES,
+    ORT_ALLOW_SPINNING,
+    ORT_ENABLE_MEM_ARENA,
+    ORT_OPTIMIZED_MODEL_DIR,
+)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def providers_for(device: str) -> List[str]:
+    return (
+        ["CUDAExecutionProvider", "CPUExecutionProvider"]
+        if device == "cuda"
+        else ["CPUExecutionProvider"]
+    )
+
+
+def session_options(
+    optimization: str = ORT_GRAPH_OPTIMIZATION,
+    execution_mode: str = ORT_EXECUTION_MODE,
+    intra_op_threads: int = ORT_INTRA_OP_THREADS,
+    inter_op_threads: int = ORT_INTER_OP_THREADS,
+    intra_op_affinities: str = ORT_INTRA_OP_AFFINITIES,
+    allow_spinning: bool = ORT_ALLOW_SPINNING,
+    enable_mem_arena: bool = ORT_ENABLE_MEM_ARENA
+) -> ort.SessionOptions:
+    """Build SessionOptions from config (defaults) or explicit overrides."""
+    if optimization not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown graph optimization level: {optimization}")
+    if execution_mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {execution_mode}")
+
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[optimization]
+    opts.execution_mode = EXECUTION_MODES[execution_mode]
+    opts.intra_op_num_threads = intra_op_threads
+    opts.inter_op_num_threads = inter_op_threads
+    opts.enable_cpu_mem_arena = enable_mem_arena
+    opts.add_session_config_entry("session.intra_op.allow_spinning", "1" if allow_spinning else "0")
+
+    if intra_op_affinities:
+        opts.add_session_config_entry("session.intra_op_thread_affinities", intra_op_affinities)
+
+    return opts
+
+
+def _cpu_signature() -> str:
+    """CPU model + feature flags; "all"-level graphs use kernels picked for this CPU."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            lines = [line for line in f if line.startswith(("model name", "flags"))]
+        return "".join(sorted(set(lines)))
+    except OSError:
+        return f"{platform.machine()}:{platform.processor()}"
+
+
+def optimized_model_path(model_path: Path, optimization: str, cache_dir: Path) -> Path:
+    """
+    Cache file for the optimized graph of model_path. The name changes with the model
+    file, the optimization level, the ORT version and the CPU, so stale or foreign
+    graphs are never reused (e.g. a cache dir baked into an image for another host).
+    """
+    stat = model_path.stat()
+    key = f"{model_path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}:{optimization}:{ort.__version__}:{_cpu_signature()}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return cache_dir / f"{model_path.stem}.{optimization}.{digest}.onnx"
+
+
+def create_session(
+    model_path,
+    device: str = "cpu",
+    cache_dir: Optional[str] = ORT_OPTIMIZED_MODEL_DIR,
+    **options
+) -> ort.InferenceSession:
+    """
+    Create an InferenceSession with the shared configuration.
+
+    On CPU, the graph optimized for this box is saved under cache_dir the first time
+    and loaded as-is (with optimization disabled) afterwards, which skips the graph
+    transformations on every cold start. GPU graphs contain provider-specific nodes
+    and are never cached.
+
+    Args:
+        model_path: .onnx file
+        device: "cpu" or "cuda"
+        cache_dir: optimized-model cache directory, None/"" disables the cache
+        **options: overrides for session_options()
+    """
+    model_path = Path(model_path)
+    providers = providers_for(device)
+    optimization = options.get("optimization", ORT_GRAPH_OPTIMIZATION)
+
+    if not cache_dir or device != "cpu" or optimization == "disable":
+        return ort.InferenceSession(str(model_path), session_options(**options), providers=providers)
+
+    cached = optimized_model_path(model_path, optimization, Path(cache_dir))
+    if cached.exists():
+        opts = session_options(**{**options, "optimization": "disable"})
+        return ort.InferenceSession(str(cached), opts, providers=providers)
+
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+
+    opts = session_options(**options)
+    opts.optimized_model_filepath = str(tmp)
+    sess = ort.InferenceSession(str(model_path), opts, providers=providers)
+
+    # Publish atomically - concurrent workers may be optimizing the same model
+    os.replace(tmp, cached)
+    return sess
@@ -0,0 +1,130 @@
+# One streaming attendance session: frames -> detect -> track -> embed best views -> incremental similarities
+import time
+import numpy as np
+from typing import Any, Dict, List, Union
+from facerec.tracker import FaceTracker, Track
+from facerec.face_pool import FacePool
+from facerec.registry import default_registry, EMBEDDER
+from facerec.config import STREAM_DECODE_LONG_SIDE, ARRAY_CHANNEL_ORDER
+from face.vision_support.decode import decode_rgb
+
+
+class StreamSession:
+    """
+    Attendance over a sequence of frames (e.g. continuous capture during a lecture).
+
+    Each frame is detected with the streaming detector (smaller letterbox than the
+    still-photo one) and fed to a FaceTracker, so ArcFace runs once per tracked face
+    - a few times at most, when a clearly better view turns up - instead of for
+    every face in every frame.
+
+    Each embedded track is one face of a FacePool, i.e. one column of the (S, T)
+    student x track and (T, T) track x track similarity matrices, which are kept
+    up to date incrementally: a new or re-embedded track costs one (S,) and one
+    (T,) product, never a full recompute. Frames of one session are processed one
+    at a time.
+    """
+
+    def __init__(self, student_matrix: np.ndarray, detector=None, embedder=None, tracker: FaceTracker = None):
+        self.student_matrix = student_matrix            # (S, 512) normalized
+        self._detector = detector
+        self._embedder = embedder
+        self.tracker = tracker or FaceTracker()
+
+        self.pool = FacePool(student_matrix)            # info per column: track_id, best frame, embeddings
+        self._column: Dict[int, int] = {}               # track_id -> column
+
+        self.frames = 0
+        self.faces_detected = 0
+        self.embeddings_computed = 0
+        self.detect_s = 0.0
+        self.embed_s = 0.0
+
+    @property
+    def detector(self):
+        return self._detector or default_registry.get("stream_detector")
+
+    @property
+    def embedder(self):
+        return self._embedder or default_registry.get(EMBEDDER)
+
+    @property
+    def num_tracks(self) -> int:
+        """Tracks embedded so far (columns of the similarity matrices)."""
+        return len(self.pool)
+
+    @property
+    def columns(self) -> List[Dict[str, int]]:
+        return self.pool.info
+
+    # ------------------------------------------------------------
+
+    def process_frame(self, frame: Union[bytes, bytearray, np.ndarray]) -> Dict[str, Any]:
+        """Detect, track and (where due) embed one encoded or RGB frame."""
+        image_np = frame if isinstance(frame, np.ndarray) else decode_rgb(frame, STREAM_DECODE_LONG_SIDE)
+        swap_rb = ARRAY_CHANNEL_ORDER == "bgr"  # same order as photo attendance, applied in blob + crops
+        frame_index = self.frames
+
+        start = time.perf_counter()
+        detections = self.detector.detect(image_np, swap_rb)
+        # Counted once detection succeeded, in step with the tracker's own frame count
+        # (a frame that fails to detect leaves both untouched)
+        self.frames += 1
+        ready, active = self.tracker.update(image_np, detections, swap_rb)
+        self.detect_s += time.perf_counter() - start
+        self.faces_detected += len(detections)
+
+        if ready:
+            start = time.perf_counter()
+            embeddings = self.embedder.embed(np.concatenate([t.best_crop for t in ready], axis=0))
+            self.embed_s += time.perf_counter() - start
+            self.embeddings_computed += len(ready)
+            for track, embedding in zip(ready, embeddings):
+                self.tracker.add_embedding(track, embedding)
+                self._set_column(track)
+
+        return {
+            "frame_index": frame_index,
+            "faces_detected": len(detections),
+            "active_tracks": active,
+            "embedded_tracks": self.num_tracks,
+            "embeddings_computed": len(ready),
+        }
+
+    def _set_column(self, track: Track) -> None:
+        """Write a (re-)embedded track into the similarity matrices: O(S + T) work."""
+        info = {"frame_index": track.best_frame, "num_embeddings": track.num_embeddings}
+        col = self._column.get(track.track_id)
+        if col is None:
+            self._column[track.track_id] = self.pool.add(track.embedding[None], [{"track_id": track.track_id, **info}])[0]
+        else:
+            self.pool.replace(col, track.embedding, **info)
+
+    # ------------------------------------------------------------
+
+    def similarities(self):
+        """Current (S, T) student x track and (T, T) track x track similarity matrices."""
+        return self.pool.similarities()
+
+    def identify(
+        self,
+        similarity_threshold: float,
+        margin_threshold: float,
+        min_absolute_similarity: float,
+        assignment_method: str = "auto"
+    ) -> Dict[int, int]:
+        """Current student index -> column assignment, with the same gating as still-photo attendance."""
+        return self.pool.identify(similarity_threshold, margin_threshold, min_absolute_similarity, assignment_method)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "faces_detected": self.faces_detected,
+            "active_tracks": len(self.tracker.tracks),
+            "tracks_started": self.tracker.next_id,
+            "embedded_tracks": self.num_tracks,
+            "embeddings_computed": self.embeddings_computed,
+            "crops_aligned": self.tracker.crops_aligned,
+            "detect_ms_per_frame": round(self.detect_s / self.frames * 1000, 2) if self.frames else 0.0,
+            "embed_ms_per_frame": round(self.embed_s / self.frames * 1000, 2) if self.frames else 0.0,
+        }
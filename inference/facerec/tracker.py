@@ -0,0 +1,179 @@
+# Lightweight IoU tracker over SCRFD landmarks: each tracked face is embedded at its best frame(s)
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from facerec import quality, alignment
+from facerec.assignment import assign_greedy
+from facerec.config import (
+    STREAM_TRACK_IOU,
+    STREAM_TRACK_MAX_MISSED,
+    STREAM_TRACK_MIN_HITS,
+    STREAM_TRACK_MAX_EMBEDDINGS,
+    STREAM_REEMBED_GAIN,
+)
+
+BOX_SCALE = 2.0   # face box side / landmark extent (eyes-to-mouth span is about half the face)
+
+
+def landmark_boxes(landmarks: np.ndarray) -> np.ndarray:
+    """(N, 5, 2) landmarks -> (N, 4) square [x1, y1, x2, y2] face boxes around them."""
+    mins, maxs = landmarks.min(axis=1), landmarks.max(axis=1)
+    center = (mins + maxs) / 2
+    half = (maxs - mins).max(axis=1, keepdims=True) * (BOX_SCALE / 2)
+    return np.concatenate([center - half, center + half], axis=1)
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(A, 4) x (B, 4) boxes -> (A, B) IoU."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def face_quality(scores: np.ndarray, metrics: np.ndarray) -> np.ndarray:
+    """
+    Per-face score for picking the frame to embed: larger, more frontal, sharper and
+    more confident is better. Faces failing the quality filter score 0.
+    """
+    sharpness = np.minimum(metrics["blur_score"] / (2 * quality.MIN_BLUR_SCORE), 1.0)
+    score = scores * metrics["eye_distance"] * metrics["eye_symmetry"] * sharpness
+    return np.where(metrics["is_good_quality"], score, 0.0)
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: np.ndarray                        # (4,) last face box
+    first_frame: int
+    last_frame: int
+    hits: int = 1
+    missed: int = 0                        # consecutive frames without a detection
+    best_quality: float = 0.0
+    best_frame: int = -1
+    best_crop: Optional[np.ndarray] = None   # (1, 112, 112, 3) aligned crop not yet embedded
+    embedded_quality: float = 0.0
+    num_embeddings: int = 0
+    embedding_sum: Optional[np.ndarray] = None
+
+    @property
+    def embedding(self) -> Optional[np.ndarray]:
+        """(512,) L2-normalized mean of the embeddings taken so far."""
+        if self.embedding_sum is None:
+            return None
+        return self.embedding_sum / max(np.linalg.norm(self.embedding_sum), 1e-12)
+
+
+class FaceTracker:
+    """
+    Associates detections across consecutive frames and decides when to embed.
+
+    Detections are matched to active tracks greedily by IoU of landmark-derived face
+    boxes; unmatched detections start tracks, and tracks unseen for more than
+    max_missed frames end. Every frame's faces are quality-scored, and a face is
+    aligned only when it beats its track's best so far. A track is embedded once it
+    has been seen min_hits times (filters one-frame false positives), then again
+    only if its best quality improves by reembed_gain, at most max_embeddings times.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = STREAM_TRACK_IOU,
+        max_missed: int = STREAM_TRACK_MAX_MISSED,
+        min_hits: int = STREAM_TRACK_MIN_HITS,
+        max_embeddings: int = STREAM_TRACK_MAX_EMBEDDINGS,
+        reembed_gain: float = STREAM_REEMBED_GAIN
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.max_embeddings = max_embeddings
+        self.reembed_gain = reembed_gain
+
+        self.tracks: List[Track] = []   # active tracks
+        self.next_id = 0
+        self.frames = 0
+        self.crops_aligned = 0
+
+    def update(self, image_np: np.ndarray, detections: list, swap_rb: bool = False) -> Tuple[List[Track], int]:
+        """
+        Feed one frame's detections (list of (score, landmarks (5, 2)) as returned by
+        MultiFaceExtractor.detect). swap_rb: crops and quality see the frame with R and B swapped.
+
+        Returns:
+            (tracks whose best_crop should be embedded now, number of active tracks)
+        """
+        frame = self.frames
+        self.frames += 1
+
+        if detections:
+            scores = np.array([score for score, _ in detections], dtype=np.float32)
+            landmarks = np.stack([lm for _, lm in detections]).astype(np.float32)
+        else:
+            scores = np.empty(0, dtype=np.float32)
+            landmarks = np.empty((0, 5, 2), dtype=np.float32)
+        boxes = landmark_boxes(landmarks)
+
+        # Associate detections with active tracks
+        det_tracks: List[Optional[Track]] = [None] * len(detections)
+        if self.tracks and detections:
+            iou = box_iou(np.stack([t.box for t in self.tracks]), boxes)
+            rows, cols = assign_greedy(iou, iou >= self.iou_threshold)
+            for r, c in zip(rows.tolist(), cols.tolist()):
+                det_tracks[c] = self.tracks[r]
+
+        seen = {id(t) for t in det_tracks if t is not None}
+        for track in self.tracks:
+            if id(track) not in seen:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        for d, track in enumerate(det_tracks):
+            if track is None:
+                track = Track(self.next_id, boxes[d], first_frame=frame, last_frame=frame)
+                self.next_id += 1
+                self.tracks.append(track)
+                det_tracks[d] = track
+            else:
+                track.box = boxes[d]
+                track.last_frame = frame
+                track.hits += 1
+                track.missed = 0
+
+        # Align only the faces that are their track's best view so far
+        if detections:
+            face_scores = face_quality(scores, quality.score_faces(image_np, landmarks, swap_rb))
+            improved = [d for d, track in enumerate(det_tracks) if face_scores[d] > track.best_quality]
+            if improved:
+                crops = alignment.align_faces(
+                    image_np, landmarks[improved], border_mode=cv2.BORDER_CONSTANT, swap_rb=swap_rb
+                )
+                self.crops_aligned += len(improved)
+                for d, crop in zip(improved, crops):
+                    track = det_tracks[d]
+                    track.best_quality = float(face_scores[d])
+                    track.best_frame = frame
+                    track.best_crop = crop[None]
+
+        ready = [t for t in det_tracks if t is not None and self._should_embed(t)]
+        return ready, len(self.tracks)
+
+    def _should_embed(self, track: Track) -> bool:
+        if track.best_crop is None or track.hits < self.min_hits:
+            return False
+        if track.num_embeddings == 0:
+            return True
+        return (
+            track.num_embeddings < self.max_embeddings
+            and track.best_quality >= track.embedded_quality * (1 + self.reembed_gain)
+        )
+
+    def add_embedding(self, track: Track, embedding: np.ndarray) -> None:
+        """Record the embedding of track.best_crop and release the crop."""
+        track.embedding_sum = embedding.astype(np.float32) if track.embedding_sum is None else track.embedding_sum + embedding
+        track.num_embeddings += 1
+        track.embedded_quality = track.best_quality
+        track.best_crop = None
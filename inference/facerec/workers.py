@@ -0,0 +1,442 @@
+# Multi-process inference: a pool of worker processes, each with its own ONNX sessions
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from facerec.config import (
+    INFERENCE_WORKERS,
+    WORKER_POOL_MAX_PENDING,
+    WORKER_POOL_SUBMIT_TIMEOUT,
+    WORKER_POOL_START_TIMEOUT,
+    ORT_INTRA_OP_THREADS,
+)
+
+SHM_ALIGN = 64                # byte alignment of each array inside a shared block
+HEALTH_CHECK_INTERVAL = 0.5   # s between liveness checks of the worker processes
+
+# (offset, shape, dtype.str) of one array inside a shared memory block
+ArraySpec = Tuple[int, Tuple[int, ...], str]
+
+
+class WorkerPoolBusy(RuntimeError):
+    """Raised by WorkerPool.submit when no slot frees up within the submit timeout, or no worker is left."""
+
+
+# ------------------------------------------------------------
+# Shared memory transport
+
+def pack_arrays(arrays: Sequence[np.ndarray]) -> Tuple[SharedMemory, List[ArraySpec]]:
+    """
+    Copy arrays into one new shared memory block (one copy, no pickling).
+    The caller owns the block and must close/unlink it.
+    """
+    specs, offset = [], 0
+    for arr in arrays:
+        specs.append((offset, arr.shape, arr.dtype.str))
+        offset += -(-arr.nbytes // SHM_ALIGN) * SHM_ALIGN
+
+    shm = SharedMemory(create=True, size=max(offset, 1))
+    for arr, (start, shape, dtype) in zip(arrays, specs):
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)[...] = arr
+    return shm, specs
+
+
+def unpack_arrays(shm: SharedMemory, specs: List[ArraySpec]) -> List[np.ndarray]:
+    """
+    Zero-copy views into a shared block. All views must be dropped before
+    shm.close(), so copy anything that has to outlive the block.
+    """
+    return [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start) for start, shape, dtype in specs]
+
+
+def _release(shm: SharedMemory, unlink: bool = True) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        pass  # a view is still alive somewhere; the mapping goes away with it
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ------------------------------------------------------------
+# Worker process
+
+def _run_job(orchestrator, name: str, specs: List[ArraySpec]) -> Tuple[str, List[ArraySpec], List[int]]:
+    """
+    Detect + embed the images of one shared block; the embeddings go back in a new
+    block (not the aligned crops, which the API never reads and are ~150 KB a face).
+    """
+    shm = SharedMemory(name=name)
+    try:
+        results = orchestrator.run_batch(unpack_arrays(shm, specs))
+        counts = [r["num_faces"] for r in results]
+        found = [r for r in results if r["num_faces"] > 0]
+        embeddings = np.concatenate([r["embeddings"] for r in found]) if found else np.empty((0, 512), np.float32)
+        del results, found
+    finally:
+        _release(shm, unlink=False)  # the parent owns the input block
+
+    out, out_specs = pack_arrays([np.ascontiguousarray(embeddings)])
+    _release(out, unlink=False)      # the parent unlinks it after copying
+    return out.name, out_specs, counts
+
+
+def _worker_main(index: int, jobs, results) -> None:
+    # Imported here so the parent never loads the models
+    from facerec.multi_face_orchestrator import AttendanceOrchestrator
+    from facerec.registry import default_registry
+
+    default_registry.preload(["detector", "embedder"])
+    # One job at a time per worker: nothing to micro-batch with, so skip the batcher's wait
+    orchestrator = AttendanceOrchestrator(embedder=default_registry.get("embedder"))
+    results.put(("ready", index, os.getpid()))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, name, specs = job
+        try:
+            out_name, out_specs, counts = _run_job(orchestrator, name, specs)
+            results.put(("done", job_id, out_name, out_specs, counts))
+        except Exception as e:
+            results.put(("error", job_id, f"{type(e).__name__}: {e}"))
+
+
+@contextmanager
+def _environ(**values):
+    """Temporarily set environment variables (inherited by processes started inside)."""
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+# ------------------------------------------------------------
+
+class _Worker:
+    def __init__(self, index: int, process, jobs):
+        self.index = index
+        self.process = process
+        self.jobs = jobs
+        self.pid: Optional[int] = None
+        self.ready = False
+        self.startup_failed = False
+        self.in_flight = set()
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+
+class _Job:
+    __slots__ = ("future", "shm", "sources", "worker", "submitted")
+
+    def __init__(self, future: Future, shm: SharedMemory, sources: List[Any], worker: _Worker):
+        self.future = future
+        self.shm = shm
+        self.sources = sources
+        self.worker = worker
+        self.submitted = time.perf_counter()
+
+
+class WorkerPool:
+    """
+    Detection + embedding in N worker processes, so Python-heavy pre/post-processing
+    runs on all cores instead of contending for one GIL.
+
+    Each worker loads its own ONNX sessions (ORT intra-op threads split between
+    workers unless ORT_INTRA_OP_THREADS is set). The dispatcher sends each request to
+    the worker with the fewest jobs in flight; images go in and embeddings come back
+    through shared memory blocks, only their names and layouts are pickled (results
+    carry no face_tensors).
+
+    At most max_pending requests are in flight; submit() waits up to submit_timeout
+    for a slot and then raises WorkerPoolBusy. Dead workers are detected, their jobs
+    failed and the worker restarted.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = INFERENCE_WORKERS,
+        max_pending: int = WORKER_POOL_MAX_PENDING,
+        submit_timeout: float = WORKER_POOL_SUBMIT_TIMEOUT,
+        start_timeout: float = WORKER_POOL_START_TIMEOUT
+    ):
+        self.num_workers = max(1, num_workers)
+        self.max_pending = max_pending or 2 * self.num_workers
+        self.submit_timeout = submit_timeout
+        self.start_timeout = start_timeout
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._results = None
+        self._workers: List[_Worker] = []
+        self._jobs: Dict[int, _Job] = {}
+        self._ids = itertools.count()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._cond = threading.Condition()
+        self._collector = None
+        self._last_check = 0.0
+        self._collecting = False
+        self.started = False
+        self.closed = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_latency_s = 0.0
+
+    def _spawn(self, index: int) -> _Worker:
+        jobs = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, jobs, self._results),
+            name=f"inference-worker-{index}",
+            daemon=True
+        )
+        threads = ORT_INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // self.num_workers)
+        with _environ(ORT_INTRA_OP_THREADS=str(threads)):
+            process.start()
+        return _Worker(index, process, jobs)
+
+    def start(self, wait: bool = True) -> None:
+        """Start the worker processes; with wait, block until all have loaded their models."""
+        with self._cond:
+            if self.started:
+                return
+            self._results = self._ctx.Queue()
+            self._workers = [self._spawn(i) for i in range(self.num_workers)]
+            self._collecting = True
+            self._collector = threading.Thread(target=self._collect, name="worker-pool-collector", daemon=True)
+            self._collector.start()
+            self.started = True
+
+        if not wait:
+            return
+
+        with self._cond:
+            done = self._cond.wait_for(
+                lambda: all(w.ready or w.startup_failed for w in self._workers),
+                timeout=self.start_timeout
+            )
+            failed = [w.index for w in self._workers if w.startup_failed]
+        if failed or not done:
+            self.shutdown()
+            raise RuntimeError(f"Inference workers failed to start: {failed or 'timed out'}")
+
+    # ------------------------------------------------------------
+
+    def submit(self, images: List[np.ndarray]) -> Future:
+        """
+        Queue detection + embedding for the RGB images of one request.
+
+        Returns:
+            Future resolving to the same list of per-image dicts as
+            AttendanceOrchestrator.run_batch, with face_tensors None
+        """
+        if not self.started or self.closed:
+            raise RuntimeError("Worker pool is not running")
+
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            with self._cond:
+                self.rejected += 1
+            raise WorkerPoolBusy(f"All {self.max_pending} inference slots busy")
+
+        try:
+            shm, specs = pack_arrays([np.ascontiguousarray(img) for img in images])
+        except Exception:
+            self._slots.release()
+            raise
+
+        future = Future()
+        with self._cond:
+            candidates = [w for w in self._workers if not w.startup_failed]
+            if not candidates:
+                # Jobs queued to a worker that failed to restart would never finish
+                _release(shm)
+                self._slots.release()
+                self.rejected += 1
+                raise WorkerPoolBusy("No inference worker running (all failed to restart)")
+            worker = min(candidates, key=lambda w: len(w.in_flight))
+            job_id = next(self._ids)
+            self._jobs[job_id] = _Job(future, shm, list(images), worker)
+            worker.in_flight.add(job_id)
+            self.submitted += 1
+
+        worker.jobs.put((job_id, shm.name, specs))
+        return future
+
+    def run(self, images: List[np.ndarray]) -> List[Dict[str, Any]]:
+        """Blocking variant of submit."""
+        return self.submit(images).result()
+
+    # ------------------------------------------------------------
+
+    def _collect(self) -> None:
+        while True:
+            try:
+                message = self._results.get(timeout=HEALTH_CHECK_INTERVAL)
+            except queue.Empty:
+                if not self._collecting:
+                    break  # shut down and every worker's last results drained
+                message = None
+            except (EOFError, OSError):
+                break
+
+            if message is not None:
+                kind = message[0]
+                if kind == "ready":
+                    _, index, pid = message
+                    with self._cond:
+                        self._workers[index].ready = True
+                        self._workers[index].pid = pid
+                        self._cond.notify_all()
+                elif kind == "done":
+                    _, job_id, out_name, out_specs, counts = message
+                    self._finish(job_id, out_name=out_name, out_specs=out_specs, counts=counts)
+                elif kind == "error":
+                    _, job_id, error = message
+                    self._finish(job_id, error=RuntimeError(error))
+
+            if time.perf_counter() - self._last_check >= HEALTH_CHECK_INTERVAL:
+                self._check_workers()
+
+    def _finish(self, job_id: int, out_name: str = None, out_specs=None, counts=None, error: Exception = None) -> None:
+        if out_name is not None:
+            try:
+                embeddings = self._read_output(out_name, out_specs)
+            except Exception as e:
+                # A missing or unreadable block fails this job only, not the collector thread
+                error = RuntimeError(f"Inference results unreadable: {type(e).__name__}: {e}")
+
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return  # already failed (worker died or pool shut down)
+            job.worker.in_flight.discard(job_id)
+            if error is None:
+                job.worker.completed += 1
+                self.completed += 1
+            else:
+                job.worker.failed += 1
+                self.failed += 1
+            self.total_latency_s += time.perf_counter() - job.submitted
+
+        _release(job.shm)
+        self._slots.release()
+
+        if error is not None:
+            job.future.set_exception(error)
+            return
+
+        split_points = np.cumsum(counts)[:-1]
+        result = [
+            {"embeddings": emb, "num_faces": num_faces, "face_tensors": None, "image_path": source}
+            for source, num_faces, emb in zip(job.sources, counts, np.split(embeddings, split_points))
+        ]
+        job.future.set_result(result)
+
+    @staticmethod
+    def _read_output(out_name: str, out_specs: List[ArraySpec]) -> np.ndarray:
+        """Copy the embeddings out of a worker's result block and unlink it."""
+        out = SharedMemory(name=out_name)
+        try:
+            views = unpack_arrays(out, out_specs)
+            embeddings = np.array(views[0])
+            del views
+        finally:
+            _release(out)
+        return embeddings
+
+    def _fail_jobs(self, job_ids, error: Exception) -> None:
+        for job_id in list(job_ids):
+            self._finish(job_id, error=error)
+
+    def _check_workers(self) -> None:
+        """Fail the jobs of dead workers and restart them (unless they never came up)."""
+        self._last_check = time.perf_counter()
+        with self._cond:
+            if self.closed:
+                return
+            dead = [w for w in self._workers if not w.startup_failed and not w.process.is_alive()]
+
+        for worker in dead:
+            exitcode = worker.process.exitcode
+            self._fail_jobs(worker.in_flight, RuntimeError(f"Inference worker {worker.index} exited (code {exitcode})"))
+            with self._cond:
+                if not worker.ready:
+                    worker.startup_failed = True
+                    self._cond.notify_all()
+                    continue
+                replacement = self._spawn(worker.index)
+                replacement.restarts = worker.restarts + 1
+                self._workers[worker.index] = replacement
+
+    # ------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "num_workers": self.num_workers,
+                "workers": [
+                    {
+                        "index": w.index,
+                        "pid": w.pid,
+                        "alive": w.process.is_alive(),
+                        "ready": w.ready,
+                        "in_flight": len(w.in_flight),
+                        "completed": w.completed,
+                        "failed": w.failed,
+                        "restarts": w.restarts,
+                    }
+                    for w in self._workers
+                ],
+                "pending": len(self._jobs),
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_latency_ms": round(self.total_latency_s / (self.completed + self.failed) * 1000, 2)
+                if self.completed + self.failed else 0.0,
+            }
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop the workers after their queued jobs; jobs that still get no result fail."""
+        with self._cond:
+            if self.closed or not self.started:
+                self.closed = True
+                return
+            self.closed = True
+            workers = list(self._workers)
+
+        for worker in workers:
+            worker.jobs.put(None)
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+
+        # Workers finished their queued jobs before exiting; collect those results, then stop
+        self._collecting = False
+        self._collector.join()
+        with self._cond:
+            remaining = list(self._jobs)
+        self._fail_jobs(remaining, RuntimeError("Worker pool shut down"))
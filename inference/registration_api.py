@@ -1,26 +1,34 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, HTTPException
 from pydantic import BaseModel, HttpUrl
 from typing import List, Dict, Any, Optional
 import numpy as np
-import requests
-from io import BytesIO
-from PIL import Image
+import asyncio
 import logging
 
-from facerec.facerec_model import FaceExtractor
 from facerec.orchestrator import FaceRegistrationOrchestrator
-from facerec.embedding_model import ArcFaceONNXEmbedder
+from facerec.registry import default_registry, embedding_batcher_stats, EMBEDDER
+from facerec.scheduler import default_scheduler
+from facerec.downloader import default_downloader, ImageDownloadError
+from facerec.executor import default_cpu_executor
+from facerec.config import REGISTRATION_DECODE_LONG_SIDE
+from facerec.result_cache import default_result_cache, content_key, combined_key
+from api_common import download_images_from_urls, service_cache_version
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Student Registration API", version="1.0.0")
+# Routes live on a router so server.py can mount both services in one app
+router = APIRouter()
+
+# Models come from the process-wide registry (one copy each, shared with attendance_api)
+orchestrator = FaceRegistrationOrchestrator()
 
-# Initialize models globally (loaded once at startup)
-extractor = FaceExtractor(debug=False)
-embedder = ArcFaceONNXEmbedder()
-orchestrator = FaceRegistrationOrchestrator(retinaface=extractor, embedder=embedder)
+
+@router.on_event("startup")
+def load_models():
+    # Load at startup rather than on the first request
+    default_registry.preload(["registration_detector", EMBEDDER])
 
 
 # ===== REQUEST/RESPONSE MODELS =====
@@ -125,30 +133,44 @@ class BatchRegistrationResponse(BaseModel):
 
 # ===== HELPER FUNCTIONS =====
 
-def download_image_from_url(url: str) -> str:
-    """
-    Download image from Cloudinary URL and save temporarily.
-    
-    Returns:
-        Path to temporary image file (in-memory processing)
-    """
+async def download_image_bytes(url: str) -> bytes:
+    """Download the encoded image from a Cloudinary URL (shared keep-alive pool)."""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        img = Image.open(BytesIO(response.content))
-        
-        # Convert to RGB if needed
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Return numpy array directly
-        return np.array(img)
-    
-    except requests.RequestException as e:
-        raise HTTPException(status_code=400, detail=f"Failed to download image: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to process image: {str(e)}")
+        return await asyncio.wrap_future(default_downloader.submit(url, decode=False))
+    except ImageDownloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def decode_images(raw: List[bytes]) -> List[np.ndarray]:
+    """Decode downloaded images to RGB arrays; HTTPException naming the first bad one."""
+    images = []
+    for idx, data in enumerate(raw):
+        try:
+            images.append(default_downloader.decode(data, REGISTRATION_DECODE_LONG_SIDE))
+        except ImageDownloadError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to process image {idx + 1}: {str(e)}"
+            )
+    return images
+
+
+cache_version = service_cache_version("registration", lambda: orchestrator.r)
+
+
+def lookup_photo_set(raw: List[bytes]) -> tuple:
+    """(cache_key, cached embeddings or None) of a registration photo set; hashes off the event loop."""
+    version = cache_version()
+    key = combined_key([content_key(data, version) for data in raw], version)
+    return key, default_result_cache.get(key)
+
+
+def embed_frontal_face(image: np.ndarray) -> np.ndarray:
+    """(512,) embedding of the frontal face in an RGB image; ValueError if there is none."""
+    face_tensor = orchestrator.r.return_tensors(image)  # (1, 112, 112, 3)
+    if face_tensor is None:
+        raise ValueError("No frontal face found")
+    return orchestrator.e.embed(face_tensor)[0]
 
 
 def validate_registration_images(image_urls: List[str]) -> None:
@@ -162,7 +184,7 @@ def validate_registration_images(image_urls: List[str]) -> None:
 
 # ===== API ENDPOINTS =====
 
-@app.get("/")
+@router.get("/")
 def root():
     return {
         "message": "Student Registration API",
@@ -175,18 +197,24 @@ def root():
     }
 
 
-@app.get("/health")
+@router.get("/health")
 def health_check():
     return {
         "status": "healthy",
         "models_loaded": True,
         "extractor": "SCRFD",
-        "embedder": "ArcFace"
+        "embedder": "ArcFace",
+        "models": default_registry.stats(),
+        "scheduler": default_scheduler.stats(),
+        "cpu_executor": default_cpu_executor.stats(),
+        "result_cache": default_result_cache.stats(),
+        "download_cache": default_downloader.cache.stats(),
+        "embedding_batcher": embedding_batcher_stats()
     }
 
 
-@app.post("/api/v1/register", response_model=RegistrationResponse)
-def register_student(request: RegistrationRequest):
+@router.post("/api/v1/register", response_model=RegistrationResponse)
+async def register_student(request: RegistrationRequest):
     """
     Register a single student with 2-4 photos.
     
@@ -202,22 +230,31 @@ def register_student(request: RegistrationRequest):
     # Validate
     validate_registration_images(request.image_urls)
     
-    # Download images
-    image_arrays = []
-    for idx, url in enumerate(request.image_urls):
-        logger.info(f"  Downloading image {idx + 1}/{len(request.image_urls)}: {url}")
+    # Download images (all URLs concurrently, kept encoded until we know inference is needed)
+    logger.info(f"  Downloading {len(request.image_urls)} images")
+    downloads = download_images_from_urls([str(url) for url in request.image_urls], decode=False)
+    
+    raw = []
+    for idx, future in enumerate(downloads):
         try:
-            img_array = download_image_from_url(str(url))
-            image_arrays.append(img_array)
+            raw.append(await asyncio.wrap_future(future))
         except Exception as e:
             raise HTTPException(
                 status_code=400,
                 detail=f"Failed to process image {idx + 1}: {str(e)}"
             )
     
-    # Process images through registration pipeline
+    # The same photo set was registered before (e.g. a retried request): reuse its embedding
+    key, cached = await default_cpu_executor.run(lookup_photo_set, raw)
+    
+    # Process images through registration pipeline (off the event loop)
     try:
-        result = orchestrator.run(image_arrays)
+        if cached is not None:
+            result = {"centroid": cached[0], "embeddings": cached, "num_faces": len(cached)}
+        else:
+            image_arrays = await default_cpu_executor.run(decode_images, raw)
+            result = await default_cpu_executor.run(orchestrator.run, image_arrays)
+            default_result_cache.put(key, result["embeddings"])
         
         centroid = result["centroid"]  # (512,) L2-normalized
         embeddings = result["embeddings"]  # (N, 512)
@@ -242,7 +279,7 @@ def register_student(request: RegistrationRequest):
             roll_number=request.roll_number,
             email=request.email,
             embedding=centroid.tolist(),
-            num_images_processed=len(image_arrays),
+            num_images_processed=len(raw),
             num_faces_detected=num_faces,
             embeddings_consistent=is_consistent,
             average_quality_score=round(avg_quality, 3),
@@ -250,6 +287,8 @@ def register_student(request: RegistrationRequest):
             message=message
         )
     
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"  ✗ Registration failed: {str(e)}")
         raise HTTPException(
@@ -261,27 +300,33 @@ def register_student(request: RegistrationRequest):
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
-@app.post("/api/v1/register/batch", response_model=BatchRegistrationResponse)
-def register_students_batch(request: BatchRegistrationRequest):
+@router.post("/api/v1/register/batch", response_model=BatchRegistrationResponse)
+async def register_students_batch(request: BatchRegistrationRequest):
     """
     Register multiple students in a single request.
     
     Processes each student independently and returns results for all.
-    Failed registrations don't stop the batch process.
+    Failed registrations don't stop the batch process. Students are registered
+    concurrently; downloads overlap and inference is bounded by the CPU executor.
     """
     
     logger.info(f"Batch registration: {len(request.students)} students")
     
+    outcomes = await asyncio.gather(
+        *(register_student(student_req) for student_req in request.students),
+        return_exceptions=True
+    )
+    
     results = []
     successful = 0
     failed = 0
     
-    for idx, student_req in enumerate(request.students):
-        logger.info(f"Processing student {idx + 1}/{len(request.students)}: {student_req.student_id}")
+    for idx, (student_req, response) in enumerate(zip(request.students, outcomes)):
+        logger.info(f"Student {idx + 1}/{len(request.students)}: {student_req.student_id}")
         
         try:
-            # Register individual student
-            response = register_student(student_req)
+            if isinstance(response, BaseException):
+                raise response
             
             results.append({
                 "student_id": student_req.student_id,
@@ -325,8 +370,8 @@ def register_students_batch(request: BatchRegistrationRequest):
     )
 
 
-@app.post("/api/v1/verify")
-def verify_student(
+@router.post("/api/v1/verify")
+async def verify_student(
     student_id: str,
     embedding: List[float],
     image_url: HttpUrl,
@@ -345,12 +390,17 @@ def verify_student(
     
     # Download and process image
     try:
-        img_array = download_image_from_url(str(image_url))
+        data = await download_image_bytes(str(image_url))
         
-        # Extract face and generate embedding
-        face_tensor = extractor.return_tensors(img_array)  # (1, 3, 112, 112)
-        face_nhwc = np.transpose(face_tensor, (0, 2, 3, 1))
-        new_embedding = embedder.embed(face_nhwc)[0]  # (512,)
+        # Extract face and generate embedding (unless this photo was embedded before)
+        key = await default_cpu_executor.run(content_key, data, cache_version())
+        cached = default_result_cache.get(key)
+        if cached is not None:
+            new_embedding = cached[0]
+        else:
+            img_array = await default_cpu_executor.run(default_downloader.decode, data, REGISTRATION_DECODE_LONG_SIDE)
+            new_embedding = await default_cpu_executor.run(embed_frontal_face, img_array)  # (512,)
+            default_result_cache.put(key, new_embedding[None])
         
         # Compare with stored embedding
         stored_embedding = np.array(embedding, dtype=np.float32)
@@ -373,6 +423,12 @@ def verify_student(
         raise HTTPException(status_code=400, detail=f"Verification failed: {str(e)}")
 
 
+# ===== STANDALONE APP =====
+# (python registration_api.py / uvicorn registration_api:app)
+app = FastAPI(title="Student Registration API", version="1.0.0")
+app.include_router(router)
+
+
 # ===== RUN SERVER =====
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,121 @@
+# Unified inference server: registration + attendance in one process per worker
+# Run from inference/: python server.py   (or uvicorn server:app --port 8000)
+import logging
+import multiprocessing
+import socket
+from typing import List
+
+import uvicorn
+from fastapi import FastAPI
+
+import attendance_api
+import registration_api
+from facerec.registry import default_registry
+from facerec.scheduler import default_scheduler
+from facerec.config import SERVER_HOST, SERVER_PORTS, SERVER_WORKERS
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Face Recognition Inference API", version="2.0.0")
+
+
+# Defined before the routers are mounted so they take precedence over each service's own "/" and "/health"
+@app.get("/")
+def root():
+    return {
+        "message": "Face Recognition Inference API",
+        "services": {
+            "registration": registration_api.root()["endpoints"],
+            "attendance": attendance_api.root()["endpoints"]
+        }
+    }
+
+
+@app.get("/health")
+def health_check():
+    attendance = attendance_api.health_check()
+    return {
+        "status": "healthy",
+        "models_loaded": True,
+        "extractor": "SCRFD",
+        "embedder": "ArcFace",
+        "models": default_registry.stats(),
+        "scheduler": default_scheduler.stats(),
+        "cpu_executor": attendance["cpu_executor"],
+        "result_cache": attendance["result_cache"],
+        "download_cache": attendance["download_cache"],
+        "embedding_batcher": attendance["embedding_batcher"],
+        "gallery": attendance["gallery"],
+        "pipeline": attendance["pipeline"],
+        "workers": attendance["workers"],
+        "streams": attendance["streams"],
+        "attendance_sessions": attendance["attendance_sessions"]
+    }
+
+
+# Both services share one model registry and one inference scheduler
+app.include_router(registration_api.router)
+app.include_router(attendance_api.router)
+
+
+# ===== RUN SERVER =====
+
+def bind_sockets(host: str, ports: List[int]) -> List[socket.socket]:
+    """
+    One listening socket per port, bound in the parent so every worker accepts on
+    the same sockets. Both legacy ports (8000 registration, 8001 attendance) serve
+    the full app, so existing clients keep their URLs.
+    """
+    sockets = []
+    for port in ports:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        sockets.append(sock)
+    return sockets
+
+
+def serve(sockets: List[socket.socket]) -> None:
+    """Run one uvicorn server (one worker) on already bound sockets."""
+    config = uvicorn.Config("server:app", log_level="info")
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def main():
+    sockets = bind_sockets(SERVER_HOST, SERVER_PORTS)
+    logger.info(f"Serving on {SERVER_HOST} ports {SERVER_PORTS} with {SERVER_WORKERS} worker(s)")
+
+    if SERVER_WORKERS <= 1:
+        serve(sockets)
+        return
+
+    # Each worker is a separate process with its own models, attendance gallery and attendance sessions
+    logger.warning(
+        "SERVER_WORKERS > 1: the attendance gallery (gallery endpoints and gallery references) and "
+        "attendance sessions are disabled, since consecutive requests could reach different workers' "
+        "copies; send inline embeddings. Streams are unaffected: a stream's state lives on its one "
+        "WebSocket connection"
+    )
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=serve, args=(sockets,), name=f"worker-{i}") for i in range(SERVER_WORKERS)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,76 @@
+# A burst of registrations whose photos come from a slow image host must not hold up
+# /health or registrations whose photos come from a fast host
+import threading
+import time
+import pytest
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.local_image_server import LocalImageServer, UPLOADS_DIR
+from facerec.config import MODEL_PATH_ARCFACE, MODEL_PATH_FACEREC
+
+SLOW_LATENCY = 2.0     # s per image on the slow host
+SLOW_REQUESTS = 48     # more than FastAPI's 40 threadpool tokens a sync handler would hold
+FAST_REQUESTS = 4
+HEALTH_INTERVAL = 0.05
+
+requires_models = pytest.mark.skipif(
+    not (MODEL_PATH_FACEREC.exists() and MODEL_PATH_ARCFACE.exists()), reason="SCRFD/ArcFace models not found"
+)
+
+
+def register(base, urls, student_id):
+    start = time.perf_counter()
+    response = requests.post(
+        f"{base}/api/v1/register",
+        json={"student_id": student_id, "name": student_id, "image_urls": urls},
+        timeout=600
+    )
+    return time.perf_counter() - start, response.status_code
+
+
+@requires_models
+def test_fast_requests_not_blocked_by_slow_image_host():
+    from benchmarks.bench_async_concurrency import start_server
+
+    names = sorted(p.name for p in UPLOADS_DIR.glob("*.jpg"))
+    srv, thread, base = start_server()
+    try:
+        with LocalImageServer(latency=SLOW_LATENCY) as slow, LocalImageServer() as fast:
+            assert register(base, [fast.url(names[0]), fast.url(names[1])], "warmup")[1] == 200
+
+            health_s, stop = [], threading.Event()
+
+            def poll_health():
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    assert requests.get(f"{base}/health", timeout=60).status_code == 200
+                    health_s.append(time.perf_counter() - start)
+                    time.sleep(HEALTH_INTERVAL)
+
+            with ThreadPoolExecutor(max_workers=SLOW_REQUESTS) as clients:
+                slow_jobs = [
+                    clients.submit(register, base, [slow.url(names[(2 * i) % len(names)]), slow.url(names[(2 * i + 1) % len(names)])], f"slow{i}")
+                    for i in range(SLOW_REQUESTS)
+                ]
+                time.sleep(0.5)  # let the burst occupy the server
+
+                poller = threading.Thread(target=poll_health, daemon=True)
+                poller.start()
+                fast_results = [
+                    register(base, [fast.url(names[i % len(names)]), fast.url(names[(i + 1) % len(names)])], f"fast{i}")
+                    for i in range(FAST_REQUESTS)
+                ]
+                # The burst is still waiting on the slow host while the fast requests are done
+                assert not all(job.done() for job in slow_jobs)
+                stop.set()
+                poller.join()
+                slow_results = [job.result() for job in slow_jobs]
+    finally:
+        srv.should_exit = True
+        thread.join()
+
+    # A blocked server would hold these until the slow burst drains (~ SLOW_REQUESTS / 4 x SLOW_LATENCY)
+    assert all(code == 200 for _, code in fast_results)
+    assert max(elapsed for elapsed, _ in fast_results) < SLOW_LATENCY
+    assert health_s and max(health_s) < SLOW_LATENCY / 2
+    assert all(code == 200 for _, code in slow_results)
@@ -0,0 +1,53 @@
+# Cached downloads are revalidated with a conditional GET (304, no body) or, while fresh,
+# served without a request - checked against the local stand-in for Cloudinary
+import os
+from benchmarks.local_image_server import LocalImageServer
+from facerec.downloader import ImageDownloader
+from facerec.http_cache import HTTPCache
+
+BODY = b"\xff\xd8 not really a jpeg" * 64
+
+
+def downloader(cache_dir):
+    return ImageDownloader(max_workers=2, retries=0, cache=HTTPCache(str(cache_dir), max_mb=1))
+
+
+def test_revalidation_gets_304_and_cached_body(tmp_path):
+    (tmp_path / "photo.jpg").write_bytes(BODY)
+    cache_dir = tmp_path / "cache"
+
+    with LocalImageServer(directory=tmp_path) as srv:
+        first = downloader(cache_dir)
+        assert first.fetch_bytes(srv.url("photo.jpg")) == BODY
+        assert first.fetch_bytes(srv.url("photo.jpg")) == BODY
+        assert srv.responses == {200: 1, 304: 1}
+        assert first.cache.stats()["revalidated"] == 1
+
+        # Another process on the node, sharing the directory, revalidates too
+        assert downloader(cache_dir).fetch_bytes(srv.url("photo.jpg")) == BODY
+        assert srv.responses == {200: 1, 304: 2}
+
+
+def test_fresh_hit_sends_no_request(tmp_path):
+    (tmp_path / "photo.jpg").write_bytes(BODY)
+
+    with LocalImageServer(directory=tmp_path, cache_control="max-age=60") as srv:
+        cached = downloader(tmp_path / "cache")
+        for _ in range(3):
+            assert cached.fetch_bytes(srv.url("photo.jpg")) == BODY
+        assert srv.responses == {200: 1}
+        assert cached.cache.stats()["fresh_hits"] == 2
+
+
+def test_changed_image_is_downloaded_again(tmp_path):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(BODY)
+
+    with LocalImageServer(directory=tmp_path) as srv:
+        cached = downloader(tmp_path / "cache")
+        assert cached.fetch_bytes(srv.url("photo.jpg")) == BODY
+
+        path.write_bytes(BODY[::-1])
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))  # new ETag even on coarse clocks
+        assert cached.fetch_bytes(srv.url("photo.jpg")) == BODY[::-1]
+        assert srv.responses == {200: 2}
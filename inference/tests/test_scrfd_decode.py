@@ -0,0 +1,95 @@
+# SCRFD decode + NMS keeps one detection per face (synthetic outputs; server/uploads with the real model)
+import numpy as np
+import pytest
+from facerec import scrfd
+from facerec.config import MODEL_PATH_FACEREC
+from facerec.tracker import landmark_boxes
+
+SIZE = 640
+STRIDE = 16
+# Landmarks in stride units around the anchor center: eyes, nose, mouth corners
+KPS = np.array([[-1, -1], [1, -1], [0, 0], [-0.8, 1], [0.8, 1]], dtype=np.float32)
+
+
+def synthetic_outputs(faces):
+    """SCRFD-shaped outputs where each face fires 3 neighbouring stride-16 anchors."""
+    cls, bbox, kps = [], [], []
+    for stride in scrfd.STRIDES:
+        fw = SIZE // stride
+        n = fw * fw * scrfd.ANCHORS_PER_LOC
+        c = np.zeros((n, 1), dtype=np.float32)
+        b = np.ones((n, 4), dtype=np.float32)
+        k = np.zeros((n, 10), dtype=np.float32)
+        if stride == STRIDE:
+            for row, col in faces:
+                anchor = (row * fw + col) * scrfd.ANCHORS_PER_LOC
+                for i, a in enumerate([anchor, anchor + scrfd.ANCHORS_PER_LOC, anchor + fw * scrfd.ANCHORS_PER_LOC]):
+                    c[a] = 0.9 - 0.1 * i
+                    b[a] = 2.0
+                    k[a] = KPS.ravel()
+        cls.append(c), bbox.append(b), kps.append(k)
+    return cls + bbox + kps
+
+
+def shared_face_pairs(landmarks: np.ndarray):
+    """
+    Pairs (i, j) of kept detections that cover the same face: the landmark center of
+    one lies inside the (landmark-derived) face box of the other. Unlike an IoU test,
+    this also catches a small duplicate box nested inside a large one.
+    """
+    centers = landmarks.mean(axis=1)
+    boxes = landmark_boxes(landmarks)
+    inside = (
+        (centers[:, None, 0] >= boxes[None, :, 0]) & (centers[:, None, 0] <= boxes[None, :, 2])
+        & (centers[:, None, 1] >= boxes[None, :, 1]) & (centers[:, None, 1] <= boxes[None, :, 3])
+    )
+    np.fill_diagonal(inside, False)
+    i, j = np.nonzero(inside | inside.T)
+    return [(a, b) for a, b in zip(i.tolist(), j.tolist()) if a < b]
+
+
+def subject_count(landmarks: np.ndarray, min_relative_size: float = 0.5) -> int:
+    """Detections at least min_relative_size times the side of the largest face (the photo's subjects)."""
+    if len(landmarks) == 0:
+        return 0
+    sides = landmark_boxes(landmarks)[:, 2] - landmark_boxes(landmarks)[:, 0]
+    return int((sides >= min_relative_size * sides.max()).sum())
+
+
+FACES = [(5 + 8 * r, 5 + 8 * c) for r in range(4) for c in range(4)]
+
+
+def test_decode_keeps_one_detection_per_face():
+    scores, boxes, landmarks = scrfd.decode(synthetic_outputs(FACES), SIZE, SIZE, det_thresh=0.5, nms_thresh=0.4)
+
+    assert len(scores) == len(FACES)
+    assert shared_face_pairs(landmarks) == []
+    # The survivor of each cluster is its highest-scoring anchor, at the face's own location
+    centers = landmarks.mean(axis=1)
+    expected = np.array([(col, row) for row, col in FACES], dtype=np.float32) * STRIDE + KPS.mean(axis=0) * STRIDE
+    assert np.allclose(np.sort(centers, axis=0), np.sort(expected, axis=0))
+
+
+def test_shared_face_check_flags_duplicates():
+    # Without suppression every cluster leaves 3 detections of one face
+    scores, _, landmarks = scrfd.decode(synthetic_outputs(FACES), SIZE, SIZE, det_thresh=0.5, nms_thresh=1.0)
+
+    assert len(scores) == 3 * len(FACES)
+    assert len(shared_face_pairs(landmarks)) >= 2 * len(FACES)
+
+
+@pytest.mark.skipif(not MODEL_PATH_FACEREC.exists(), reason=f"{MODEL_PATH_FACEREC} not found")
+def test_uploads_one_detection_per_subject():
+    from benchmarks.local_image_server import UPLOADS_DIR
+    from facerec.multi_face_extractor import MultiFaceExtractor
+
+    detector = MultiFaceExtractor(debug=False, enable_quality_filter=False)
+    paths = sorted(UPLOADS_DIR.glob("*.jpg"))
+    assert paths
+
+    # Every upload is a registration photo of one person (others only small, in the background)
+    for path in paths:
+        detections = detector.detect(detector.read_image(str(path)))
+        landmarks = np.stack([lm for _, lm in detections]) if detections else np.empty((0, 5, 2))
+        assert subject_count(landmarks) == 1, path.name
+        assert shared_face_pairs(landmarks) == [], path.name
@@ -0,0 +1,75 @@
+# WebSocket attendance stream: bad session parameters close the socket with 1008, and a
+# streamed photo of a registered student marks them present
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from benchmarks.local_image_server import LocalImageServer, UPLOADS_DIR
+from facerec.config import MODEL_PATH_ARCFACE, MODEL_PATH_FACEREC
+import server
+
+STREAM = "/api/v1/attendance/stream"
+FRAMES = 6          # enough for a track to pass STREAM_TRACK_MIN_HITS
+FRAME_SHIFT = 6     # px the subject moves between frames
+
+requires_models = pytest.mark.skipif(
+    not (MODEL_PATH_FACEREC.exists() and MODEL_PATH_ARCFACE.exists()), reason="SCRFD/ArcFace models not found"
+)
+
+
+def assert_rejected(ws, error):
+    reply = ws.receive_json()
+    assert error in reply["error"]
+    with pytest.raises(WebSocketDisconnect) as closed:
+        ws.receive_json()
+    assert closed.value.code == 1008
+    return reply
+
+
+def test_binary_first_message_is_rejected():
+    # Without `with`, the client skips the startup model preload
+    with TestClient(server.app).websocket_connect(STREAM) as ws:
+        ws.send_bytes(b"\xff\xd8 a frame before the roster")
+        assert_rejected(ws, "Invalid session parameters")
+
+
+def test_malformed_parameters_are_rejected():
+    with TestClient(server.app).websocket_connect(STREAM) as ws:
+        ws.send_text("[1, 2]")
+        assert_rejected(ws, "Invalid session parameters")
+
+    with TestClient(server.app).websocket_connect(STREAM) as ws:
+        ws.send_json({"students": []})
+        assert assert_rejected(ws, "at least one student")["status_code"] == 400
+
+
+@requires_models
+def test_streamed_student_is_present():
+    photo = sorted(UPLOADS_DIR.glob("*.jpg"))[0]
+    image = cv2.imread(str(photo))
+    frames = [cv2.imencode(".jpg", np.roll(image, i * FRAME_SHIFT, axis=1))[1].tobytes() for i in range(FRAMES)]
+
+    rng = np.random.default_rng(0)
+    decoy = rng.standard_normal(512)
+    with LocalImageServer() as srv, TestClient(server.app) as client:
+        registration = client.post(
+            "/api/v1/register",
+            json={"student_id": "s1", "name": "Streamed", "image_urls": [srv.url(photo.name)] * 2}
+        )
+        assert registration.status_code == 200
+        roster = [
+            {"student_id": "s1", "name": "Streamed", "embedding": registration.json()["embedding"]},
+            {"student_id": "s2", "name": "Decoy", "embedding": (decoy / np.linalg.norm(decoy)).tolist()},
+        ]
+
+        with client.websocket_connect(STREAM) as ws:
+            ws.send_json({"students": roster})
+            for i, frame in enumerate(frames):
+                ws.send_bytes(frame)
+                assert ws.receive_json()["frame_index"] == i
+            ws.send_json({"action": "finish"})
+            result = ws.receive_json()
+
+    assert [s["student_id"] for s in result["present_students"]] == ["s1"]
+    assert [s["student_id"] for s in result["absent_students"]] == ["s2"]